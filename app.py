@@ -1,10 +1,70 @@
+import os
 from flask import Flask
-from controllers import setup_routes
+from dotenv import load_dotenv
 
-app = Flask(__name__)
 
-# Register routes
-setup_routes(app)
+def create_app(config=None):
+    """
+    Creates and configures the Flask application.
+
+    Configuration is read from the environment (optionally populated from the dotenv file named by
+    SECRETS_ENV_PATH, default "./secrets.env"). Heavy dependencies such as plotly, yfinance, fredapi
+    and pandas are only imported when first used, so creating the app stays fast.
+
+    :param config: Optional dictionary of Flask config values overriding the environment.
+    :return: The Flask application instance.
+    """
+    # Load environment variables from secrets.env
+    load_dotenv(dotenv_path=os.getenv("SECRETS_ENV_PATH", "./secrets.env"))
+
+    app = Flask(__name__)
+    app.config.update(
+        DEBUG=os.getenv("FLASK_DEBUG", "0").lower() in ("1", "true"),
+        HOST=os.getenv("FLASK_RUN_HOST", "127.0.0.1"),
+        PORT=int(os.getenv("FLASK_RUN_PORT", "5000")),
+    )
+    if config:
+        app.config.update(config)
+
+    # Register routes (imported here so the environment is loaded before the services read it)
+    from controllers.routes import setup_routes
+    setup_routes(app)
+
+    return app
+
+
+def start_background_services(app):
+    """
+    Starts the cache warm-up scheduler and the job workers for an app that serves requests, skipping
+    the reloader's watcher process in debug mode. create_app never starts them, so building an app
+    (tests, benchmarks) has no background side effects.
+
+    :param app: The Flask application instance.
+    """
+    if not app.debug or os.getenv("WERKZEUG_RUN_MAIN") == "true":
+        from services.prefetch_service import start_prefetch_scheduler
+        from services.job_service import start_job_workers
+        start_prefetch_scheduler()
+        start_job_workers()
+
+
+_app = None
+
+
+def __getattr__(name):
+    """
+    Builds the served application on first access of `app` (the WSGI entry point, e.g. `app:app`), so
+    importing this module or create_app stays free of side effects.
+    """
+    global _app
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _app is None:
+        _app = create_app()
+        start_background_services(_app)
+    return _app
+
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    app = __getattr__("app")
+    app.run(debug=app.config["DEBUG"], host=app.config["HOST"], port=app.config["PORT"])
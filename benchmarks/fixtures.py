@@ -0,0 +1,185 @@
+import json
+import logging
+import math
+import os
+import random
+import zlib
+from datetime import date, datetime, timedelta
+
+# Recorded fixtures live next to this file; synthetic data is generated when none are recorded
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURE_TICKERS = [
+    "AAPL", "MSFT", "TSLA", "NVDA", "AMZN", "GOOG", "META", "JPM", "XOM", "JNJ",
+    "PG", "KO", "PEP", "WMT", "DIS", "INTC", "CSCO", "ORCL", "IBM", "SPY",
+]
+FIXTURE_START = date(1980, 1, 2)
+FIXTURE_END = date(2025, 12, 31)
+
+
+def _trading_days(start=FIXTURE_START, end=FIXTURE_END):
+    """
+    Yields every weekday between start and end (inclusive).
+    """
+    current = start
+    while current <= end:
+        if current.weekday() < 5:
+            yield current
+        current += timedelta(days=1)
+
+
+def generate_stock_fixture(ticker):
+    """
+    Generates a deterministic synthetic price history in the same format fetch_data caches.
+
+    :param ticker: The ticker symbol (used to seed the random walk).
+    :return: List of OHLCV records with "Date" formatted as YYYY-MM-DD.
+    """
+    rng = random.Random(zlib.crc32(ticker.encode()))
+    price = rng.uniform(5, 50)
+    records = []
+    for day in _trading_days():
+        open_price = price
+        price = max(0.5, price * math.exp(rng.gauss(0.0003, 0.018)))
+        records.append({
+            "Date": day.strftime("%Y-%m-%d"),
+            "Open": round(open_price, 4),
+            "High": round(max(open_price, price) * 1.01, 4),
+            "Low": round(min(open_price, price) * 0.99, 4),
+            "Close": round(price, 4),
+            "Volume": rng.randint(100_000, 50_000_000),
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        })
+    return records
+
+
+def generate_bond_fixture(series_id="DGS10"):
+    """
+    Generates a deterministic synthetic daily rate series in the same format fetch_bond_rates caches.
+
+    :param series_id: The FRED series ID (used to seed the random walk).
+    :return: List of dictionaries with "date" (YYYY-MM-DD 00:00:00) and "rate" keys.
+    """
+    rng = random.Random(zlib.crc32(series_id.encode()))
+    rate = 10.0
+    rates = []
+    for day in _trading_days():
+        rate = min(16.0, max(0.5, rate + rng.gauss(0, 0.05)))
+        rates.append({"date": day.strftime("%Y-%m-%d 00:00:00"), "rate": round(rate, 2)})
+    return rates
+
+
+def load_stock_fixture(ticker):
+    """
+    Loads the recorded fixture for a ticker, falling back to synthetic data.
+    """
+    path = os.path.join(FIXTURES_DIR, "stock_data", f"{ticker}.json")
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return generate_stock_fixture(ticker)
+
+
+def load_bond_fixture(series_id="DGS10"):
+    """
+    Loads the recorded fixture for a FRED series, falling back to synthetic data.
+    """
+    path = os.path.join(FIXTURES_DIR, "bond_data", f"{series_id}.json")
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return generate_bond_fixture(series_id)
+
+
+class OfflineData:
+    """
+    Installs fixture data into the fetchers' caches so simulations run with no network access.
+
+    :param tickers: Tickers to load fixtures for.
+    """
+    def __init__(self, tickers=FIXTURE_TICKERS):
+        from data_fetchers.getYieldCurveData import TREASURY_TENORS
+
+        self.stock_data = {ticker: load_stock_fixture(ticker) for ticker in tickers}
+        self.bond_rates = {series_id: load_bond_fixture(series_id) for series_id in TREASURY_TENORS}
+
+    def write_disk_cache(self, period="max"):
+        """
+        Writes the stock fixtures into data_cache/ under the current working directory.
+        """
+        from utils.disk_cache import CACHE_EXTENSION, write_cache_file
+        folder = f"data_cache/stock_data/{period}"
+        for ticker, records in self.stock_data.items():
+            write_cache_file(f"{folder}/{ticker}{CACHE_EXTENSION}", records, source="fixture")
+
+    def install_stock_memory_cache(self, period="max"):
+        """
+        Seeds the in-memory stock data cache with every fixture.
+        """
+        from data_fetchers.getYFinanceData import stock_data_cache
+        for ticker, records in self.stock_data.items():
+            stock_data_cache[f"{ticker}_{period}"] = records
+
+    def install_bond_rates(self, start_date, end_date, series_id=None):
+        """
+        Seeds the in-memory bond rate cache for the given range (matching fetch_bond_rates' cache key).
+
+        :param series_id: The FRED series to seed (default: every Treasury tenor).
+        """
+        from data_fetchers.getFREDData import bond_rates_cache
+        start = f"{start_date} 00:00:00"
+        end = f"{end_date} 00:00:00"
+        for series in [series_id] if series_id else self.bond_rates:
+            bond_rates_cache[f"{series}_{start_date}_{end_date}"] = [
+                rate for rate in self.bond_rates[series] if start <= rate["date"] <= end
+            ]
+
+    def patch_network(self):
+        """
+        Replaces the company-name lookups (a live yfinance call) with a local stand-in.
+        """
+        import services.company_service
+        import simulations.dca_simulation
+        import simulations.hybrid_simulation
+
+        def offline_company_name(ticker):
+            return f"{ticker} Fixture Inc."
+
+        for module in (services.company_service, simulations.dca_simulation, simulations.hybrid_simulation):
+            module.get_company_name = offline_company_name
+
+
+def record_fixtures(tickers=FIXTURE_TICKERS):
+    """
+    Records real fixtures from Yahoo Finance and FRED (requires network access and FRED_API_KEY).
+    """
+    from dotenv import load_dotenv
+    from data_fetchers.getYFinanceData import fetch_data
+    from data_fetchers.getFREDData import fetch_bond_rates
+    from data_fetchers.getYieldCurveData import TREASURY_TENORS
+
+    load_dotenv(dotenv_path="./secrets.env")
+    os.makedirs(os.path.join(FIXTURES_DIR, "stock_data"), exist_ok=True)
+    os.makedirs(os.path.join(FIXTURES_DIR, "bond_data"), exist_ok=True)
+
+    for ticker, records in fetch_data(tickers=tickers, period="max", skip_beautify=True).items():
+        with open(os.path.join(FIXTURES_DIR, "stock_data", f"{ticker}.json"), "w") as f:
+            json.dump(records, f)
+        logging.info(f"Recorded fixture for {ticker} ({len(records)} rows).")
+
+    for series_id in TREASURY_TENORS:
+        rates = fetch_bond_rates(
+            os.getenv("FRED_API_KEY"),
+            series_id=series_id,
+            start_date=FIXTURE_START.strftime("%Y-%m-%d"),
+            end_date=datetime.today().strftime("%Y-%m-%d"),
+            skip_beautify=True,
+        )
+        with open(os.path.join(FIXTURES_DIR, "bond_data", f"{series_id}.json"), "w") as f:
+            json.dump(rates, f)
+        logging.info(f"Recorded fixture for {series_id} ({len(rates)} rows).")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    record_fixtures()
@@ -0,0 +1,154 @@
+"""
+Parity check for the simulation kernels (utils/kernels.py): runs the kernel-backed simulations and the
+original per-day Python loops on the offline fixtures, compares their balance histories and reports the
+speedup.
+
+Usage:
+    python -m benchmarks.kernel_parity             # exits with status 1 if any history differs
+    python -m benchmarks.kernel_parity --rounds 3
+
+Both engines keep money in integer cents (utils/money.py), so with either backend (Python or Numba) the
+histories must be identical: they are compared by their ledger digests.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.run import HORIZONS, REPO_ROOT, scenario_params
+
+TICKER_COUNTS = [1, 5]
+# Scenarios run in two steps, so the second run resumes from the first one's checkpoint
+RESUME_SPLITS = {"short": "2023-06-01", "long": "2008-06-01"}
+
+
+def _histories(results):
+    return [account.balance_history for account in results]
+
+
+def _digests(histories):
+    from utils.money import ledger_digest
+    return [ledger_digest(history) for history in histories]
+
+
+def _max_difference(expected, actual):
+    """
+    Returns the largest absolute difference between two lists of balance histories, or None if their
+    shapes (accounts, rows or columns) differ.
+    """
+    if len(expected) != len(actual):
+        return None
+    largest = 0.0
+    for expected_history, actual_history in zip(expected, actual):
+        if len(expected_history) != len(actual_history):
+            return None
+        for expected_row, actual_row in zip(expected_history, actual_history):
+            if expected_row.keys() != actual_row.keys():
+                return None
+            for key, value in expected_row.items():
+                other = actual_row[key]
+                if isinstance(value, (int, float)) and isinstance(other, (int, float)):
+                    largest = max(largest, abs(value - other))
+                elif value != other:
+                    return None
+    return largest
+
+
+def _timed_run(function, params, use_kernels, rounds):
+    """
+    Runs a simulation from scratch (no result caches or checkpoints) and returns (histories, median seconds).
+    """
+    from services.cache_service import clear_all_caches
+    from utils import kernels
+
+    kernels.SIMULATION_KERNELS = use_kernels
+    timings = []
+    for _ in range(rounds):
+        clear_all_caches()
+        started = time.perf_counter()
+        results = function(dict(params))
+        timings.append(time.perf_counter() - started)
+    return _histories(results), statistics.median(timings)
+
+
+def _resumed_run(function, params, split_date, use_kernels):
+    """
+    Runs a simulation up to split_date, then extends it to its end date from the checkpoint.
+    """
+    from services.cache_service import clear_all_caches
+    from utils import kernels
+
+    kernels.SIMULATION_KERNELS = use_kernels
+    clear_all_caches()
+    function({**params, "end_date": split_date})
+    return _histories(function(dict(params)))
+
+
+def check_parity(rounds=1):
+    """
+    Compares the kernels with the per-day loops for every scenario and prints the results.
+
+    :return: Number of scenarios whose histories differ.
+    """
+    from simulations.bond_simulation import run_bond_simulation
+    from simulations.dca_simulation import run_dca_simulation
+    from utils import kernels
+
+    print(f"Kernel backend: {kernels.kernel_backend()}")
+
+    from benchmarks.fixtures import OfflineData
+    offline = OfflineData()
+    offline.patch_network()
+    offline.write_disk_cache()
+    offline.install_stock_memory_cache()
+    for horizon, (start_date, end_date) in HORIZONS.items():
+        offline.install_bond_rates(start_date, end_date)
+        offline.install_bond_rates(start_date, RESUME_SPLITS[horizon])
+        # A resumed bond simulation fetches from a week before the day after the checkpoint
+        resume_fetch_start = datetime.strptime(RESUME_SPLITS[horizon], "%Y-%m-%d").date() - timedelta(days=6)
+        offline.install_bond_rates(str(resume_fetch_start), end_date)
+
+    tickers = list(offline.stock_data)
+    simulations = {"dca_simulation": run_dca_simulation, "bond_simulation": run_bond_simulation}
+    failures = 0
+    try:
+        for simulation_name, function in simulations.items():
+            for horizon in HORIZONS:
+                for count in TICKER_COUNTS:
+                    params = scenario_params(horizon, tickers[:count])
+                    expected, loop_time = _timed_run(function, params, False, rounds)
+                    actual, kernel_time = _timed_run(function, params, True, rounds)
+                    resumed = _resumed_run(function, params, RESUME_SPLITS[horizon], True)
+
+                    for label, histories in (("full", actual), ("resumed", resumed)):
+                        matches = _digests(expected) == _digests(histories)
+                        failures += not matches
+                        name = f"{simulation_name}/{horizon}/{count}_tickers/{label}"
+                        status = "ok" if matches else f"MISMATCH (max diff {_max_difference(expected, histories)})"
+                        detail = f"loop {loop_time * 1000:9.2f} ms, kernel {kernel_time * 1000:9.2f} ms ({loop_time / kernel_time:5.1f}x)" if label == "full" else ""
+                        print(f"{name:<50} {status:<8} {detail}")
+    finally:
+        kernels.SIMULATION_KERNELS = True
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the simulation kernels against the per-day Python loops.")
+    parser.add_argument("--rounds", type=int, default=1, help="Timed rounds per scenario and implementation.")
+    args = parser.parse_args()
+
+    os.environ["PREFETCH_ENABLED"] = "0"  # Never hit upstream APIs
+    sys.path.insert(0, REPO_ROOT)
+    workdir = tempfile.mkdtemp(prefix="parity-")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)  # The fetchers read and write data_cache/ relative to the working directory
+    try:
+        failed = check_parity(rounds=args.rounds)
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
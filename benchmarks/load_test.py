@@ -0,0 +1,322 @@
+"""
+Load test for the Flask app against local stand-ins for Yahoo Finance, FRED and Polygon
+(benchmarks/upstreams.py), so production-like traffic can be replayed with no network access.
+
+The app runs in its own process (threaded server, working directory in a temporary folder, empty data
+caches) and the stand-ins in another. Worker threads then drive a weighted mix of search, simulate and
+cache-clear requests at a fixed concurrency. The report lists throughput, latency percentiles and error
+rates per endpoint, the upstream calls the app made, and the app's memory (RSS) growth: first for each
+endpoint on its own, then for the mix.
+
+Usage:
+    python -m benchmarks.load_test                                     # 30 s of the default mix, 8 workers
+    python -m benchmarks.load_test --concurrency 32 --duration 60 --mix search=70,simulate=25,clear_cache=5
+    python -m benchmarks.load_test --upstream-latency-ms 200 --upstream-error-rate 0.05 --output /tmp/load.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.fixtures import FIXTURE_TICKERS
+from benchmarks.run import REPO_ROOT
+
+DEFAULT_MIX = "search=60,simulate=35,clear_cache=5"
+PERCENTILES = (50, 90, 95, 99)
+# Simulation requests draw their date range, amounts and tickers from these, so some repeat (cache hits)
+SIMULATE_RANGES = [("2022-01-01", "2025-01-01"), ("2015-01-01", "2025-01-01"), ("2000-01-01", "2025-01-01")]
+SIMULATE_AMOUNTS = [("10,000", "500"), ("5,000", "250"), ("25,000", "1,000")]
+SIMULATE_TICKERS = FIXTURE_TICKERS[:6]
+MEMORY_SAMPLE_SECONDS = 0.5
+
+
+def _serve_app(port_queue, workdir, environment, log_level):
+    """
+    Process target: serves the app with a threaded server, after putting the bound port on port_queue.
+    """
+    import logging
+
+    os.chdir(workdir)  # The fetchers and job store read and write relative to the working directory
+    os.environ.update(environment)
+    sys.path.insert(0, REPO_ROOT)
+
+    from benchmarks.upstreams import install_yahoo_stand_in
+    install_yahoo_stand_in(environment["UPSTREAM_URL"])
+
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger().setLevel(log_level)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def _start_process(target, *args):
+    """
+    Starts a server process and waits for the port it reports.
+
+    :return: Tuple of (process, port).
+    """
+    context = multiprocessing.get_context("spawn")
+    port_queue = context.Queue()
+    process = context.Process(target=target, args=(port_queue, *args), daemon=True)
+    process.start()
+    return process, port_queue.get(timeout=120)
+
+
+def _rss_bytes(pid):
+    """
+    Returns the resident set size of a process in bytes, or None where /proc is unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _percentile(sorted_values, percent):
+    """
+    Nearest-rank percentile of an already sorted list (None if it is empty).
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def parse_mix(mix):
+    """
+    Parses "endpoint=weight,..." into a dictionary, checking the endpoint names.
+    """
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in REQUEST_BUILDERS:
+            raise ValueError(f"Unknown endpoint in mix: {name.strip()} (expected one of {', '.join(REQUEST_BUILDERS)})")
+        weights[name.strip()] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def _search_request(rng):
+    ticker = rng.choice(FIXTURE_TICKERS)
+    query = rng.choice([ticker[:rng.randint(1, len(ticker))], ticker.lower(), "fixture"])
+    return "GET", "/search_tickers", {"params": {"query": query}}
+
+
+def _simulate_request(rng):
+    start_date, end_date = rng.choice(SIMULATE_RANGES)
+    initial_investment, monthly_investment = rng.choice(SIMULATE_AMOUNTS)
+    tickers = rng.sample(SIMULATE_TICKERS, rng.randint(1, 3))
+    params = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "initial_investment": initial_investment,
+        "monthly_investment": monthly_investment,
+        "tickers": ",".join(tickers),
+    }
+    return "GET", "/simulate", {"params": params}
+
+
+def _clear_cache_request(rng):
+    return "POST", "/clear_cache", {}
+
+
+REQUEST_BUILDERS = {
+    "search": _search_request,
+    "simulate": _simulate_request,
+    "clear_cache": _clear_cache_request,
+}
+
+
+def run_phase(base_url, weights, concurrency, duration, app_pid, seed=0):
+    """
+    Drives weighted traffic at the app from `concurrency` closed-loop workers for `duration` seconds.
+
+    :return: Dictionary with the per-endpoint samples (status, seconds), the wall time and memory samples.
+    """
+    import requests
+
+    names = list(weights)
+    samples = {name: [] for name in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights=[weights[name] for name in names])[0]
+            method, path, options = REQUEST_BUILDERS[name](rng)
+            started = time.perf_counter()
+            try:
+                status = session.request(method, base_url + path, timeout=300, **options).status_code
+            except requests.RequestException:
+                status = None  # Connection errors count as errors
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples[name].append((status, elapsed))
+
+    memory = [_rss_bytes(app_pid)]
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in workers:
+        thread.start()
+    while any(thread.is_alive() for thread in workers):
+        time.sleep(MEMORY_SAMPLE_SECONDS)
+        memory.append(_rss_bytes(app_pid))
+    for thread in workers:
+        thread.join()
+    return {"samples": samples, "seconds": time.perf_counter() - started, "memory": memory}
+
+
+def summarize(phase):
+    """
+    Reduces a phase's samples to throughput, latency percentiles (ms), error rates and memory growth.
+    """
+    endpoints = {}
+    for name, samples in phase["samples"].items():
+        latencies = sorted(seconds * 1000 for _, seconds in samples)
+        errors = sum(1 for status, _ in samples if status is None or status >= 400)
+        endpoints[name] = {
+            "requests": len(samples),
+            "throughput": len(samples) / phase["seconds"],
+            "error_rate": errors / len(samples) if samples else 0.0,
+            **{f"p{percent}_ms": _percentile(latencies, percent) for percent in PERCENTILES},
+            "max_ms": latencies[-1] if latencies else None,
+        }
+
+    memory = [value for value in phase["memory"] if value is not None]
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "seconds": phase["seconds"],
+        "requests": total,
+        "throughput": total / phase["seconds"],
+        "error_rate": sum(endpoint["error_rate"] * endpoint["requests"] for endpoint in endpoints.values()) / total if total else 0.0,
+        "endpoints": endpoints,
+        "rss_start_mb": memory[0] / 2**20 if memory else None,
+        "rss_end_mb": memory[-1] / 2**20 if memory else None,
+        "rss_peak_mb": max(memory) / 2**20 if memory else None,
+        "rss_growth_mb": (memory[-1] - memory[0]) / 2**20 if memory else None,
+    }
+
+
+def _upstream_stats(upstream_url):
+    import requests
+    return requests.get(f"{upstream_url}/_stats", timeout=10).json()
+
+
+def _upstream_delta(before, after):
+    return {name: {key: after[name][key] - before[name][key] for key in after[name]} for name in after}
+
+
+def _format_ms(value):
+    return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+
+
+def print_summary(label, summary, upstream_calls):
+    """
+    Prints a phase summary as a table.
+    """
+    growth = summary["rss_growth_mb"]
+    memory = f"RSS {summary['rss_start_mb']:.1f} -> {summary['rss_end_mb']:.1f} MB (peak {summary['rss_peak_mb']:.1f}, growth {growth:+.1f})" if growth is not None else "RSS n/a"
+    print(f"\n{label}: {summary['requests']} requests in {summary['seconds']:.1f} s ({summary['throughput']:.1f} req/s), "
+          f"errors {summary['error_rate']:.1%}, {memory}")
+    print(f"  {'endpoint':<12} {'requests':>8} {'req/s':>8} {'errors':>7} " + " ".join(f"{f'p{percent} ms':>9}" for percent in PERCENTILES) + f" {'max ms':>9}")
+    for name, endpoint in summary["endpoints"].items():
+        print(f"  {name:<12} {endpoint['requests']:>8} {endpoint['throughput']:>8.1f} {endpoint['error_rate']:>7.1%} "
+              + " ".join(_format_ms(endpoint[f"p{percent}_ms"]) for percent in PERCENTILES) + f" {_format_ms(endpoint['max_ms'])}")
+    print("  upstream calls: " + ", ".join(f"{name} {stats['requests']} ({stats['errors']} failed)" for name, stats in upstream_calls.items()))
+
+
+def run_load_test(weights, concurrency, duration, endpoint_duration, warmup, upstream_latency_ms, upstream_jitter_ms,
+                  upstream_error_rate, seed, log_level):
+    """
+    Starts the stand-ins and the app, runs the per-endpoint phases and the mixed phase, and returns the report.
+    """
+    from benchmarks.upstreams import serve_upstreams
+
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    processes = []
+    try:
+        upstream_process, upstream_port = _start_process(serve_upstreams, upstream_latency_ms, upstream_jitter_ms, upstream_error_rate, seed)
+        processes.append(upstream_process)
+        upstream_url = f"http://127.0.0.1:{upstream_port}"
+
+        environment = {
+            "UPSTREAM_URL": upstream_url,
+            "POLYGON_API_URL": f"{upstream_url}/polygon",
+            "POLYGON_API_KEY": "load-test",
+            "FRED_API_URL": f"{upstream_url}/fred",
+            "FRED_API_KEY": "load-test",
+            "SECRETS_ENV_PATH": os.path.join(workdir, "secrets.env"),  # Never read the developer's real keys
+            "PREFETCH_ENABLED": os.getenv("PREFETCH_ENABLED", "0"),
+        }
+        app_process, app_port = _start_process(_serve_app, workdir, environment, log_level)
+        processes.append(app_process)
+        base_url = f"http://127.0.0.1:{app_port}"
+        print(f"App on {base_url} (pid {app_process.pid}), upstream stand-ins on {upstream_url}")
+
+        if warmup > 0:
+            run_phase(base_url, weights, concurrency, warmup, app_process.pid, seed=seed + 1)
+
+        report = {"config": {
+            "mix": weights, "concurrency": concurrency, "duration": duration, "endpoint_duration": endpoint_duration,
+            "warmup": warmup, "upstream_latency_ms": upstream_latency_ms, "upstream_jitter_ms": upstream_jitter_ms,
+            "upstream_error_rate": upstream_error_rate, "seed": seed,
+        }, "endpoints": {}}
+
+        # Each endpoint on its own first, so memory growth can be attributed to it
+        phases = [(name, {name: 1.0}, endpoint_duration) for name in weights if endpoint_duration > 0] + [("mix", weights, duration)]
+        for index, (label, phase_weights, phase_duration) in enumerate(phases):
+            before = _upstream_stats(upstream_url)
+            summary = summarize(run_phase(base_url, phase_weights, concurrency, phase_duration, app_process.pid, seed=seed + 2 + index))
+            summary["upstream_calls"] = _upstream_delta(before, _upstream_stats(upstream_url))
+            print_summary(label if label == "mix" else f"endpoint {label}", summary, summary["upstream_calls"])
+            if label == "mix":
+                report["mix"] = summary
+            else:
+                report["endpoints"][label] = summary
+        return report
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the app against local upstream stand-ins.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted endpoint mix (default: {DEFAULT_MIX}).")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent closed-loop clients.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of mixed traffic.")
+    parser.add_argument("--endpoint-duration", type=float, default=10, help="Seconds of traffic per endpoint on its own (0 skips).")
+    parser.add_argument("--warmup", type=float, default=0, help="Seconds of unrecorded mixed traffic first (0 starts cold).")
+    parser.add_argument("--upstream-latency-ms", type=float, default=20, help="Delay the stand-ins add to every response.")
+    parser.add_argument("--upstream-jitter-ms", type=float, default=10, help="Maximum random delay on top of the latency.")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0, help="Fraction of upstream requests answered with a 503.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="CRITICAL", help="Log level of the app process.")
+    parser.add_argument("--output", help="Write the report as JSON to this path.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    result = run_load_test(
+        parse_mix(args.mix), args.concurrency, args.duration, args.endpoint_duration, args.warmup,
+        args.upstream_latency_ms, args.upstream_jitter_ms, args.upstream_error_rate, args.seed, args.log_level,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nReport written to {args.output}")
@@ -0,0 +1,376 @@
+"""
+Offline benchmark suite for the simulations, data caches, plotting and the /simulate endpoint.
+
+Usage:
+    python -m benchmarks.run                       # run everything, write benchmarks/results/<commit>.json
+    python -m benchmarks.run --filter simulation   # run benchmarks whose name contains "simulation"
+    python -m benchmarks.run --compare OLD.json NEW.json
+
+Fixtures are loaded from benchmarks/fixtures/ (record them with `python -m benchmarks.fixtures`)
+or generated deterministically, so no network access is needed.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+# Scenario dimensions
+HORIZONS = {
+    "short": ("2022-01-01", "2025-01-01"),
+    "long": ("1990-01-01", "2025-01-01"),
+}
+TICKER_COUNTS = [1, 5, 20]
+BASE_PARAMS = {"initial_investment": "10,000", "monthly_investment": "500"}
+# Modules that must not be imported while the app is created
+HEAVY_MODULES = ["plotly", "yfinance", "fredapi", "pandas", "matplotlib", "numpy", "requests"]
+STARTUP_SCRIPT = (
+    "import sys, time; started = time.perf_counter(); from app import create_app; create_app(); "
+    "elapsed = time.perf_counter() - started; "
+    "print(f'{{elapsed}}|' + ','.join(m for m in {heavy!r} if m in sys.modules))"
+)
+
+
+class Benchmark:
+    """
+    A single timed case.
+
+    :param name: Unique benchmark name (slash-separated path).
+    :param func: Callable that is timed.
+    :param setup: Optional callable run (untimed) before every round.
+    """
+    def __init__(self, name, func, setup=None):
+        self.name = name
+        self.func = func
+        self.setup = setup
+
+    def run(self, rounds, warmup):
+        """
+        Runs the benchmark and returns timing statistics in seconds.
+        """
+        for _ in range(warmup):
+            if self.setup:
+                self.setup()
+            self.func()
+
+        timings = []
+        for _ in range(rounds):
+            if self.setup:
+                self.setup()
+            started = time.perf_counter()
+            self.func()
+            timings.append(time.perf_counter() - started)
+
+        return {
+            "rounds": rounds,
+            "min": min(timings),
+            "max": max(timings),
+            "mean": statistics.mean(timings),
+            "median": statistics.median(timings),
+            "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        }
+
+
+def scenario_params(horizon, tickers):
+    """
+    Builds /simulate-style parameters for a horizon and a list of tickers.
+    """
+    start_date, end_date = HORIZONS[horizon]
+    return {**BASE_PARAMS, "start_date": start_date, "end_date": end_date, "tickers": ",".join(tickers)}
+
+
+def reset_result_caches():
+    """
+    Drops cached simulation results so every round does the full work.
+    """
+    from services.cache_service import clear_all_caches
+    clear_all_caches()
+
+
+def collect_benchmarks(offline):
+    """
+    Builds the list of benchmark cases.
+
+    :param offline: The OfflineData instance holding the fixtures.
+    """
+    from services.simulation_service import SIMULATION_FUNCTIONS, run_simulations
+    from services.plotting_service import generate_plot
+    from utils.performance_metrics import compute_metrics
+    from utils.date_utils import pad_historical_prices
+    from data_fetchers.getYFinanceData import fetch_data, stock_data_cache
+
+    tickers = list(offline.stock_data)
+    benchmarks = []
+
+    # Each registered simulation across horizons and ticker counts
+    for simulation_name, simulation_function in SIMULATION_FUNCTIONS.items():
+        for horizon in HORIZONS:
+            for count in TICKER_COUNTS:
+                params = scenario_params(horizon, tickers[:count])
+                benchmarks.append(Benchmark(
+                    f"simulation/{simulation_name}/{horizon}/{count}_tickers",
+                    lambda function=simulation_function, params=params: function(dict(params)),
+                    setup=reset_result_caches,
+                ))
+
+    # Price padding
+    records = [{"Date": r["Date"], "Close": r["Close"]} for r in offline.stock_data[tickers[0]]]
+    for horizon, (start_date, end_date) in HORIZONS.items():
+        benchmarks.append(Benchmark(
+            f"pad_historical_prices/{horizon}",
+            lambda start_date=start_date, end_date=end_date: pad_historical_prices(
+                [r for r in records if start_date <= r["Date"] <= end_date], start_date, end_date
+            ),
+        ))
+
+    # fetch_data cache paths
+    def drop_memory_cache():
+        for ticker in tickers:
+            stock_data_cache.pop(f"{ticker}_max", None)
+
+    for count in TICKER_COUNTS:
+        selection = tickers[:count]
+        benchmarks.append(Benchmark(
+            f"fetch_data/cold_disk/{count}_tickers",
+            lambda selection=selection: fetch_data(tickers=selection, period="max", skip_beautify=True),
+            setup=drop_memory_cache,
+        ))
+        benchmarks.append(Benchmark(
+            f"fetch_data/warm_memory/{count}_tickers",
+            lambda selection=selection: fetch_data(tickers=selection, period="max", skip_beautify=True),
+            setup=offline.install_stock_memory_cache,
+        ))
+
+    # Yield curve: aligning every Treasury series, and pricing one maturity per calendar day in one lookup
+    import numpy as np
+    from data_fetchers.getYieldCurveData import TREASURY_TENORS, fetch_yield_curve, yield_curve_cache
+
+    for horizon, (start_date, end_date) in HORIZONS.items():
+        def build_curve(start_date=start_date, end_date=end_date):
+            return fetch_yield_curve(None, series_ids=list(TREASURY_TENORS), start_date=start_date, end_date=end_date)
+
+        benchmarks.append(Benchmark(f"yield_curve/build/{horizon}", build_curve, setup=yield_curve_cache.clear))
+
+        curve = build_curve()
+        days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+        maturities = np.random.default_rng(0).uniform(1, 360, len(days))
+        benchmarks.append(Benchmark(
+            f"yield_curve/rates_on/{horizon}",
+            lambda curve=curve, days=days, maturities=maturities: curve.rates_on(days, maturities),
+        ))
+
+    # Plotting
+    for horizon in HORIZONS:
+        results = run_simulations(scenario_params(horizon, tickers[:5]))
+        histories = [
+            (account.name, account.balance_history)
+            for accounts in results.values() if isinstance(accounts, list)
+            for account in accounts
+        ]
+        benchmarks.append(Benchmark(f"generate_plot/{horizon}/5_tickers", lambda histories=histories: generate_plot(histories)))
+
+        # Performance metrics over a few hundred accounts (the histories repeated)
+        many = [history for _, history in histories] * (200 // len(histories) + 1)
+        benchmarks.append(Benchmark(
+            f"performance_metrics/{horizon}/{len(many)}_accounts",
+            lambda many=many: compute_metrics(many),
+        ))
+
+    # Full request through the Flask test client
+    from app import create_app
+    client = create_app().test_client()
+    for horizon in HORIZONS:
+        for count in (1, 5):
+            params = scenario_params(horizon, tickers[:count])
+
+            def request_simulate(params=params):
+                response = client.get("/simulate", query_string=params)
+                assert response.status_code == 200, response.get_data(as_text=True)
+
+            benchmarks.append(Benchmark(f"endpoint/simulate/{horizon}/{count}_tickers", request_simulate, setup=reset_result_caches))
+
+    # Streaming CSV export of the full histories
+    for horizon in HORIZONS:
+        params = scenario_params(horizon, tickers[:5])
+
+        def request_export(params=params):
+            response = client.get("/export", query_string=params)
+            assert response.status_code == 200, response.get_data(as_text=True)
+            response.get_data()
+
+        benchmarks.append(Benchmark(f"endpoint/export_csv/{horizon}/5_tickers", request_export, setup=reset_result_caches))
+
+    # Rolling-window DCA analysis over every start month of the full history
+    from services.rolling_service import run_rolling_analysis
+    for count in TICKER_COUNTS:
+        params = {**BASE_PARAMS, "tickers": ",".join(tickers[:count]), "horizon_years": "10"}
+        benchmarks.append(Benchmark(
+            f"rolling_windows/10y/{count}_tickers",
+            lambda params=params: run_rolling_analysis(dict(params)),
+            setup=reset_result_caches,
+        ))
+
+    # Conditional requests answered from the ETag without running the simulations
+    for horizon in HORIZONS:
+        params = scenario_params(horizon, tickers[:5])
+        etag = client.get("/simulate", query_string=params).headers["ETag"]
+
+        def revalidate_simulate(params=params, etag=etag):
+            response = client.get("/simulate", query_string=params, headers={"If-None-Match": etag})
+            assert response.status_code == 304, response.status_code
+
+        benchmarks.append(Benchmark(f"endpoint/simulate_not_modified/{horizon}/5_tickers", revalidate_simulate))
+
+    # Batch of single-ticker scenarios sharing one horizon
+    for horizon in HORIZONS:
+        scenarios = [{"id": ticker, **scenario_params(horizon, [ticker])} for ticker in tickers[:5]]
+
+        def request_batch(scenarios=scenarios):
+            response = client.post("/simulate/batch", json={"scenarios": scenarios})
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+        benchmarks.append(Benchmark(f"endpoint/simulate_batch/{horizon}/5_scenarios", request_batch, setup=reset_result_caches))
+
+    return benchmarks
+
+
+def measure_startup(rounds=5):
+    """
+    Measures create_app() in fresh interpreters and reports any heavy modules it imported.
+
+    :return: Timing statistics in seconds plus the list of heavy modules loaded at startup.
+    """
+    # Keep the job store created at startup in the scratch working directory
+    env = {**os.environ, "PREFETCH_ENABLED": "0", "JOBS_DB_PATH": os.path.join(os.getcwd(), "job_store", "jobs.sqlite3")}
+    script = STARTUP_SCRIPT.format(heavy=HEAVY_MODULES)
+    timings, heavy_loaded = [], set()
+    for _ in range(rounds):
+        started = time.perf_counter()
+        output = subprocess.check_output([sys.executable, "-c", script], cwd=REPO_ROOT, env=env, text=True)
+        process_time = time.perf_counter() - started
+        elapsed, loaded = output.strip().splitlines()[-1].split("|")
+        timings.append((float(elapsed), process_time))
+        heavy_loaded.update(module for module in loaded.split(",") if module)
+
+    create_app_times = [create_app_time for create_app_time, _ in timings]
+    process_times = [process_time for _, process_time in timings]
+    return {
+        "rounds": rounds,
+        "min": min(create_app_times),
+        "max": max(create_app_times),
+        "mean": statistics.mean(create_app_times),
+        "median": statistics.median(create_app_times),
+        "stdev": statistics.stdev(create_app_times) if rounds > 1 else 0.0,
+        "process_median": statistics.median(process_times),
+        "heavy_modules_loaded": sorted(heavy_loaded),
+    }
+
+
+def current_commit():
+    """
+    Returns the short hash of the checked-out commit, or "unknown".
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def run(rounds=5, warmup=1, name_filter=None, output=None):
+    """
+    Runs the suite in a scratch working directory and writes the results as JSON.
+
+    :return: Path of the written results file.
+    """
+    os.environ["PREFETCH_ENABLED"] = "0"  # Never hit upstream APIs from the benchmarks
+    sys.path.insert(0, REPO_ROOT)
+    output = os.path.abspath(output or os.path.join(RESULTS_DIR, f"{current_commit()}.json"))
+
+    from benchmarks.fixtures import OfflineData
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)  # The fetchers read and write data_cache/ relative to the working directory
+    try:
+        offline = OfflineData()
+        offline.patch_network()
+        offline.write_disk_cache()
+        offline.install_stock_memory_cache()
+        for start_date, end_date in HORIZONS.values():
+            offline.install_bond_rates(start_date, end_date)
+
+        results = {}
+        if not name_filter or name_filter in "startup/create_app":
+            results["startup/create_app"] = measure_startup(rounds)
+            print(f"{'startup/create_app':<55} median {results['startup/create_app']['median'] * 1000:10.2f} ms")
+            if results["startup/create_app"]["heavy_modules_loaded"]:
+                print(f"WARNING: heavy modules imported at startup: {results['startup/create_app']['heavy_modules_loaded']}")
+
+        for benchmark in collect_benchmarks(offline):
+            if name_filter and name_filter not in benchmark.name:
+                continue
+            results[benchmark.name] = benchmark.run(rounds, warmup)
+            print(f"{benchmark.name:<55} median {results[benchmark.name]['median'] * 1000:10.2f} ms")
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": current_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "benchmarks": results,
+        }, f, indent=4)
+        f.write("\n")
+    print(f"Results written to {output}")
+    return output
+
+
+def compare(old_path, new_path, threshold=0.10):
+    """
+    Prints the median change per benchmark between two result files.
+
+    :param threshold: Relative slowdown reported as a regression (0.10 = 10%).
+    :return: Number of regressions found.
+    """
+    with open(old_path, "r") as f:
+        old = json.load(f)["benchmarks"]
+    with open(new_path, "r") as f:
+        new = json.load(f)["benchmarks"]
+
+    regressions = 0
+    for name in sorted(set(old) & set(new)):
+        before, after = old[name]["median"], new[name]["median"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<55} {before * 1000:10.2f} ms -> {after * 1000:10.2f} ms ({change:+.1%}){flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per benchmark.")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed warm-up rounds per benchmark.")
+    parser.add_argument("--filter", dest="name_filter", help="Only run benchmarks whose name contains this string.")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>.json).")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files instead of running.")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+    run(rounds=args.rounds, warmup=args.warmup, name_filter=args.name_filter, output=args.output)
@@ -0,0 +1,235 @@
+"""
+Local stand-ins for the upstream APIs the app calls (Polygon ticker search, FRED series observations and
+Yahoo Finance charts), serving the benchmark fixtures over HTTP with configurable latency and error rates.
+
+The app reaches Polygon and FRED through POLYGON_API_URL and FRED_API_URL. yfinance's hosts are fixed, so
+install_yahoo_stand_in() replaces yfinance.Ticker in the app's process with a client of the stand-in.
+
+Usage (standalone; Polygon and FRED requests can then be pointed at it through the environment):
+    python -m benchmarks.upstreams --port 8900 --latency-ms 50 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+from xml.sax.saxutils import quoteattr
+
+UPSTREAMS = ("polygon", "fred", "yahoo")
+MARKET_OPEN_UTC = (14, 30)  # Yahoo timestamps daily bars at the market open (9:30 New York time)
+
+
+def _company_name(ticker):
+    return f"{ticker} Fixture Inc."
+
+
+class UpstreamState:
+    """
+    Fixture data and behaviour shared by the stand-in's request handlers.
+
+    :param latency_ms: Delay added to every response, in milliseconds.
+    :param jitter_ms: Maximum random delay added on top of latency_ms.
+    :param error_rate: Fraction of requests (0-1) answered with a 503.
+    :param seed: Seed of the latency and error draws.
+    """
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0):
+        from benchmarks.fixtures import OfflineData
+
+        self.offline = OfflineData()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {upstream: {"requests": 0, "errors": 0} for upstream in UPSTREAMS}
+        self.charts = {}  # Encoded chart responses, built on first request per ticker
+
+    def begin(self, upstream):
+        """
+        Counts a request, sleeps for the configured latency and decides whether it fails.
+
+        :return: True if the request must be answered with an injected error.
+        """
+        with self.lock:
+            delay = self.latency_ms + self.random.uniform(0, self.jitter_ms)
+            failed = self.random.random() < self.error_rate
+            self.stats[upstream]["requests"] += 1
+            self.stats[upstream]["errors"] += failed
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return failed
+
+    def chart(self, ticker):
+        """
+        Returns the encoded Yahoo chart response for a ticker, or None for an unknown ticker.
+        """
+        records = self.offline.stock_data.get(ticker)
+        if records is None:
+            return None
+        with self.lock:
+            if ticker not in self.charts:
+                hour, minute = MARKET_OPEN_UTC
+                timestamps = [
+                    int(datetime.strptime(record["Date"], "%Y-%m-%d").replace(hour=hour, minute=minute, tzinfo=timezone.utc).timestamp())
+                    for record in records
+                ]
+                quote_columns = {column.lower(): [record[column] for record in records] for column in ("Open", "High", "Low", "Close", "Volume")}
+                self.charts[ticker] = json.dumps({"chart": {"result": [{
+                    "meta": {"symbol": ticker, "longName": _company_name(ticker), "exchangeTimezoneName": "America/New_York"},
+                    "timestamp": timestamps,
+                    "indicators": {"quote": [quote_columns]},
+                }], "error": None}}).encode()
+            return self.charts[ticker]
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    """
+    Routes /polygon/..., /fred/... and /yahoo/... requests to the matching stand-in.
+    """
+    state = None  # UpstreamState, set by make_upstream_server
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep load tests quiet
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+
+        if parts == ["_stats"]:
+            with self.state.lock:
+                stats = json.dumps(self.state.stats).encode()
+            return self._send(200, "application/json", stats)
+        if not parts or parts[0] not in UPSTREAMS:
+            return self._send(404, "application/json", b'{"error": "unknown upstream"}')
+
+        upstream = parts[0]
+        failed = self.state.begin(upstream)
+        if upstream == "polygon":
+            self._polygon(parts[1:], params, failed)
+        elif upstream == "fred":
+            self._fred(parts[1:], params, failed)
+        else:
+            self._yahoo(parts[1:], params, failed)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _polygon(self, parts, params, failed):
+        if failed:
+            return self._send(503, "application/json", b'{"status": "ERROR", "error": "Service unavailable (injected)"}')
+        if parts != ["v3", "reference", "tickers"]:
+            return self._send(404, "application/json", b'{"status": "NOT_FOUND"}')
+        search = params.get("search", "").lower()
+        results = [
+            {"ticker": ticker, "name": _company_name(ticker), "market": "stocks", "active": True}
+            for ticker in self.state.offline.stock_data
+            if search in ticker.lower() or search in _company_name(ticker).lower()
+        ]
+        self._send(200, "application/json", json.dumps({"status": "OK", "count": len(results), "results": results}).encode())
+
+    def _fred(self, parts, params, failed):
+        if failed:
+            return self._send(503, "text/xml", b'<?xml version="1.0"?><error code="503" message="Service unavailable (injected)"/>')
+        series = self.state.offline.bond_rates.get(params.get("series_id"))
+        if parts != ["series", "observations"] or series is None:
+            return self._send(400, "text/xml", b'<?xml version="1.0"?><error code="400" message="Bad Request. The series does not exist."/>')
+        start = f"{params.get('observation_start', '0000-00-00')} 00:00:00"
+        end = f"{params.get('observation_end', '9999-12-31')} 00:00:00"
+        observations = "".join(
+            f"<observation date={quoteattr(rate['date'][:10])} value={quoteattr(str(rate['rate']))}/>"
+            for rate in series
+            if start <= rate["date"] <= end
+        )
+        self._send(200, "text/xml", f'<?xml version="1.0"?><observations>{observations}</observations>'.encode())
+
+    def _yahoo(self, parts, params, failed):
+        if failed:
+            return self._send(503, "application/json", b'{"chart": {"result": null, "error": {"code": "Unavailable", "description": "injected"}}}')
+        if len(parts) == 4 and parts[:3] == ["v8", "finance", "chart"]:
+            body = self.state.chart(parts[3].upper())
+            if body is not None:
+                return self._send(200, "application/json", body)
+        elif len(parts) == 4 and parts[:3] == ["v10", "finance", "quoteSummary"] and parts[3].upper() in self.state.offline.stock_data:
+            price = {"symbol": parts[3].upper(), "longName": _company_name(parts[3].upper())}
+            return self._send(200, "application/json", json.dumps({"quoteSummary": {"result": [{"price": price}], "error": None}}).encode())
+        self._send(404, "application/json", b'{"chart": {"result": null, "error": {"code": "Not Found", "description": "No data found"}}}')
+
+
+def make_upstream_server(port=0, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0):
+    """
+    Creates the threaded stand-in server on 127.0.0.1 (port 0 picks a free port).
+    """
+    handler = type("BoundUpstreamHandler", (UpstreamHandler,), {"state": UpstreamState(latency_ms, jitter_ms, error_rate, seed)})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_upstreams(port_queue, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0):
+    """
+    Process target: serves the stand-ins forever, after putting the bound port on port_queue.
+    """
+    server = make_upstream_server(0, latency_ms, jitter_ms, error_rate, seed)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def install_yahoo_stand_in(base_url):
+    """
+    Replaces yfinance.Ticker in this process with a client of the Yahoo stand-in at base_url, so
+    fetch_data and get_company_name go through the local server instead of Yahoo.
+
+    :param base_url: Base URL of the stand-in server (e.g., http://127.0.0.1:8900).
+    """
+    import urllib.request
+
+    import yfinance
+
+    def get_json(path):
+        with urllib.request.urlopen(f"{base_url}/yahoo/{path}", timeout=60) as response:
+            return json.loads(response.read())
+
+    class StandInTicker:
+        def __init__(self, ticker, session=None):
+            self.ticker = ticker.upper()
+
+        def history(self, period="max", interval="1d", **kwargs):
+            import pandas as pd
+
+            result = get_json(f"v8/finance/chart/{quote(self.ticker)}?range={period}&interval={interval}")["chart"]["result"][0]
+            columns = result["indicators"]["quote"][0]
+            index = pd.to_datetime(result["timestamp"], unit="s", utc=True).tz_convert(result["meta"]["exchangeTimezoneName"]).normalize()
+            frame = pd.DataFrame({column.capitalize(): columns[column] for column in ("open", "high", "low", "close", "volume")}, index=index)
+            frame.index.name = "Date"
+            frame["Dividends"] = 0.0
+            frame["Stock Splits"] = 0.0
+            return frame
+
+        @property
+        def info(self):
+            return get_json(f"v10/finance/quoteSummary/{quote(self.ticker)}")["quoteSummary"]["result"][0]["price"]
+
+    yfinance.Ticker = StandInTicker
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for the Polygon, FRED and Yahoo Finance APIs.")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every response.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Maximum random delay added on top of --latency-ms.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 503.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    upstream_server = make_upstream_server(args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    print(f"Serving upstream stand-ins on http://127.0.0.1:{args.port} (POLYGON_API_URL=.../polygon, FRED_API_URL=.../fred)")
+    upstream_server.serve_forever()
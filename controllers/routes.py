@@ -1,12 +1,20 @@
+import cProfile
+import json
 import logging
-from flask import jsonify, render_template, request
-from services.cache_service import clear_all_caches, search_tickers_with_cache, delete_data_cache_folder
-from services.simulation_service import run_simulations, SIMULATION_FUNCTIONS  # Import SIMULATION_FUNCTIONS
+import time
+from flask import Response, g, jsonify, render_template, request, stream_with_context
+from services.cache_service import clear_all_caches, search_tickers_with_cache, delete_data_cache_folder, CACHE_EXPIRATION, SEARCH_CACHE_EXPIRATION
+from services.simulation_service import run_simulations, run_simulation_batch, build_batch_scenarios, simulation_fingerprint
+from services.simulation_registry import SIMULATIONS, select_simulations
+from services.rolling_service import run_rolling_analysis
+from services.export_service import EXPORT_FORMATS, export_format_available, stream_export
 from services.plotting_service import generate_plot  # Import the plotting service
+from services.prefetch_service import record_simulation_request, request_warm_up, get_prefetch_status
+from services.job_service import submit_job, get_job, cancel_job, get_job_queue_status, JobQueueFull
+from services.admission_service import AdmissionRejected, admit, estimate_request_cost, estimate_rolling_cost, get_admission_status
+from utils.http_cache import add_cache_headers, body_etag, compress_response, is_not_modified, not_modified_response
+from utils.timing import span, start_request_timing, get_request_spans, record_span, format_server_timing, render_prometheus_metrics, format_profile
 from datetime import datetime, timedelta
-import plotly.graph_objs as go
-import plotly.io as pio
-import os
 
 # Configure logging
 logging.basicConfig(level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -18,6 +26,45 @@ def setup_routes(app):
     :param app: The Flask application instance.
     """
 
+    @app.before_request
+    def start_timing():
+        g.request_started = time.perf_counter()
+        start_request_timing()
+
+    @app.after_request
+    def add_server_timing(response):
+        """
+        Records the request duration and returns the per-request span breakdown in a Server-Timing header.
+        """
+        if "request_started" in g:
+            total = time.perf_counter() - g.request_started
+            record_span(f"request.{request.endpoint or 'unknown'}", total)
+            spans = get_request_spans() + [("total", total, 1)]
+            response.headers["Server-Timing"] = format_server_timing(spans)
+        return response
+
+    @app.after_request
+    def compress(response):
+        """
+        Compresses large text and JSON bodies for clients that accept gzip or brotli.
+        """
+        with span("compress"):
+            return compress_response(response)
+
+    def rejected_response(e):
+        """
+        Answers a request that was not admitted, telling the client when to retry.
+        """
+        headers = {"Retry-After": str(e.retry_after)} if e.retry_after else {}
+        return jsonify({"error": str(e)}), e.status, headers
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """
+        Exposes the aggregated span histograms in the Prometheus text format.
+        """
+        return render_prometheus_metrics(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
     @app.route("/search_tickers", methods=["GET"])
     def search_tickers():
         try:
@@ -32,7 +79,13 @@ def setup_routes(app):
                 else {"symbol": str(result), "name": ""}
                 for result in results
             ]
-            return jsonify({"results": tickers})
+            response = jsonify({"results": tickers})
+
+            # Repeat searches revalidate against a fingerprint of the results
+            etag = body_etag(response.get_data())
+            if is_not_modified(etag):
+                return not_modified_response(etag, SEARCH_CACHE_EXPIRATION)
+            return add_cache_headers(response, etag, SEARCH_CACHE_EXPIRATION)
         except Exception as e:
             logging.error(f"Error in search_tickers: {e}")
             return jsonify({"error": str(e)}), 500
@@ -50,6 +103,8 @@ def setup_routes(app):
     def delete_data_cache():
         try:
             delete_data_cache_folder()
+            # Repopulate the folder cache in the background so the next users don't pay cold-fetch latency
+            request_warm_up(refresh=True, reason="data_cache_deleted")
             return jsonify({"message": "data_cache folder deleted successfully."}), 200
         except Exception as e:
             logging.error(f"Error in delete_data_cache: {e}")
@@ -59,14 +114,52 @@ def setup_routes(app):
     def simulate():
         """
         Runs selected simulations based on the provided parameters and returns Plotly data and layout.
+        Pass profile=1 to attach a cProfile report to the response.
+
+        Responses carry an ETag fingerprinting the parameters and the data they read; a request whose
+        If-None-Match names the current ETag gets a 304 without running the simulations.
+
+        Requests are admitted by estimated cost: cheap ones share the interactive pool, expensive ones the
+        heavy pool, and requests over budget get a 413, 429 or 503 (with Retry-After).
         """
+        profiler = None
+        ticket = None
         try:
             # Collect errors
             errors = []
 
+            params = request.args.to_dict()
+            if params.pop("profile", None) == "1":
+                profiler = cProfile.Profile()
+                profiler.enable()
+
+            try:
+                select_simulations(params)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            record_simulation_request(params)
+
+            # Admitted before fingerprinting, which loads any data that is not in memory yet
+            try:
+                with span("admission"):
+                    ticket = admit(estimate_request_cost(params))
+            except AdmissionRejected as e:
+                return rejected_response(e)
+
+            etag = None
+            if not profiler:
+                try:
+                    with span("fingerprint"):
+                        etag = simulation_fingerprint(params)
+                except Exception as e:
+                    logging.error(f"Failed to fingerprint simulation request: {e}")
+                if is_not_modified(etag):
+                    return not_modified_response(etag, CACHE_EXPIRATION)
+
             # Run selected simulations and collect results
             all_balance_histories = []
-            simulation_results = run_simulations(request.args.to_dict())
+            all_metrics = []
+            simulation_results = run_simulations(params)
 
             for simulation, accounts in simulation_results.items():
                 if isinstance(accounts, list):  # Ensure the simulation returned a list of accounts
@@ -74,29 +167,324 @@ def setup_routes(app):
                         if not hasattr(account, "balance_history"):
                             raise AttributeError(f"Account in simulation '{simulation}' does not have 'balance_history'.")
                         all_balance_histories.append((account.name, account.balance_history))
+                        all_metrics.append({"simulation": simulation, "name": account.name, **(account.metrics or {})})
                 else:
                     logging.error(f"Simulation '{simulation}' returned an error: {accounts.get('error')}")
 
             # Generate the Plotly graph using the plotting service
-            fig = generate_plot(all_balance_histories)
+            fig = generate_plot(all_balance_histories, metrics=all_metrics)
 
             # Serialize the data and layout for JSON response
-            data = [trace.to_plotly_json() for trace in fig.data]
-            layout = fig.layout.to_plotly_json()
+            with span("serialize"):
+                data = [trace.to_plotly_json() for trace in fig.data]
+                layout = fig.layout.to_plotly_json()
+                payload = {"data": data, "layout": layout, "metrics": all_metrics}
+
+            if profiler:
+                profiler.disable()
+                payload["profile"] = format_profile(profiler)
 
             # Return the data and layout as JSON
-            return jsonify({"data": data, "layout": layout}), 200
+            with span("jsonify"):
+                response = jsonify(payload)
+            if profiler:
+                response.headers["Cache-Control"] = "no-store"
+            else:
+                add_cache_headers(response, etag, CACHE_EXPIRATION)
+            return response, 200
         except Exception as e:
             logging.error(f"Error in simulate: {e}", exc_info=True)
             return jsonify({"error": str(e)}), 500
+        finally:
+            if profiler:
+                profiler.disable()
+            if ticket:
+                ticket.release()
+
+    @app.route("/export", methods=["GET"])
+    def export():
+        """
+        Streams every account's full balance history for the /simulate parameters as CSV (format=csv, the
+        default), Parquet (format=parquet) or an Arrow IPC stream (format=arrow), row by row as the
+        simulations advance, without building the Plotly figure. Pass every=N to keep one monthly record
+        in N per account (plus its last one).
+
+        Responses carry an ETag like /simulate's; a matching If-None-Match gets a 304. Exports are admitted
+        like /simulate requests.
+        """
+        ticket = None
+        try:
+            params = request.args.to_dict()
+            export_format = params.pop("format", "csv")
+            every = params.pop("every", "1")
+            if not every.isdigit() or int(every) < 1:
+                return jsonify({"error": "every must be a positive integer."}), 400
+            every = int(every)
+            if export_format not in EXPORT_FORMATS:
+                return jsonify({"error": f"Unknown export format: {export_format}. Use one of: {', '.join(EXPORT_FORMATS)}."}), 400
+            if not export_format_available(export_format):
+                return jsonify({"error": f"The {export_format} export needs pyarrow, which is not installed."}), 501
+            try:
+                simulation_ids = select_simulations(params)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            record_simulation_request(params)
+
+            # Admitted before fingerprinting, which loads any data that is not in memory yet
+            try:
+                with span("admission"):
+                    ticket = admit(estimate_request_cost(params, simulation_ids))
+            except AdmissionRejected as e:
+                return rejected_response(e)
+
+            etag = None
+            try:
+                with span("fingerprint"):
+                    etag = simulation_fingerprint({**params, "format": export_format, "every": every})
+            except Exception as e:
+                logging.error(f"Failed to fingerprint export request: {e}")
+            if is_not_modified(etag):
+                return not_modified_response(etag, CACHE_EXPIRATION)
+
+            mimetype, extension = EXPORT_FORMATS[export_format]
+            response = Response(stream_with_context(stream_export(params, simulation_ids, export_format, every)), mimetype=mimetype)
+            response.headers["Content-Disposition"] = f'attachment; filename="simulation_export.{extension}"'
+            add_cache_headers(response, etag, CACHE_EXPIRATION)
+
+            # The slot is held until the response is closed, whether or not its body was sent (HEAD, disconnects)
+            response.call_on_close(ticket.release)
+            ticket = None
+            return response
+        except Exception as e:
+            logging.error(f"Error in export: {e}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+        finally:
+            if ticket:
+                ticket.release()
+
+    @app.route("/rolling_windows", methods=["GET"])
+    def rolling_windows():
+        """
+        Returns how a monthly DCA into each ticker would have done over every window of horizon_years
+        (default 10), one window per start month: the distribution of total returns (best, worst, mean,
+        percentiles) and the per-window series.
+
+        Takes tickers, initial_investment, monthly_investment and optional horizon_years, start_date and
+        end_date. Repeat requests revalidate against a fingerprint of the results. Requests are admitted
+        like /simulate, by the number of tickers and whether their data is loaded.
+        """
+        ticket = None
+        try:
+            params = request.args.to_dict()
+            try:
+                with span("admission"):
+                    ticket = admit(estimate_rolling_cost(params))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            except AdmissionRejected as e:
+                return rejected_response(e)
+
+            try:
+                with span("rolling"):
+                    result = run_rolling_analysis(params)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            with span("jsonify"):
+                response = jsonify(result)
+            etag = body_etag(response.get_data())
+            if is_not_modified(etag):
+                return not_modified_response(etag, CACHE_EXPIRATION)
+            return add_cache_headers(response, etag, CACHE_EXPIRATION)
+        except Exception as e:
+            logging.error(f"Error in rolling_windows: {e}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+        finally:
+            if ticket:
+                ticket.release()
+
+    @app.route("/simulate/batch", methods=["POST"])
+    def simulate_batch():
+        """
+        Runs many scenarios in one request and returns their results keyed by scenario id.
+
+        Expects a JSON body such as:
+            {"defaults": {...}, "scenarios": [{"id": "a", "tickers": "MSFT", ...}, ...], "stream": false}
+        Each scenario takes the same parameters as /simulate; "defaults" are merged into every scenario.
+        Scenarios without an id are keyed by their position. With "stream": true, each scenario is sent as
+        a line of newline-delimited JSON as soon as it finishes.
+
+        A batch is admitted as one request costing the sum of its scenarios.
+        """
+        ticket = None
+        try:
+            body = request.get_json(silent=True)
+            try:
+                scenarios = build_batch_scenarios(body)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            for params in scenarios.values():
+                record_simulation_request(params)
+
+            try:
+                with span("admission"):
+                    ticket = admit(sum(estimate_request_cost(params) for params in scenarios.values()))
+            except AdmissionRejected as e:
+                return rejected_response(e)
+
+            if body.get("stream"):
+                def generate():
+                    for scenario_id, results in run_simulation_batch(scenarios):
+                        yield json.dumps({"id": scenario_id, "results": results}) + "\n"
+
+                # The slot is held until the response is closed, whether or not its body was sent (HEAD, disconnects)
+                response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+                response.call_on_close(ticket.release)
+                ticket = None
+                return response
+
+            results = dict(run_simulation_batch(scenarios))
+            with span("jsonify"):
+                response = jsonify({"results": {scenario_id: results[scenario_id] for scenario_id in scenarios}})
+            return response, 200
+        except Exception as e:
+            logging.error(f"Error in simulate_batch: {e}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+        finally:
+            if ticket:
+                ticket.release()
+
+    @app.route("/jobs", methods=["POST"])
+    def create_job():
+        """
+        Queues a simulation to run in the background and returns its job id immediately.
+
+        The JSON body holds the /simulate parameters, or a /simulate/batch body ("scenarios" and optional
+        "defaults") to run a batch of scenarios as one job.
+        """
+        try:
+            body = request.get_json(silent=True)
+            if not isinstance(body, dict):
+                return jsonify({"error": "A JSON object body is required."}), 400
+            if "scenarios" in body:
+                try:
+                    params = {"scenarios": build_batch_scenarios(body)}
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+                for scenario_params in params["scenarios"].values():
+                    record_simulation_request(scenario_params)
+            else:
+                params = body
+                try:
+                    select_simulations(params)
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+                record_simulation_request(params)
+
+            job_id = submit_job(params)
+            return jsonify({
+                "job_id": job_id,
+                "status_url": f"/jobs/{job_id}",
+                "result_url": f"/jobs/{job_id}/result",
+            }), 202
+        except JobQueueFull as e:
+            return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+        except Exception as e:
+            logging.error(f"Error in create_job: {e}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/jobs/<job_id>", methods=["GET"])
+    def job_status(job_id):
+        """
+        Returns a job's status and progress (0.0 to 1.0).
+        """
+        try:
+            job = get_job(job_id)
+            if job is None:
+                return jsonify({"error": f"Job not found: {job_id}"}), 404
+            return jsonify(job), 200
+        except Exception as e:
+            logging.error(f"Error in job_status: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/jobs/<job_id>/result", methods=["GET"])
+    def job_result(job_id):
+        """
+        Returns a finished job's results. Responds 202 with the status while the job is still pending.
+        """
+        try:
+            job = get_job(job_id, include_result=True)
+            if job is None:
+                return jsonify({"error": f"Job not found: {job_id}"}), 404
+            if job["status"] in ("queued", "running"):
+                job.pop("result")
+                return jsonify(job), 202
+            if job["status"] != "succeeded":
+                return jsonify({"error": job["error"] or f"Job {job['status']}.", "status": job["status"]}), 409
+            with span("jsonify"):
+                response = jsonify(job["result"])
+            return response, 200
+        except Exception as e:
+            logging.error(f"Error in job_result: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/jobs/<job_id>", methods=["DELETE"])
+    def delete_job(job_id):
+        """
+        Cancels a queued or running job.
+        """
+        try:
+            job = cancel_job(job_id)
+            if job is None:
+                return jsonify({"error": f"Job not found: {job_id}"}), 404
+            return jsonify(job), 200
+        except Exception as e:
+            logging.error(f"Error in delete_job: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/job_queue_status", methods=["GET"])
+    def job_queue_status():
+        """
+        Returns this process's job worker pool size and its numbers of waiting and running jobs.
+        """
+        try:
+            return jsonify(get_job_queue_status()), 200
+        except Exception as e:
+            logging.error(f"Error in job_queue_status: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/prefetch_status", methods=["GET"])
+    def prefetch_status():
+        """
+        Returns the status of the background cache warm-up scheduler.
+        """
+        try:
+            return jsonify(get_prefetch_status()), 200
+        except Exception as e:
+            logging.error(f"Error in prefetch_status: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/admission_status", methods=["GET"])
+    def admission_status():
+        """
+        Returns the admission limits and the live state of the interactive and heavy pools.
+        """
+        try:
+            return jsonify(get_admission_status()), 200
+        except Exception as e:
+            logging.error(f"Error in admission_status: {e}")
+            return jsonify({"error": str(e)}), 500
 
     @app.route("/available_simulations", methods=["GET"])
     def available_simulations():
         """
-        Returns a list of available simulations based on the SIMULATION_FUNCTIONS dictionary.
+        Returns the registered simulations with their parameters, data requirements and cost hints.
         """
         try:
-            simulations = [{"id": key, "name": key.replace("_", " ").title()} for key in SIMULATION_FUNCTIONS.keys()]
+            simulations = [
+                {key: declaration[key] for key in ("id", "name", "parameters", "data", "columns", "cost")}
+                for declaration in SIMULATIONS.values()
+            ]
             return jsonify({"simulations": simulations})
         except Exception as e:
             logging.error(f"Error fetching available simulations: {e}")
@@ -105,14 +493,8 @@ def setup_routes(app):
     @app.route("/", methods=["GET"])
     def index():
         try:
-            # Dynamically fetch simulation files from the simulations folder
-            simulations_dir = os.path.join(os.path.dirname(__file__), "../simulations")
-            simulation_files = [
-                os.path.splitext(file)[0] for file in os.listdir(simulations_dir) if file.endswith(".py") and file != "__init__.py"
-            ]
-            simulations = [
-                {"id": sim, "name": sim.replace("_", " ").title()} for sim in simulation_files
-            ]
+            # Simulations discovered once at startup by the registry
+            simulations = [{"id": declaration["id"], "name": declaration["name"]} for declaration in SIMULATIONS.values()]
             # Pass datetime and timedelta to the template
             return render_template("index.html", simulations=simulations, datetime=datetime, timedelta=timedelta)
         except Exception as e:
@@ -1,11 +1,9 @@
 import os
-import json
 from datetime import date, timedelta
-from fredapi import Fred
-from beautify import beautify_json_in_directory
 from dateutil.relativedelta import relativedelta  # Import relativedelta for precise date calculations
-from beautify import beautify_json_async
 import logging
+from utils.disk_cache import CACHE_EXTENSION, load_cached_records, records_digest, save_cached_records
+from utils.timing import span, timed
 
 def calculate_date_range(period):
     """
@@ -27,8 +25,13 @@ def calculate_date_range(period):
 
 # In-memory cache for bond rates
 bond_rates_cache = {}
+# Versions of the cached bond rates, keyed like bond_rates_cache
+bond_rates_version_cache = {}
+# Overrides fredapi's root URL (https://api.stlouisfed.org/fred), e.g., to point at a local stand-in
+FRED_API_URL = os.getenv("FRED_API_URL")
 
-def fetch_bond_rates(api_key, period="10y", series_id="DGS10", start_date=None, end_date=None, skip_beautify=False):
+@timed("fetch_bond_rates")
+def fetch_bond_rates(api_key, period="10y", series_id="DGS10", start_date=None, end_date=None, skip_beautify=False, refresh=False):
     """
     Fetches historical bond rates from FRED using an in-memory cache, folder cache, or API call.
 
@@ -37,7 +40,8 @@ def fetch_bond_rates(api_key, period="10y", series_id="DGS10", start_date=None,
     :param series_id: FRED series ID for bond rates (default: 10-year Treasury rate, "DGS10").
     :param start_date: Start date for fetching bond rates (YYYY-MM-DD). Optional.
     :param end_date: End date for fetching bond rates (YYYY-MM-DD). Optional.
-    :param skip_beautify: If True, skips JSON beautification.
+    :param skip_beautify: Unused; kept for compatibility (the folder cache is no longer JSON).
+    :param refresh: If True, skips both caches and refetches from the API, overwriting the cached data.
     :return: List of bond rates as dictionaries with "date" and "rate" keys.
     """
     # Calculate start_date and end_date if not provided
@@ -47,49 +51,81 @@ def fetch_bond_rates(api_key, period="10y", series_id="DGS10", start_date=None,
     cache_key = f"{series_id}_{start_date}_{end_date}"
 
     # Check in-memory cache
-    if cache_key in bond_rates_cache:
+    if not refresh and cache_key in bond_rates_cache:
         logging.info(f"Cache hit (memory) for bond rates: {cache_key}")
         return bond_rates_cache[cache_key]
 
     bond_data_folder = "data_cache/bond_data"
     os.makedirs(bond_data_folder, exist_ok=True)
-    file_path = f"{bond_data_folder}/{cache_key}.json"
-
-    # Check folder cache
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, "r") as f:
-                cached_data = json.load(f)
-                bond_rates_cache[cache_key] = cached_data  # Update in-memory cache
-                logging.info(f"Cache hit (folder) for bond rates: {cache_key}")
-                return cached_data
-        except json.JSONDecodeError:
-            logging.warning(f"Invalid JSON format in cache file: {file_path}. Deleting the file and refetching data.")
-            os.remove(file_path)
+    file_path = f"{bond_data_folder}/{cache_key}{CACHE_EXTENSION}"
+
+    # Check folder cache (a corrupt or truncated file falls through to a refetch that replaces it)
+    if not refresh:
+        cached_data = load_cached_records(file_path, source="fred")
+        if cached_data is not None:
+            bond_rates_cache[cache_key] = cached_data  # Update in-memory cache
+            logging.info(f"Cache hit (folder) for bond rates: {cache_key}")
+            return cached_data
 
     # Fetch data from FRED API
     logging.info(f"Fetching bond rates from API for: {cache_key}")
-    fred = Fred(api_key=api_key)
-    rates = fred.get_series(series_id, observation_start=start_date, observation_end=end_date)
+    from fredapi import Fred  # Imported lazily to keep app startup fast
+
+    with span("fred.get_series"):
+        fred = Fred(api_key=api_key)
+        if FRED_API_URL:
+            fred.root_url = FRED_API_URL
+        rates = fred.get_series(series_id, observation_start=start_date, observation_end=end_date)
     rates = rates.ffill()  # Forward-fill missing values
     rates_list = [{"date": str(date), "rate": rate} for date, rate in rates.to_dict().items()]
 
     # Save to folder cache
-    with open(file_path, "w") as f:
-        json.dump(rates_list, f)
-        logging.info(f"Bond data saved to cache for {start_date} to {end_date}.")
+    save_cached_records(file_path, rates_list, source="fred")
+    logging.info(f"Bond data saved to cache for {start_date} to {end_date}.")
 
-    # Update in-memory cache
+    # Update in-memory cache, dropping checkpoints computed from rates this refetch revised
+    from services.cache_service import drop_revised_checkpoints
+    drop_revised_checkpoints(series_id, bond_rates_cache.get(cache_key), rates_list, "date", "rate")
     bond_rates_cache[cache_key] = rates_list
 
-    # Beautify the JSON file
-    try:
-        beautify_json_in_directory(bond_data_folder, skip_beautify=skip_beautify)
-    except Exception as e:
-        logging.error(f"Error beautifying bond JSON files: {e}")
-
     return rates_list
 
+def get_bond_rates_cache_state(series_id, start_date, end_date):
+    """
+    Reports where a series' rates for a date range would be read from without loading them.
+
+    :return: "memory", "disk" (folder cache) or None (needs an API call).
+    """
+    cache_key = f"{series_id}_{start_date}_{end_date}"
+    if cache_key in bond_rates_cache:
+        return "memory"
+    if os.path.exists(f"data_cache/bond_data/{cache_key}{CACHE_EXTENSION}"):
+        return "disk"
+    return None
+
+def get_bond_rates_version(api_key, start_date, end_date, series_id="DGS10"):
+    """
+    Returns a short fingerprint of the bond rates for a date range (last date and a digest of every date
+    and rate), which changes whenever a refetch revises past rates. It is computed once per load of the rates.
+
+    :param api_key: FRED API key.
+    :param start_date: Start date (YYYY-MM-DD or date).
+    :param end_date: End date (YYYY-MM-DD or date).
+    :param series_id: FRED series ID (default: "DGS10").
+    :return: The version string.
+    """
+    rates = fetch_bond_rates(api_key, series_id=series_id, start_date=start_date, end_date=end_date)
+    if not rates:
+        return "empty"
+
+    # Recompute whenever the cached rates were replaced (refetch, refresh or reload from disk)
+    cache_key = f"{series_id}_{start_date}_{end_date}"
+    entry = bond_rates_version_cache.get(cache_key)
+    if entry is None or entry[0] is not rates:
+        entry = (rates, f"{rates[-1]['date'][:10]}:{records_digest(rates, 'date', 'rate')}")
+        bond_rates_version_cache[cache_key] = entry
+    return entry[1]
+
 # Main function to test the FRED data fetching
 if __name__ == "__main__":
     from dotenv import load_dotenv
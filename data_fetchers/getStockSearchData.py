@@ -2,10 +2,14 @@ import requests
 import os
 import logging
 from dotenv import load_dotenv
+from utils.timing import span
 
 # Load environment variables from secrets.env
 load_dotenv(dotenv_path="./secrets.env")
 
+# Base URL of the Polygon API (overridable, e.g., to point at a local stand-in)
+POLYGON_API_URL = os.getenv("POLYGON_API_URL", "https://api.polygon.io")
+
 # Cache for storing search results
 search_cache = {}
 
@@ -25,8 +29,9 @@ def search_stock_tickers(query):
     if not api_key:
         raise ValueError("POLYGON_API_KEY is not set in the environment.")
 
-    url = f"https://api.polygon.io/v3/reference/tickers?search={query}&active=true&apiKey={api_key}"
-    response = requests.get(url)
+    url = f"{POLYGON_API_URL}/v3/reference/tickers?search={query}&active=true&apiKey={api_key}"
+    with span("polygon.search"):
+        response = requests.get(url)
 
     if response.status_code != 200:
         raise Exception(f"Failed to fetch stock tickers: {response.status_code} - {response.text}")
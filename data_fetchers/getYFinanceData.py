@@ -1,87 +1,141 @@
 import os
-import json
-from beautify import beautify_json_async, beautify_json_in_directory
-import yfinance as yf
 import logging
+from utils.disk_cache import CACHE_EXTENSION, load_cached_records, records_digest, save_cached_records
+from utils.timing import span, timed
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # In-memory cache for stock data
 stock_data_cache = {}
+# Derived per-ticker price indexes, keyed like stock_data_cache
+price_index_cache = {}
+# Versions of the cached price series, keyed like stock_data_cache
+data_version_cache = {}
 
-def fetch_data(tickers=["AAPL", "TSLA", "MSFT"], period="max", skip_beautify=False):
+@timed("fetch_data")
+def fetch_data(tickers=["AAPL", "TSLA", "MSFT"], period="max", skip_beautify=False, refresh=False):
     """
     Fetches stock data for the given tickers using an in-memory cache, folder cache, or API call.
 
     :param tickers: List of stock tickers to fetch data for.
     :param period: Period for which to fetch the data (e.g., "1y", "5y").
-    :param skip_beautify: If True, skips JSON beautification.
+    :param skip_beautify: Unused; kept for compatibility (the folder cache is no longer JSON).
+    :param refresh: If True, skips both caches and refetches from the API, overwriting the cached data.
     :return: Dictionary of fetched stock data.
     """
     stock_data_folder = f"data_cache/stock_data/{period}"
     os.makedirs(stock_data_folder, exist_ok=True)
 
     fetched_data = {}
-    fetched_from_api = False  # Track if any data is fetched from the API
 
     for ticker in tickers:
         cache_key = f"{ticker}_{period}"
 
         # Check in-memory cache
-        if cache_key in stock_data_cache:
+        if not refresh and cache_key in stock_data_cache:
             logging.info(f"Cache hit (memory) for stock data: {cache_key}")
             fetched_data[ticker] = stock_data_cache[cache_key]
             continue
 
-        file_path = f"{stock_data_folder}/{ticker}.json"
-
-        # Check folder cache
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, "r") as f:
-                    cached_data = json.load(f)
-                    stock_data_cache[cache_key] = cached_data  # Update in-memory cache
-                    fetched_data[ticker] = cached_data
-                    logging.info(f"Cache hit (folder) for stock data: {cache_key}")
-                    continue
-            except json.JSONDecodeError:
-                logging.warning(f"Invalid JSON format in cache file: {file_path}. Deleting the file and refetching data.")
-                os.remove(file_path)
+        file_path = f"{stock_data_folder}/{ticker}{CACHE_EXTENSION}"
+
+        # Check folder cache (a corrupt or truncated file falls through to a refetch that replaces it)
+        if not refresh:
+            cached_data = load_cached_records(file_path, source="yfinance")
+            if cached_data is not None:
+                stock_data_cache[cache_key] = cached_data  # Update in-memory cache
+                fetched_data[ticker] = cached_data
+                logging.info(f"Cache hit (folder) for stock data: {cache_key}")
+                continue
 
         # Fetch data from Yahoo Finance API
         logging.info(f"Fetching stock data from API for: {ticker}")
         try:
-            ticker_data = yf.Ticker(ticker)
-            df = ticker_data.history(period=period)
+            import yfinance as yf  # Imported lazily to keep app startup fast
+
+            with span("yfinance.history"):
+                ticker_data = yf.Ticker(ticker)
+                df = ticker_data.history(period=period)
             df = df.reset_index()                          # Turn the date index into a column
             df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')# Format date as "YYYY-MM-DD"
 
             records = df.to_dict(orient='records')
 
             # Save to folder cache
-            with open(file_path, "w") as f:
-                json.dump(records, f)
-                logging.info(f"New data saved to cache for {ticker} under period {period}.")
+            save_cached_records(file_path, records, source="yfinance")
+            logging.info(f"New data saved to cache for {ticker} under period {period}.")
 
-            # Update in-memory cache
+            # Update in-memory cache, dropping checkpoints computed from closes this refetch revised
+            from services.cache_service import drop_revised_checkpoints
+            drop_revised_checkpoints(ticker, stock_data_cache.get(cache_key), records, "Date", "Close")
             stock_data_cache[cache_key] = records
             fetched_data[ticker] = records
-
-            fetched_from_api = True  # Mark that data was fetched from the API
         except Exception as e:
             logging.error(f"Error fetching data for {ticker}: {e}")
 
-    # Beautify the JSON files only if data was fetched from the API
-    if fetched_from_api:
-        try:
-            beautify_json_in_directory(stock_data_folder, skip_beautify=skip_beautify)
-            logging.info("Stock JSON files beautified successfully.")
-        except Exception as e:
-            logging.error(f"Error beautifying stock JSON files: {e}")
-
     return fetched_data
 
+def get_cache_state(ticker, period="max"):
+    """
+    Reports where a ticker's data would be read from without loading it.
+
+    :return: "memory", "disk" (folder cache) or None (needs an API call).
+    """
+    if f"{ticker}_{period}" in stock_data_cache:
+        return "memory"
+    if os.path.exists(f"data_cache/stock_data/{period}/{ticker}{CACHE_EXTENSION}"):
+        return "disk"
+    return None
+
+def get_price_index(ticker, period="max"):
+    """
+    Returns the monthly trading-day index for a ticker, building it once per load of its price data.
+
+    :param ticker: The stock ticker.
+    :param period: The data period (must match the one used with fetch_data).
+    :return: A PriceIndex, or None if no data is available for the ticker.
+    """
+    from utils.price_index import PriceIndex  # Imported lazily to keep app startup fast
+
+    cache_key = f"{ticker}_{period}"
+    records = stock_data_cache.get(cache_key)
+    if records is None:
+        records = fetch_data(tickers=[ticker], period=period).get(ticker)
+        if records is None:
+            return None
+
+    # Rebuild whenever the cached records were replaced (refetch, refresh or reload from disk)
+    price_index = price_index_cache.get(cache_key)
+    if price_index is None or price_index.source is not records:
+        price_index = PriceIndex(records)
+        price_index_cache[cache_key] = price_index
+    return price_index
+
+def get_data_version(ticker, period="max"):
+    """
+    Returns a short fingerprint of the cached price series for a ticker (last date and a digest of every
+    date and close), which changes whenever the series is extended or a refetch re-adjusts past closes.
+    It is computed once per load of the price data.
+
+    :param ticker: The stock ticker.
+    :param period: The data period (must match the one used with fetch_data).
+    :return: The version string, or None if no data is available for the ticker.
+    """
+    cache_key = f"{ticker}_{period}"
+    records = stock_data_cache.get(cache_key)
+    if records is None:
+        records = fetch_data(tickers=[ticker], period=period).get(ticker)
+    if not records:
+        return None
+
+    # Recompute whenever the cached records were replaced (refetch, refresh or reload from disk)
+    entry = data_version_cache.get(cache_key)
+    if entry is None or entry[0] is not records:
+        entry = (records, f"{records[-1]['Date']}:{records_digest(records, 'Date', 'Close')}")
+        data_version_cache[cache_key] = entry
+    return entry[1]
+
 # main function to run the test
 if __name__ == "__main__":
     results = fetch_data()  # Call the test function directly # Beautify the JSON files in the data_cache directory
@@ -0,0 +1,125 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from data_fetchers.getFREDData import bond_rates_cache, calculate_date_range, fetch_bond_rates
+from utils.disk_cache import CACHE_EXTENSION, load_cached_records, save_cached_records
+from utils.timing import timed
+
+# Constant-maturity Treasury series on FRED and their tenors in months
+TREASURY_TENORS = {
+    "DGS1MO": 1,
+    "DGS3MO": 3,
+    "DGS6MO": 6,
+    "DGS1": 12,
+    "DGS2": 24,
+    "DGS3": 36,
+    "DGS5": 60,
+    "DGS7": 84,
+    "DGS10": 120,
+    "DGS20": 240,
+    "DGS30": 360,
+}
+# Series fetched when no series are specified, and the number fetched at once
+YIELD_CURVE_SERIES = [s.strip() for s in os.getenv("YIELD_CURVE_SERIES", "DGS3MO,DGS1,DGS2,DGS5,DGS10").split(",") if s.strip()]
+YIELD_CURVE_FETCH_WORKERS = int(os.getenv("YIELD_CURVE_FETCH_WORKERS", "4"))
+
+# In-memory cache for aligned yield curves
+yield_curve_cache = {}
+
+
+def series_for_maturities(maturity_months):
+    """
+    Returns the fewest Treasury series needed to price the given maturities: the series of the tenors
+    at or just below and at or just above each maturity (a single series when a tenor matches exactly).
+
+    :param maturity_months: Iterable of maturities in months.
+    :return: List of FRED series IDs sorted by tenor.
+    """
+    by_tenor = sorted(TREASURY_TENORS.items(), key=lambda item: item[1])
+    needed = set()
+    for months in maturity_months:
+        below = [series_id for series_id, tenor in by_tenor if tenor <= months]
+        above = [series_id for series_id, tenor in by_tenor if tenor >= months]
+        needed.update(series_id for series_id in (below[-1:] + above[:1]))
+    return [series_id for series_id, _ in by_tenor if series_id in needed]
+
+
+def _is_newer_than_series(file_path, series_ids, start_date, end_date):
+    """
+    Checks that a cached curve file exists and was written after the cache files of its series.
+    """
+    if not os.path.exists(file_path):
+        return False
+    saved = os.path.getmtime(file_path)
+    for series_id in series_ids:
+        series_path = f"data_cache/bond_data/{series_id}_{start_date}_{end_date}{CACHE_EXTENSION}"
+        if os.path.exists(series_path) and os.path.getmtime(series_path) > saved:
+            return False
+    return True
+
+
+@timed("fetch_yield_curve")
+def fetch_yield_curve(api_key, series_ids=None, period="10y", start_date=None, end_date=None, refresh=False):
+    """
+    Fetches several Treasury series in parallel and aligns them into one forward-filled (dates x tenors)
+    matrix, using an in-memory cache, folder cache, or the per-series fetches of fetch_bond_rates.
+
+    The curve is rebuilt whenever its series were reloaded into memory or their cache files rewritten
+    (e.g., by a prefetch refresh), so it never lags the rates the rest of the app reads.
+
+    :param api_key: FRED API key.
+    :param series_ids: FRED series IDs of the tenors to include (default: YIELD_CURVE_SERIES).
+    :param period: Period for fetching the rates (e.g., "10y"). Ignored if start_date and end_date are provided.
+    :param start_date: Start date (YYYY-MM-DD or date). Optional.
+    :param end_date: End date (YYYY-MM-DD or date). Optional.
+    :param refresh: If True, refetches every series from the API and rebuilds the curve.
+    :return: YieldCurve with a rates_on(days, maturity_months) lookup.
+    """
+    from utils.yield_curve import YieldCurve  # Imported lazily to keep app startup fast
+
+    series_ids = sorted(dict.fromkeys(series_ids or YIELD_CURVE_SERIES), key=lambda series_id: TREASURY_TENORS[series_id])
+    if not start_date or not end_date:
+        start_date, end_date = calculate_date_range(period)
+    cache_key = f"curve_{'-'.join(series_ids)}_{start_date}_{end_date}"
+
+    # Check in-memory cache, against the series currently loaded (if any)
+    loaded = [bond_rates_cache.get(f"{series_id}_{start_date}_{end_date}") for series_id in series_ids]
+    curve = yield_curve_cache.get(cache_key)
+    if not refresh and curve is not None and (
+        all(source is records for source, records in zip(curve.sources, loaded)) if curve.sources is not None
+        else all(records is None for records in loaded)
+    ):
+        logging.info(f"Cache hit (memory) for yield curve: {cache_key}")
+        return curve
+
+    bond_data_folder = "data_cache/bond_data"
+    file_path = f"{bond_data_folder}/{cache_key}{CACHE_EXTENSION}"
+
+    # Check folder cache, unless the series are already in memory (aligning them is cheaper than reading the
+    # file) or one of their files was rewritten since the curve was saved
+    if not refresh and not all(records is not None for records in loaded) and _is_newer_than_series(file_path, series_ids, start_date, end_date):
+        cached_data = load_cached_records(file_path, source="fred")
+        if cached_data is not None:
+            curve = YieldCurve.from_records(cached_data, TREASURY_TENORS)
+            yield_curve_cache[cache_key] = curve
+            logging.info(f"Cache hit (folder) for yield curve: {cache_key}")
+            return curve
+
+    # Fetch the series in parallel (each through fetch_bond_rates' own caches) and align them
+    logging.info(f"Building yield curve from series for: {cache_key}")
+    with ThreadPoolExecutor(max_workers=max(1, min(YIELD_CURVE_FETCH_WORKERS, len(series_ids)))) as executor:
+        futures = {
+            series_id: executor.submit(fetch_bond_rates, api_key, series_id=series_id, start_date=start_date, end_date=end_date, refresh=refresh)
+            for series_id in series_ids
+        }
+        series_records = {series_id: future.result() for series_id, future in futures.items()}
+    curve = YieldCurve.from_series(series_records, TREASURY_TENORS)
+
+    # Save to folder cache
+    os.makedirs(bond_data_folder, exist_ok=True)
+    save_cached_records(file_path, curve.to_records(), source="fred")
+
+    # Update in-memory cache
+    yield_curve_cache[cache_key] = curve
+
+    return curve
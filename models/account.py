@@ -1,8 +1,13 @@
 from datetime import date, datetime
 
+from utils.money import from_cents, shares_affordable, to_cents
+
 class Account:
     """
     Represents a generic investment account that tracks balance, investments, and assets (e.g., shares, bonds).
+
+    Money is held in integer cents (balance_cents, total_invested_cents); balance and total_invested read
+    and write dollars.
     """
     def __init__(self, date: date, initial_balance=0, name="Unnamed Account"):
         """
@@ -12,11 +17,34 @@ class Account:
         :param name: The name of the account (e.g., ticker or identifier).
         """
         self.name = name
-        self.balance = initial_balance
-        self.total_invested = initial_balance
+        self.balance_cents = to_cents(initial_balance)
+        self.total_invested_cents = self.balance_cents
         self.assets = 0  # Represents the quantity of assets (e.g., shares, bonds)
-        self.history = [{"timestamp": date, "balance": initial_balance}]  # Track balance changes with timestamps
-        self.balance_history = [{"date": date.strftime("%Y-%m-%d"), "account_balance": initial_balance}]  # Use current date
+        self.history = [{"timestamp": date, "balance": self.balance}]  # Track balance changes with timestamps
+        self.balance_history = [{"date": date.strftime("%Y-%m-%d"), "account_balance": self.balance}]  # Use current date
+        self.metrics = None  # Performance metrics, computed once after the simulation (see attach_metrics)
+
+    @property
+    def balance(self):
+        """
+        The balance in dollars.
+        """
+        return from_cents(self.balance_cents)
+
+    @balance.setter
+    def balance(self, amount):
+        self.balance_cents = to_cents(amount)
+
+    @property
+    def total_invested(self):
+        """
+        The total amount invested in dollars.
+        """
+        return from_cents(self.total_invested_cents)
+
+    @total_invested.setter
+    def total_invested(self, amount):
+        self.total_invested_cents = to_cents(amount)
 
     def add_funds(self, amount, date):
         """
@@ -24,22 +52,25 @@ class Account:
 
         :param amount: The amount to add to the account.
         """
-        self.balance += amount
-        self.total_invested += amount
+        amount_cents = to_cents(amount)
+        self.balance_cents += amount_cents
+        self.total_invested_cents += amount_cents
         self._record_history(date)
 
-    def buy_assets(self, price):
+    def buy_assets(self, price, date):
         """
-        Buys assets (e.g., shares, bonds) using the available balance.
+        Buys as many whole assets (e.g., shares, bonds) as the available balance covers.
 
         :param price: The price of a single asset.
+        :param date: The date of the purchase.
         :return: The number of assets bought.
         """
-        if price > 0 and self.balance >= price:
-            assets_bought = self.balance // price
+        assets_bought = shares_affordable(self.balance_cents, price)
+        cost_cents = to_cents(assets_bought * price)
+        if assets_bought > 0 and cost_cents <= self.balance_cents:
             self.assets += assets_bought
-            self.balance -= assets_bought * price
-            self._record_history()
+            self.balance_cents -= cost_cents
+            self._record_history(date)
             return assets_bought
         return 0
 
@@ -50,7 +81,7 @@ class Account:
         :param asset_price: The current price of a single asset.
         :return: The total portfolio value.
         """
-        return self.assets * asset_price + self.balance
+        return from_cents(to_cents(self.assets * asset_price) + self.balance_cents)
 
     def deduct_funds(self, date, amount):
         """
@@ -58,8 +89,9 @@ class Account:
 
         :param amount: The amount to deduct.
         """
-        if self.balance >= amount:
-            self.balance -= amount
+        amount_cents = to_cents(amount)
+        if self.balance_cents >= amount_cents:
+            self.balance_cents -= amount_cents
             self._record_history(date)
 
     def _record_history(self, date):
@@ -73,10 +105,19 @@ class Account:
         Records the balance for a specific date.
 
         :param date: The date for which the balance is being recorded.
-        :param balance: The balance to record.
+        :param balance: The balance to record (rounded to the cent).
+        """
+        self.record_balance_cents(date, to_cents(balance))
+
+    def record_balance_cents(self, date, balance_cents):
+        """
+        Records the balance, given in cents, for a specific date.
+
+        :param date: The date for which the balance is being recorded.
+        :param balance_cents: The balance to record in cents.
         """
-        self.balance = balance
-        self.balance_history.append({"date": date.strftime("%Y-%m-%d"), "account_balance": balance})
+        self.balance_cents = balance_cents
+        self.balance_history.append({"date": date.strftime("%Y-%m-%d"), "account_balance": self.balance})
 
     def get_balance_history(self):
         """
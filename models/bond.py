@@ -1,5 +1,7 @@
 from datetime import date, timedelta
 
+from utils.money import from_cents, interest_cents, percent_to_basis_points, to_cents
+
 class Bond:
     """
     Represents an individual bond purchase.
@@ -7,10 +9,11 @@ class Bond:
     :param investment: Initial investment amount for the bond.
     :param purchase_date: The date the bond was purchased.
     :param maturity_date: The date when the bond matures and can be cashed in.
-    :param annual_yield: Annual yield of the bond (as a decimal, e.g., 0.05 for 5%).
+    :param annual_yield: Annual yield of the bond in percent (e.g., 5 for 5%).
     """
     def __init__(self, investment, purchase_date, maturity_date, annual_yield):
         self.investment = investment
+        self.investment_cents = to_cents(investment)
         self.purchase_date = purchase_date  # Store the purchase date
         self.maturity_date = maturity_date
         self.annual_yield = annual_yield  # Store the annual yield at the time of purchase
@@ -25,18 +28,30 @@ class Bond:
         """
         Returns the current value of the bond.
         """
-        return self.investment
+        return from_cents(self.investment_cents)
+
+    def get_value_cents(self):
+        """
+        Returns the current value of the bond in cents.
+        """
+        return self.investment_cents
 
     def get_matured_value(self):
         """
         Returns the total value of the bond upon maturity, including the face amount and interest.
         """
+        return from_cents(self.get_matured_value_cents())
+
+    def get_matured_value_cents(self):
+        """
+        Returns the total value of the bond upon maturity in cents; the interest is rounded to the cent once.
+        """
         # Calculate the term of the bond in months
         term_in_months = (self.maturity_date.year - self.purchase_date.year) * 12 + (self.maturity_date.month - self.purchase_date.month)
         # Derive interest based on the term and the bond's stored annual yield
-        interest = self.investment * (self.annual_yield / 100) * (term_in_months / 12)
+        interest = interest_cents(self.investment_cents, percent_to_basis_points(self.annual_yield), term_in_months)
         # Return the face amount (investment) plus the interest
-        return round(self.investment + interest, 2)
+        return self.investment_cents + interest
 
     def __str__(self):
         """
@@ -1,3 +1,16 @@
+import numpy as np
+
+# Structured record for holding many call contracts in a single NumPy array
+OPTION_DTYPE = np.dtype([
+    ("strike_price", "f8"),      # Strike price per share
+    ("purchase_date", "M8[D]"),  # Date the contracts were bought
+    ("execution_date", "M8[D]"), # Expiry date
+    ("quantity", "f8"),          # Number of underlying shares covered (fractional)
+    ("premium", "f8"),           # Total premium paid
+    ("executed", "?"),           # Whether the contracts have been settled
+])
+
+
 class Option:
     """
     Represents an American-style call option.
@@ -5,11 +18,17 @@ class Option:
     :param strike_price: The strike price of the option.
     :param execution_date: The date the option needs to be executed.
     :param ticker: The stock ticker associated with the option.
+    :param quantity: Number of underlying shares covered (default: 1).
+    :param premium: Total premium paid for the contract (default: 0).
+    :param purchase_date: The date the option was bought (default: None).
     """
-    def __init__(self, strike_price, execution_date, ticker):
+    def __init__(self, strike_price, execution_date, ticker, quantity=1, premium=0.0, purchase_date=None):
         self.strike_price = strike_price
         self.execution_date = execution_date
         self.ticker = ticker
+        self.quantity = quantity
+        self.premium = premium
+        self.purchase_date = purchase_date
         self.executed = False
 
     def execute(self, current_date, stock_price):
@@ -26,8 +45,46 @@ class Option:
                 return stock_price - self.strike_price
         return 0
 
+    def to_record(self):
+        """
+        Returns the option as a tuple matching OPTION_DTYPE.
+        """
+        return (
+            self.strike_price,
+            np.datetime64(self.purchase_date or self.execution_date, "D"),
+            np.datetime64(self.execution_date, "D"),
+            self.quantity,
+            self.premium,
+            self.executed,
+        )
+
+    @staticmethod
+    def to_array(options):
+        """
+        Packs a list of Option objects into a structured array with OPTION_DTYPE.
+
+        :param options: List of Option objects.
+        :return: A NumPy structured array.
+        """
+        return np.array([option.to_record() for option in options], dtype=OPTION_DTYPE)
+
     def __str__(self):
         """
         Returns a string representation of the option.
         """
         return f"Option(Ticker: {self.ticker}, Strike Price: {self.strike_price}, Execution Date: {self.execution_date}, Executed: {self.executed})"
+
+
+def settle_expired(book, current_date, stock_price):
+    """
+    Settles every unexecuted contract in the book that expires on or before the current date.
+
+    :param book: Structured array with OPTION_DTYPE (updated in place).
+    :param current_date: The current date (numpy datetime64[D] compatible).
+    :param stock_price: The stock price used for settlement.
+    :return: Total payoff of the settled contracts.
+    """
+    expiring = ~book["executed"] & (book["execution_date"] <= np.datetime64(current_date, "D"))
+    payoff = float((np.maximum(stock_price - book["strike_price"][expiring], 0.0) * book["quantity"][expiring]).sum())
+    book["executed"][expiring] = True
+    return payoff
@@ -0,0 +1,248 @@
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+from data_fetchers.getFREDData import get_bond_rates_cache_state
+from data_fetchers.getYFinanceData import get_cache_state
+from services.rolling_service import parse_rolling_params
+from services.simulation_registry import estimate_cost, required_data, select_simulations
+
+# Admission configuration (overridable through the environment)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") not in ("0", "false", "False")
+ADMISSION_HEAVY_COST = float(os.getenv("ADMISSION_HEAVY_COST", "1000"))  # Requests above this cost use the heavy pool
+ADMISSION_MAX_COST = float(os.getenv("ADMISSION_MAX_COST", "100000"))  # Requests above this cost are refused (use /jobs)
+ADMISSION_INTERACTIVE_SLOTS = int(os.getenv("ADMISSION_INTERACTIVE_SLOTS", "8"))  # Interactive requests run at once
+ADMISSION_HEAVY_SLOTS = int(os.getenv("ADMISSION_HEAVY_SLOTS", "2"))  # Heavy requests run at once
+ADMISSION_INTERACTIVE_QUEUE = int(os.getenv("ADMISSION_INTERACTIVE_QUEUE", "32"))  # Interactive requests waiting before 429s
+ADMISSION_HEAVY_QUEUE = int(os.getenv("ADMISSION_HEAVY_QUEUE", "4"))  # Heavy requests waiting before 429s
+ADMISSION_INTERACTIVE_TIMEOUT = float(os.getenv("ADMISSION_INTERACTIVE_TIMEOUT", "5"))  # Seconds waited before a 503
+ADMISSION_HEAVY_TIMEOUT = float(os.getenv("ADMISSION_HEAVY_TIMEOUT", "30"))  # Seconds waited before a 503
+
+# Cost model: one unit is one simulated year of a weight-1 simulation (see the SIMULATION cost hints).
+# Data that is not in memory adds the cost of loading it.
+DISK_LOAD_COST = 50  # Reading a ticker or rate series from the folder cache
+UPSTREAM_FETCH_COST = 3000  # Fetching a ticker or rate series from Yahoo Finance or FRED
+ROLLING_TICKER_COST = 5  # Every rolling window of one ticker's whole history (one pass over its months)
+DAYS_PER_YEAR = 365.25
+DURATION_SMOOTHING = 0.2  # Weight of the latest run in a pool's average duration
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is not admitted.
+
+    :param message: Explanation for the client.
+    :param status: HTTP status to answer with (413, 429 or 503).
+    :param retry_after: Seconds the client should wait before retrying (None if retrying won't help).
+    """
+    def __init__(self, message, status, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+    """
+    Concurrency limiter with a bounded wait queue.
+
+    :param name: The pool name ("interactive" or "heavy").
+    :param slots: Requests allowed to run at once.
+    :param max_waiting: Requests allowed to wait for a slot; more are refused right away.
+    :param timeout: Seconds a request may wait for a slot.
+    """
+    def __init__(self, name, slots, max_waiting, timeout):
+        self.name = name
+        self.slots = max(1, slots)
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.running = 0
+        self.waiting = 0
+        self.average_duration = 1.0  # Seconds, smoothed over finished requests
+        self.counts = {"admitted": 0, "queued": 0, "rejected_full": 0, "rejected_timeout": 0}
+        self._condition = threading.Condition()
+
+    def retry_after(self):
+        """
+        Estimates how many seconds until a new request would get a slot, from the queue ahead of it.
+        """
+        rounds = (self.waiting + 1) / self.slots
+        return max(1, math.ceil(self.average_duration * rounds))
+
+    def acquire(self):
+        """
+        Takes a slot, waiting up to the pool's timeout.
+
+        :raises AdmissionRejected: 429 if the queue is full, 503 if no slot freed up in time.
+        """
+        with self._condition:
+            if self.running < self.slots:
+                self.running += 1
+                self.counts["admitted"] += 1
+                return
+            if self.waiting >= self.max_waiting:
+                self.counts["rejected_full"] += 1
+                raise AdmissionRejected(
+                    f"Too many {self.name} requests are waiting; retry later.", 429, self.retry_after()
+                )
+
+            self.waiting += 1
+            self.counts["queued"] += 1
+            try:
+                deadline = time.monotonic() + self.timeout
+                while self.running >= self.slots:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counts["rejected_timeout"] += 1
+                        raise AdmissionRejected(
+                            f"Timed out waiting for a {self.name} slot; retry later.", 503, self.retry_after()
+                        )
+                    self._condition.wait(remaining)
+                self.running += 1
+                self.counts["admitted"] += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self, duration):
+        """
+        Frees a slot and folds the request's duration into the pool's average.
+
+        :param duration: Seconds the request held the slot.
+        """
+        with self._condition:
+            self.running -= 1
+            self.average_duration += DURATION_SMOOTHING * (duration - self.average_duration)
+            self._condition.notify()
+
+    def status(self):
+        with self._condition:
+            return {
+                "slots": self.slots,
+                "running": self.running,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "timeout": self.timeout,
+                "average_duration": round(self.average_duration, 3),
+                **self.counts,
+            }
+
+
+POOLS = {
+    "interactive": AdmissionPool("interactive", ADMISSION_INTERACTIVE_SLOTS, ADMISSION_INTERACTIVE_QUEUE, ADMISSION_INTERACTIVE_TIMEOUT),
+    "heavy": AdmissionPool("heavy", ADMISSION_HEAVY_SLOTS, ADMISSION_HEAVY_QUEUE, ADMISSION_HEAVY_TIMEOUT),
+}
+
+
+def _simulated_years(params):
+    """
+    Returns the length of the requested date range in years (1 if it is missing or invalid).
+    """
+    try:
+        start_date = datetime.strptime(params["start_date"], "%Y-%m-%d")
+        end_date = datetime.strptime(params["end_date"], "%Y-%m-%d")
+    except (KeyError, TypeError, ValueError):
+        return 1.0
+    return max((end_date - start_date).days, 1) / DAYS_PER_YEAR
+
+
+def _load_cost(state):
+    """
+    Returns the cost of reading data from where it currently is ("memory", "disk" or None).
+    """
+    if state == "memory":
+        return 0
+    return DISK_LOAD_COST if state == "disk" else UPSTREAM_FETCH_COST
+
+
+def estimate_request_cost(params, simulation_ids=None):
+    """
+    Estimates a request's cost before running it: each selected simulation's cost hint (scaled by the
+    number of tickers when it simulates them independently) times the simulated years, plus the cost of
+    loading the declared data that is not in memory yet.
+
+    :param params: The simulation parameters.
+    :param simulation_ids: The selected simulations (default: the ones the request selects).
+    :return: Estimated cost in units.
+    :raises ValueError: If an unknown simulation is selected.
+    """
+    simulation_ids = simulation_ids or select_simulations(params)
+    years = _simulated_years(params)
+    cost = sum(estimate_cost(simulation_id, params) for simulation_id in simulation_ids) * years
+
+    data = required_data(params, simulation_ids)
+    cost += sum(_load_cost(get_cache_state(ticker, period="max")) for ticker in data["tickers"])
+    if data["date_range"]:
+        start_date, end_date = data["date_range"]
+        cost += sum(
+            _load_cost(get_bond_rates_cache_state(series_id, start_date, end_date)) for series_id in data["rate_series"]
+        )
+    return cost
+
+
+def estimate_rolling_cost(params):
+    """
+    Estimates a rolling-window request's cost before running it: ROLLING_TICKER_COST per ticker, plus the
+    cost of loading the tickers that are not in memory yet.
+
+    :param params: The rolling-window parameters (see parse_rolling_params).
+    :return: Estimated cost in units.
+    :raises ValueError: If a parameter is missing or invalid.
+    """
+    tickers = parse_rolling_params(params)["tickers"]
+    return sum(ROLLING_TICKER_COST + _load_cost(get_cache_state(ticker, period="max")) for ticker in tickers)
+
+
+class AdmissionTicket:
+    """
+    A slot held by an admitted request; release it when the request finishes (release is idempotent).
+    Streamed responses release it from response.call_on_close, which runs even if the body is never read.
+    """
+    def __init__(self, pool, cost):
+        self.pool = pool
+        self.cost = cost
+        self.started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if self.pool is not None and not self._released:
+            self._released = True
+            self.pool.release(time.monotonic() - self.started)
+
+
+def admit(cost):
+    """
+    Admits a request of the given cost into the interactive or heavy pool, waiting for a slot if needed.
+
+    :param cost: The request's estimated cost (see estimate_request_cost).
+    :return: AdmissionTicket to release when the request finishes.
+    :raises AdmissionRejected: If the request is too expensive or its pool is saturated.
+    """
+    if not ADMISSION_ENABLED:
+        return AdmissionTicket(None, cost)
+    if cost > ADMISSION_MAX_COST:
+        raise AdmissionRejected(
+            f"The request is too expensive to run synchronously (estimated cost {cost:.0f}, limit {ADMISSION_MAX_COST:.0f}); "
+            f"submit it to /jobs instead.", 413,
+        )
+
+    pool = POOLS["heavy" if cost > ADMISSION_HEAVY_COST else "interactive"]
+    try:
+        pool.acquire()
+    except AdmissionRejected as e:
+        logging.error(f"Rejected a request of cost {cost:.0f} from the {pool.name} pool: {e}")
+        raise
+    return AdmissionTicket(pool, cost)
+
+
+def get_admission_status():
+    """
+    Returns the configuration and live state of the admission pools.
+    """
+    return {
+        "enabled": ADMISSION_ENABLED,
+        "heavy_cost": ADMISSION_HEAVY_COST,
+        "max_cost": ADMISSION_MAX_COST,
+        "pools": {name: pool.status() for name, pool in POOLS.items()},
+    }
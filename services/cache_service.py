@@ -1,12 +1,19 @@
 import time
 import os
 import shutil
+import hashlib
+import logging
+import threading
 
 # In-memory caches
 cache = {}
 CACHE_EXPIRATION = 300  # Cache expiration time in seconds
 search_tickers_cache = {}
 SEARCH_CACHE_EXPIRATION = 600  # Cache expiration time in seconds
+checkpoint_cache = {}
+CHECKPOINT_EXPIRATION = 7 * 24 * 3600  # Checkpoints outlive responses so daily reruns can resume
+MAX_CHECKPOINTS = 1000
+_checkpoint_lock = threading.Lock()  # Checkpoints are saved from batch and job threads
 
 def get_cached_response(cache_key):
     """
@@ -30,6 +37,85 @@ def cache_response(cache_key, response):
     """
     cache[cache_key] = (response, time.time())
 
+def make_checkpoint_key(simulation, *parts):
+    """
+    Builds a checkpoint key from a simulation name and every parameter except the end date.
+
+    :param simulation: The simulation name (e.g., "dca_sim").
+    :param parts: The parameters that identify the scenario (ticker, start date, amounts, ...).
+    :return: The checkpoint key.
+    """
+    digest = hashlib.sha256(",".join(str(part) for part in parts).encode()).hexdigest()
+    return f"{simulation}-checkpoint-{digest}"
+
+def get_checkpoint(checkpoint_key, end_date):
+    """
+    Retrieves a simulation checkpoint that can be extended up to the given end date.
+
+    :param checkpoint_key: The checkpoint key (see make_checkpoint_key).
+    :param end_date: The end date of the requested simulation.
+    :return: Dictionary with "end_date", "state" and "balance_history", or None if no usable checkpoint exists.
+    """
+    entry = checkpoint_cache.get(checkpoint_key)
+    if entry:
+        checkpoint, timestamp = entry
+        if time.time() - timestamp < CHECKPOINT_EXPIRATION and checkpoint["end_date"] <= end_date:
+            return checkpoint
+    return None
+
+def save_checkpoint(checkpoint_key, end_date, state, balance_history, sources=()):
+    """
+    Stores the final state of a simulation so a later run with a later end date can resume from it.
+    An existing checkpoint is only replaced by one that reaches at least as far.
+
+    :param checkpoint_key: The checkpoint key (see make_checkpoint_key).
+    :param end_date: The last simulated date.
+    :param state: Dictionary holding everything the simulation loop needs to continue.
+    :param balance_history: The balance history up to and including end_date.
+    :param sources: The tickers and FRED series the simulation read (see drop_revised_checkpoints).
+    """
+    checkpoint = {"end_date": end_date, "state": dict(state), "balance_history": list(balance_history), "sources": frozenset(sources)}
+    with _checkpoint_lock:
+        existing = checkpoint_cache.get(checkpoint_key)
+        if existing and existing[0]["end_date"] > end_date and time.time() - existing[1] < CHECKPOINT_EXPIRATION:
+            return
+
+        checkpoint_cache[checkpoint_key] = (checkpoint, time.time())
+
+        # Evict the oldest checkpoints once the cache is full
+        if len(checkpoint_cache) > MAX_CHECKPOINTS:
+            for key, _ in sorted(checkpoint_cache.items(), key=lambda item: item[1][1])[:len(checkpoint_cache) - MAX_CHECKPOINTS]:
+                checkpoint_cache.pop(key, None)
+
+def drop_revised_checkpoints(source, previous, records, date_key, value_key):
+    """
+    Drops the checkpoints that read a ticker or FRED series when a refetch revised its history (e.g., closes
+    re-adjusted for a split or dividend, or rates revised by FRED). A refetch that only appends new dates
+    keeps them, so checkpoints still resume across daily refreshes.
+
+    :param source: The ticker or FRED series ID.
+    :param previous: The records the refetch replaced (None if none were loaded).
+    :param records: The refetched records.
+    :param date_key: The records' date key (e.g., "Date").
+    :param value_key: The records' value key (e.g., "Close").
+    """
+    if not previous:
+        return
+    values = {record[date_key]: record[value_key] for record in records}
+    for record in previous:
+        old, new = record[value_key], values.get(record[date_key])
+        if old != new and not (old != old and new != new):  # NaN equals NaN here
+            break
+    else:
+        return
+
+    with _checkpoint_lock:
+        revised = [key for key, (checkpoint, _) in checkpoint_cache.items() if source in checkpoint.get("sources", ())]
+        for key in revised:
+            checkpoint_cache.pop(key, None)
+    if revised:
+        logging.info(f"Dropped {len(revised)} checkpoints after {source} was revised.")
+
 def search_tickers_with_cache(query):
     """
     Searches for stock tickers and caches the results.
@@ -54,11 +140,13 @@ def clear_all_caches():
     global cache, search_tickers_cache
     cache.clear()
     search_tickers_cache.clear()
+    checkpoint_cache.clear()
 
 def delete_data_cache_folder():
     """
     Deletes the data_cache folder and all its contents.
     """
+    checkpoint_cache.clear()  # Checkpoints were computed from the deleted data
     data_cache_path = os.path.join(os.getcwd(), "data_cache")
     if os.path.exists(data_cache_path):
         shutil.rmtree(data_cache_path)
@@ -1,5 +1,7 @@
-import yfinance as yf
+import logging
+from utils.timing import timed
 
+@timed("get_company_name")
 def get_company_name(ticker):
     """
     Fetches the full company name for a given stock ticker using the yfinance library.
@@ -7,11 +9,13 @@ def get_company_name(ticker):
     :param ticker: The stock ticker symbol.
     :return: The full company name as a string.
     """
+    import yfinance as yf  # Imported lazily to keep app startup fast
+
     try:
         stock = yf.Ticker(ticker)
         company_name = stock.info.get("longName", "Unknown Company")
         return company_name
     except Exception as e:
         # Log the error and return a default value
-        print(f"Error fetching company name for ticker '{ticker}': {e}")
+        logging.error(f"Error fetching company name for ticker '{ticker}': {e}")
         return "Unknown Company"
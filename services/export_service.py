@@ -0,0 +1,203 @@
+import csv
+import io
+import logging
+
+from services.simulation_registry import SIMULATIONS, requested_tickers
+from utils.stepping import batched_steps, downsample_steps
+
+# Export formats and their content types and file extensions
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),  # Arrow IPC streaming format
+}
+KEY_COLUMNS = ["simulation", "account", "date"]  # Columns identifying each exported row
+EXPORT_CHUNK_ROWS = 1000  # Rows written per response chunk (CSV) or record batch (Parquet, Arrow)
+
+_pyarrow = None
+
+
+def _get_pyarrow():
+    """
+    Returns the pyarrow module if it is installed (optional dependency), otherwise False.
+    """
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            _pyarrow = pyarrow
+        except ImportError:
+            _pyarrow = False
+    return _pyarrow
+
+
+def export_format_available(export_format):
+    """
+    Checks whether an export format can be produced (Parquet and Arrow need pyarrow).
+    """
+    return export_format == "csv" or bool(_get_pyarrow())
+
+
+def export_columns(simulation_ids):
+    """
+    Returns the exported columns: the key columns, then every history column the simulations declare.
+
+    :param simulation_ids: The selected simulations.
+    """
+    return KEY_COLUMNS + list(dict.fromkeys(
+        column for simulation_id in simulation_ids for column in SIMULATIONS[simulation_id]["columns"]
+    ))
+
+
+def iter_rows(params, simulation_ids, every=1):
+    """
+    Steps through the selected simulations one at a time and yields their monthly records as they are
+    computed, without keeping the accounts' histories.
+
+    Simulations whose cost grows per ticker simulate each ticker independently, so they are run one
+    ticker at a time and a ticker that fails doesn't take the others down with it. A run that fails is
+    logged and the export moves on to the next one (rows it already produced stay in the export).
+
+    :param params: The simulation parameters.
+    :param simulation_ids: The selected simulations.
+    :param every: Keep one monthly record in this many per account, plus its last one (1 keeps them all).
+    :return: Generator of (simulation_id, account name, record) tuples.
+    """
+    tickers = requested_tickers(params)
+    for simulation_id in simulation_ids:
+        declaration = SIMULATIONS[simulation_id]
+        if declaration["cost"].get("per_ticker") and len(tickers) > 1:
+            runs = [{**params, "tickers": ticker} for ticker in tickers]
+        else:
+            runs = [params]
+
+        for run_params in runs:
+            try:
+                steps = declaration["steps"](run_params, keep_history=False)
+                if every > 1:
+                    steps = downsample_steps(steps, every)
+                for account, record in steps:
+                    yield simulation_id, account.name, record
+            except Exception as e:
+                logging.error(f"Error running simulation '{simulation_id}' for export: {e}", exc_info=True)
+
+
+def stream_csv(params, simulation_ids, every=1):
+    """
+    Streams the balance histories as CSV: the header first, then one chunk per EXPORT_CHUNK_ROWS rows.
+
+    :param params: The simulation parameters.
+    :param simulation_ids: The selected simulations.
+    :param every: Keep one monthly record in this many per account (see iter_rows).
+    :return: Generator of CSV text chunks.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=export_columns(simulation_ids), extrasaction="ignore")
+    writer.writeheader()
+    yield _drain_text(buffer)
+
+    for rows in batched_steps(iter_rows(params, simulation_ids, every), EXPORT_CHUNK_ROWS):
+        for simulation_id, account_name, record in rows:
+            writer.writerow({**record, "simulation": simulation_id, "account": account_name})
+        yield _drain_text(buffer)
+
+
+def _drain_text(buffer):
+    """
+    Returns the text written to a StringIO so far and empties it.
+    """
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file collecting what pyarrow writes until it is drained. It reports the total number of
+    bytes written as its position, so Parquet's footer offsets stay right after draining.
+    """
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_arrow(params, simulation_ids, export_format, every=1):
+    """
+    Streams the balance histories as Parquet or as an Arrow IPC stream, built from column arrays with
+    one row group or record batch per EXPORT_CHUNK_ROWS rows.
+
+    History columns are exported as float64 (NaN where an account doesn't record the column).
+
+    :param params: The simulation parameters.
+    :param simulation_ids: The selected simulations.
+    :param export_format: "parquet" or "arrow".
+    :param every: Keep one monthly record in this many per account (see iter_rows).
+    :return: Generator of byte chunks.
+    """
+    import numpy as np
+
+    pa = _get_pyarrow()
+    value_columns = export_columns(simulation_ids)[len(KEY_COLUMNS):]
+    schema = pa.schema(
+        [("simulation", pa.string()), ("account", pa.string()), ("date", pa.date32())]
+        + [(column, pa.float64()) for column in value_columns]
+    )
+
+    sink = _ChunkSink()
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        yield sink.drain()  # Parquet's magic bytes, so the download starts right away (Arrow writes its schema with the first batch)
+        for rows in batched_steps(iter_rows(params, simulation_ids, every), EXPORT_CHUNK_ROWS):
+            arrays = [
+                pa.array([simulation_id for simulation_id, _, _ in rows], pa.string()),
+                pa.array([account_name for _, account_name, _ in rows], pa.string()),
+                pa.array(np.array([str(record["date"])[:10] for _, _, record in rows], dtype="datetime64[D]")),
+            ] + [
+                pa.array(np.array([np.nan if record.get(column) is None else record[column] for _, _, record in rows], dtype=float))
+                for column in value_columns
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    except BaseException:
+        writer.close()
+        raise
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(params, simulation_ids, export_format, every=1):
+    """
+    Streams the full balance histories of the selected simulations in an export format.
+
+    :param params: The simulation parameters.
+    :param simulation_ids: The selected simulations.
+    :param export_format: One of EXPORT_FORMATS (check export_format_available first).
+    :param every: Keep one monthly record in this many per account (see iter_rows).
+    :return: Generator of response chunks.
+    """
+    if export_format == "csv":
+        return stream_csv(params, simulation_ids, every)
+    return stream_arrow(params, simulation_ids, export_format, every)
@@ -0,0 +1,342 @@
+import json
+import logging
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from services.simulation_service import run_simulations, run_simulation_batch, serialize_results
+from utils.progress import JobCancelled, progress_reporter
+
+# Job queue configuration (overridable through the environment)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "job_store/jobs.sqlite3")  # Kept outside data_cache/, which can be deleted
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))  # Jobs run at once
+JOBS_MAX_QUEUED = int(os.getenv("JOBS_MAX_QUEUED", "20"))  # Jobs waiting for a worker before submissions are refused
+JOBS_RETENTION = int(os.getenv("JOBS_RETENTION", str(7 * 24 * 3600)))  # Seconds finished jobs are kept
+JOBS_HEARTBEAT_INTERVAL = float(os.getenv("JOBS_HEARTBEAT_INTERVAL", "15"))  # Seconds between heartbeats of running jobs
+JOBS_STALE_AFTER = float(os.getenv("JOBS_STALE_AFTER", "120"))  # Running jobs without a heartbeat this long are requeued
+PROGRESS_WRITE_INTERVAL = 0.5  # Minimum seconds between progress writes for a job
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+_queue = queue.Queue(maxsize=JOBS_MAX_QUEUED)
+_cancel_requested = set()  # Ids of running jobs that should stop at their next progress report
+_running = set()  # Ids of the jobs this process is running
+_lock = threading.Lock()
+_workers = []
+
+
+class JobQueueFull(Exception):
+    """
+    Raised when a job is submitted while JOBS_MAX_QUEUED jobs are already waiting.
+    """
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _owner():
+    """
+    Identifies this process in the job store, so other processes sharing it know whose jobs are running.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _connect():
+    """
+    Opens a connection to the job store (one per call, so worker threads never share a connection).
+    """
+    directory = os.path.dirname(JOBS_DB_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(JOBS_DB_PATH, timeout=30)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+def _update_job(job_id, **fields):
+    """
+    Writes the given columns of a job.
+    """
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    with _lock, _connect() as connection:
+        connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+
+def _json_default(value):
+    """
+    Serializes NumPy scalars and dates found in simulation results.
+    """
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def init_job_store():
+    """
+    Creates the jobs table if needed and drops finished jobs older than JOBS_RETENTION.
+    """
+    with _lock, _connect() as connection:
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                created REAL NOT NULL,
+                owner TEXT,
+                heartbeat REAL
+            )
+        """)
+        # Job stores created before jobs recorded their owner
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in (("owner", "TEXT"), ("heartbeat", "REAL")):
+            if column not in columns:
+                connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        connection.execute(
+            f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED_STATUSES))}) AND created < ?",
+            (*FINISHED_STATUSES, time.time() - JOBS_RETENTION),
+        )
+
+
+def submit_job(params):
+    """
+    Stores a new job and queues it for the worker pool.
+
+    :param params: The /simulate parameters, or {"scenarios": {id: params}} for a batch of scenarios.
+    :return: The job id.
+    :raises JobQueueFull: If JOBS_MAX_QUEUED jobs are already waiting.
+    """
+    start_job_workers()
+    job_id = uuid.uuid4().hex
+    with _lock, _connect() as connection:
+        connection.execute(
+            "INSERT INTO jobs (id, status, params, created_at, created) VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, json.dumps(params), _now(), time.time()),
+        )
+
+    try:
+        _queue.put_nowait(job_id)
+    except queue.Full:
+        with _lock, _connect() as connection:
+            connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        raise JobQueueFull(f"The job queue is full ({JOBS_MAX_QUEUED} jobs waiting). Try again later.")
+    return job_id
+
+
+def get_job(job_id, include_result=False):
+    """
+    Returns a job's status and progress.
+
+    :param job_id: The job id.
+    :param include_result: If True, also returns the decoded result.
+    :return: Dictionary describing the job, or None if it does not exist.
+    """
+    with _connect() as connection:
+        row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+
+    job = {
+        "id": row["id"],
+        "status": row["status"],
+        "progress": round(row["progress"], 4),
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+        "cancel_requested": row["id"] in _cancel_requested,
+    }
+    if include_result:
+        job["result"] = json.loads(row["result"]) if row["result"] else None
+    return job
+
+
+def cancel_job(job_id):
+    """
+    Cancels a job. Queued jobs are cancelled immediately; running jobs stop at their next progress report.
+
+    :param job_id: The job id.
+    :return: The job's status after the request, or None if it does not exist.
+    """
+    job = get_job(job_id)
+    if job is None or job["status"] in FINISHED_STATUSES:
+        return job
+
+    if job["status"] == "queued":
+        with _lock, _connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (_now(), job_id),
+            )
+    _cancel_requested.add(job_id)  # Also covers a job a worker picked up in the meantime
+    return get_job(job_id)
+
+
+def _run_job(job_id):
+    """
+    Runs a queued job, publishing its progress and storing its result.
+    """
+    # Claim the job, unless it was cancelled (or removed) while waiting, or another process claimed it first
+    with _lock, _connect() as connection:
+        claimed = connection.execute(
+            "UPDATE jobs SET status = 'running', progress = 0, started_at = ?, owner = ?, heartbeat = ? "
+            "WHERE id = ? AND status = 'queued'",
+            (_now(), _owner(), time.time(), job_id),
+        ).rowcount
+        row = connection.execute("SELECT params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if claimed:
+            _running.add(job_id)
+    if not claimed:
+        _cancel_requested.discard(job_id)
+        return
+    params = json.loads(row["params"])
+
+    last_write = [0.0]
+
+    def on_progress(fraction):
+        if job_id in _cancel_requested:
+            raise JobCancelled(f"Job {job_id} was cancelled.")
+        if time.monotonic() - last_write[0] >= PROGRESS_WRITE_INTERVAL:
+            last_write[0] = time.monotonic()
+            _update_job(job_id, progress=fraction)
+
+    try:
+        with progress_reporter(on_progress):
+            if "scenarios" in params:
+                result = {"results": dict(run_simulation_batch(params["scenarios"]))}
+            else:
+                result = {"results": serialize_results(run_simulations(params))}
+        _update_job(
+            job_id, status="succeeded", progress=1.0, finished_at=_now(),
+            result=json.dumps(result, default=_json_default),
+        )
+    except JobCancelled:
+        logging.info(f"Job {job_id} cancelled.")
+        _update_job(job_id, status="cancelled", finished_at=_now())
+    except Exception as e:
+        logging.error(f"Error running job {job_id}: {e}", exc_info=True)
+        _update_job(job_id, status="failed", error=str(e), finished_at=_now())
+    finally:
+        _cancel_requested.discard(job_id)
+        with _lock:
+            _running.discard(job_id)
+
+
+def _worker_loop():
+    """
+    Takes jobs off the queue forever.
+    """
+    while True:
+        job_id = _queue.get()
+        try:
+            _run_job(job_id)
+        except Exception as e:
+            logging.error(f"Job worker error for {job_id}: {e}", exc_info=True)
+        finally:
+            _queue.task_done()
+
+
+def _requeue_unfinished_jobs(startup=False):
+    """
+    Queues the running jobs whose owner stopped sending heartbeats (its process died), and on startup the
+    jobs that were waiting when the process last stopped. Jobs other processes are still running are left
+    alone; a job queued by several processes still runs once, as only one of them can claim it.
+
+    :param startup: Whether to also queue the jobs already waiting in the job store.
+    """
+    stale_before = time.time() - JOBS_STALE_AFTER
+    with _lock, _connect() as connection:
+        stale_ids = [
+            row["id"] for row in connection.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND (heartbeat IS NULL OR heartbeat < ?) ORDER BY created",
+                (stale_before,),
+            )
+        ]
+        job_ids = [
+            job_id for job_id in stale_ids
+            if connection.execute(
+                "UPDATE jobs SET status = 'queued', progress = 0, started_at = NULL, owner = NULL, heartbeat = NULL "
+                "WHERE id = ? AND status = 'running' AND (heartbeat IS NULL OR heartbeat < ?)",
+                (job_id, stale_before),
+            ).rowcount
+        ]
+        if startup:
+            job_ids = [row["id"] for row in connection.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created")]
+
+    for job_id in job_ids:
+        try:
+            _queue.put_nowait(job_id)
+        except queue.Full:
+            _update_job(job_id, status="failed", error="The job queue was full when the job was requeued.", finished_at=_now())
+    if job_ids:
+        logging.info(f"Requeued {len(job_ids)} unfinished jobs.")
+
+
+def _heartbeat_loop():
+    """
+    Marks this process's running jobs as alive every JOBS_HEARTBEAT_INTERVAL, and requeues the jobs of
+    processes that stopped doing so.
+    """
+    while True:
+        time.sleep(JOBS_HEARTBEAT_INTERVAL)
+        try:
+            with _lock:
+                job_ids = list(_running)
+                if job_ids:
+                    with _connect() as connection:
+                        connection.execute(
+                            f"UPDATE jobs SET heartbeat = ? WHERE status = 'running' AND owner = ? AND id IN ({', '.join('?' * len(job_ids))})",
+                            (time.time(), _owner(), *job_ids),
+                        )
+            _requeue_unfinished_jobs()
+        except Exception as e:
+            logging.error(f"Job heartbeat error: {e}", exc_info=True)
+
+
+def start_job_workers():
+    """
+    Starts the job worker pool once per process, resuming unfinished jobs from the job store.
+    """
+    with _lock:
+        if _workers:
+            return
+        # Reserve the slot before releasing the lock so concurrent callers don't start a second pool
+        _workers.append(None)
+
+    try:
+        init_job_store()
+        _requeue_unfinished_jobs(startup=True)
+    except Exception as e:
+        logging.error(f"Error initializing the job store: {e}", exc_info=True)
+
+    workers = [
+        threading.Thread(target=_worker_loop, name=f"job-worker-{index}", daemon=True)
+        for index in range(max(1, JOBS_WORKERS))
+    ]
+    workers.append(threading.Thread(target=_heartbeat_loop, name="job-heartbeat", daemon=True))
+    for worker in workers:
+        worker.start()
+    _workers[:] = workers
+
+
+def get_job_queue_status():
+    """
+    Returns the size of this process's worker pool and its number of waiting and running jobs.
+    """
+    return {
+        "workers": max(1, JOBS_WORKERS) if _workers else 0,
+        "queued": _queue.qsize(),
+        "running": len(_running),
+        "max_queued": JOBS_MAX_QUEUED,
+    }
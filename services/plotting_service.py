@@ -1,19 +1,52 @@
 import random
 import json
+import logging
 
-import plotly.graph_objs as go
+from utils.timing import timed
 
-def generate_plot(balance_histories):
+METRIC_LABELS = {
+    "cagr": "CAGR",
+    "irr": "IRR",
+    "max_drawdown": "Max Drawdown",
+    "volatility": "Volatility",
+    "sharpe": "Sharpe",
+}
+
+
+def format_metrics_hover(metrics):
+    """
+    Formats an account's performance metrics as hover template lines.
+
+    :param metrics: Dictionary returned by compute_metrics, or None.
+    :return: Hover template text (empty if there are no metrics).
+    """
+    if not metrics:
+        return ""
+    lines = []
+    for key, label in METRIC_LABELS.items():
+        value = metrics.get(key)
+        if value is None:
+            continue
+        text = f"{value:.2f}" if key == "sharpe" else f"{value * 100:.2f}%"
+        lines.append(f"<b>{label}:</b> {text}<br>")
+    return "".join(lines)
+
+
+@timed("generate_plot")
+def generate_plot(balance_histories, metrics=None):
     """
     Generates a Plotly graph from a list of balance histories.
 
     :param balance_histories: A list of tuples, where each tuple contains an account name and its balance history.
                               Each balance history is a list of dictionaries with a 'date', 'account_balance', and other properties.
+    :param metrics: Optional list of performance metrics dictionaries, one per balance history, added to the hover data.
     :return: A Plotly figure object.
     """
+    import plotly.graph_objs as go  # Imported lazily to keep app startup fast
+
     fig = go.Figure()
 
-    for account_name, balance_history in balance_histories:
+    for index, (account_name, balance_history) in enumerate(balance_histories):
         if not balance_history:
             continue
 
@@ -28,11 +61,13 @@ def generate_plot(balance_histories):
         customdata = []
 
         for key in balance_history[0].keys():
-            print(f"Processing key: {key}")
+            logging.debug(f"Processing key: {key}")
             if key not in ["date", "account_balance"]:
                 hovertemplate += f"<b>{key.replace('_', ' ').title()}:</b> %{{customdata[{len(customdata)}]}}<br>"
                 customdata.append([entry[key] for entry in balance_history])
 
+        if metrics:
+            hovertemplate += format_metrics_hover(metrics[index])
 
         # Transpose customdata to match Plotly's format
         customdata = list(zip(*customdata))
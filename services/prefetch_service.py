@@ -0,0 +1,258 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime
+
+from dateutil.relativedelta import relativedelta
+from data_fetchers.getYFinanceData import fetch_data, stock_data_cache
+from data_fetchers.getFREDData import fetch_bond_rates, bond_rates_cache
+from services.simulation_registry import SIMULATIONS, required_data
+
+# Scheduler configuration (overridable through the environment)
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") not in ("0", "false", "False")
+PREFETCH_WATCHLIST = [t.strip().upper() for t in os.getenv("PREFETCH_WATCHLIST", "TSLA,NVDA,MSFT").split(",") if t.strip()]
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", "10"))  # Most-requested tickers to keep warm
+PREFETCH_REFRESH_INTERVAL = int(os.getenv("PREFETCH_REFRESH_INTERVAL", "86400"))  # Seconds between scheduled refreshes
+PREFETCH_OFFPEAK_HOURS = os.getenv("PREFETCH_OFFPEAK_HOURS", "1-5")  # Local hours (start-end) when refreshes may run
+PREFETCH_MIN_FETCH_INTERVAL = float(os.getenv("PREFETCH_MIN_FETCH_INTERVAL", "2"))  # Seconds between upstream calls
+PREFETCH_CHECK_INTERVAL = 60  # Seconds between scheduler wake-ups
+MAX_TRACKED_KEYS = 1000  # Bound on the request counters
+
+# Request tracking from /simulate traffic
+_ticker_counts = Counter()
+_rate_range_counts = Counter()  # (series_id, start_date, end_date)
+_lock = threading.Lock()
+
+# Scheduler state
+_wake_event = threading.Event()
+_pending_reason = None
+_scheduler_thread = None
+_last_upstream_call = 0.0
+_status = {
+    "running": False,
+    "reason": None,
+    "last_started": None,
+    "last_finished": None,
+    "last_refresh": None,
+    "warmed_tickers": [],
+    "warmed_rate_ranges": [],
+    "failed": [],
+}
+
+
+def _is_off_peak(now=None):
+    """
+    Checks whether the given time falls inside the configured off-peak window.
+
+    :param now: The datetime to check (defaults to the current local time).
+    :return: True if scheduled refreshes are allowed to run.
+    """
+    now = now or datetime.now()
+    try:
+        start_hour, end_hour = (int(hour) for hour in PREFETCH_OFFPEAK_HOURS.split("-"))
+    except ValueError:
+        logging.error(f"Invalid PREFETCH_OFFPEAK_HOURS value: {PREFETCH_OFFPEAK_HOURS}")
+        return False
+    if start_hour <= end_hour:
+        return start_hour <= now.hour < end_hour
+    return now.hour >= start_hour or now.hour < end_hour  # Window wraps past midnight
+
+
+def _default_date_range():
+    """
+    Returns the date range the dashboard pre-fills (three years up to the first of this month).
+    """
+    end_date = date.today().replace(day=1)
+    return (end_date - relativedelta(years=3)).strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+
+
+def _trim(counter):
+    """
+    Keeps a request counter bounded by dropping its least common keys.
+    """
+    if len(counter) > MAX_TRACKED_KEYS:
+        kept = counter.most_common(MAX_TRACKED_KEYS // 2)
+        counter.clear()
+        counter.update(dict(kept))
+
+
+def record_simulation_request(params):
+    """
+    Records the data a /simulate request's simulations declare (tickers, and rate series over the date
+    range) so the most requested data is kept warm.
+
+    :param params: The request parameters passed to run_simulations.
+    """
+    try:
+        data = required_data(params)
+    except ValueError:
+        return  # Unknown simulations; the request fails without reading any data
+    tickers = [ticker.upper() for ticker in data["tickers"]]
+
+    with _lock:
+        _ticker_counts.update(tickers)
+        _trim(_ticker_counts)
+        for series_id in data["rate_series"]:
+            _rate_range_counts[(series_id, *data["date_range"])] += 1
+        _trim(_rate_range_counts)
+
+
+def get_warm_targets():
+    """
+    Builds the list of tickers and rate series ranges to prefetch: the watchlist and every registered
+    rate series over the dashboard's default range, plus the most requested ones.
+
+    :return: Tuple of (tickers, rate_ranges), rate ranges being (series_id, start_date, end_date) tuples.
+    """
+    with _lock:
+        popular_tickers = [ticker for ticker, _ in _ticker_counts.most_common(PREFETCH_TOP_N)]
+        popular_ranges = [rate_range for rate_range, _ in _rate_range_counts.most_common(PREFETCH_TOP_N)]
+
+    default_ranges = [
+        (series_id, *_default_date_range())
+        for series_id in dict.fromkeys(
+            series_id for declaration in SIMULATIONS.values() for series_id in declaration["data"].get("rate_series", [])
+        )
+    ]
+    tickers = list(dict.fromkeys(PREFETCH_WATCHLIST + popular_tickers))
+    rate_ranges = list(dict.fromkeys(default_ranges + popular_ranges))
+    return tickers, rate_ranges
+
+
+def _throttle():
+    """
+    Sleeps as needed so upstream calls are spaced by PREFETCH_MIN_FETCH_INTERVAL.
+    """
+    global _last_upstream_call
+    wait = PREFETCH_MIN_FETCH_INTERVAL - (time.monotonic() - _last_upstream_call)
+    if wait > 0:
+        time.sleep(wait)
+    _last_upstream_call = time.monotonic()
+
+
+def warm_caches(refresh=False, reason="manual"):
+    """
+    Fetches every warm target into the in-memory and folder caches.
+
+    :param refresh: If True, refetches data that is already cached.
+    :param reason: Label recorded in the status (e.g., "startup", "scheduled").
+    """
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path="./secrets.env")
+    fred_api_key = os.getenv("FRED_API_KEY")
+
+    tickers, rate_ranges = get_warm_targets()
+    warmed_tickers, warmed_ranges, failed = [], [], []
+    _status.update({"running": True, "reason": reason, "last_started": datetime.now().isoformat(timespec="seconds")})
+
+    try:
+        for ticker in tickers:
+            if not refresh and f"{ticker}_max" in stock_data_cache:
+                warmed_tickers.append(ticker)
+                continue
+            _throttle()
+            try:
+                # Use the same period as the simulations so their cache keys are hit
+                if ticker in fetch_data(tickers=[ticker], period="max", refresh=refresh):
+                    warmed_tickers.append(ticker)
+                else:
+                    failed.append(ticker)
+            except Exception as e:
+                logging.error(f"Error prefetching stock data for {ticker}: {e}")
+                failed.append(ticker)
+
+        for series_id, start_date, end_date in rate_ranges:
+            label = f"{series_id}_{start_date}_{end_date}"
+            if not refresh and label in bond_rates_cache:
+                warmed_ranges.append(label)
+                continue
+            _throttle()
+            try:
+                fetch_bond_rates(fred_api_key, series_id=series_id, start_date=start_date, end_date=end_date, refresh=refresh)
+                warmed_ranges.append(label)
+            except Exception as e:
+                logging.error(f"Error prefetching rates for {label}: {e}")
+                failed.append(label)
+    finally:
+        finished = datetime.now().isoformat(timespec="seconds")
+        _status.update({
+            "running": False,
+            "last_finished": finished,
+            "warmed_tickers": warmed_tickers,
+            "warmed_rate_ranges": warmed_ranges,
+            "failed": failed,
+        })
+        if refresh:
+            _status["last_refresh"] = finished
+
+
+def request_warm_up(refresh=False, reason="manual"):
+    """
+    Asks the scheduler thread to run a warm-up as soon as possible without blocking the caller.
+
+    :param refresh: If True, refetches data that is already cached.
+    :param reason: Label recorded in the status.
+    """
+    global _pending_reason
+    _pending_reason = (refresh, reason)
+    _wake_event.set()
+
+
+def _scheduler_loop():
+    """
+    Warms the caches on startup, then refreshes them during off-peak hours.
+    """
+    global _pending_reason
+    last_refresh = time.time()
+    try:
+        warm_caches(reason="startup")
+    except Exception as e:
+        logging.error(f"Error during startup cache warm-up: {e}", exc_info=True)
+
+    while True:
+        _wake_event.wait(timeout=PREFETCH_CHECK_INTERVAL)
+        _wake_event.clear()
+        try:
+            if _pending_reason:
+                refresh, reason = _pending_reason
+                _pending_reason = None
+                warm_caches(refresh=refresh, reason=reason)
+            elif time.time() - last_refresh >= PREFETCH_REFRESH_INTERVAL and _is_off_peak():
+                last_refresh = time.time()
+                warm_caches(refresh=True, reason="scheduled")
+        except Exception as e:
+            logging.error(f"Error in prefetch scheduler: {e}", exc_info=True)
+
+
+def start_prefetch_scheduler():
+    """
+    Starts the background prefetch scheduler on a daemon thread (once per process).
+    """
+    global _scheduler_thread
+    if not PREFETCH_ENABLED or (_scheduler_thread and _scheduler_thread.is_alive()):
+        return
+    _scheduler_thread = threading.Thread(target=_scheduler_loop, name="prefetch-scheduler")
+    _scheduler_thread.daemon = True  # Ensure the thread exits when the main program exits
+    _scheduler_thread.start()
+
+
+def get_prefetch_status():
+    """
+    Returns the current scheduler status, configuration, and most requested tickers.
+    """
+    tickers, rate_ranges = get_warm_targets()
+    with _lock:
+        top_requested = _ticker_counts.most_common(PREFETCH_TOP_N)
+    return {
+        **_status,
+        "enabled": PREFETCH_ENABLED,
+        "scheduler_alive": bool(_scheduler_thread and _scheduler_thread.is_alive()),
+        "watchlist": PREFETCH_WATCHLIST,
+        "top_requested": [{"ticker": ticker, "count": count} for ticker, count in top_requested],
+        "targets": {"tickers": tickers, "rate_ranges": [list(rate_range) for rate_range in rate_ranges]},
+        "offpeak_hours": PREFETCH_OFFPEAK_HOURS,
+        "refresh_interval": PREFETCH_REFRESH_INTERVAL,
+        "min_fetch_interval": PREFETCH_MIN_FETCH_INTERVAL,
+    }
@@ -0,0 +1,209 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from data_fetchers.getYFinanceData import get_price_index, stock_data_cache, price_index_cache
+from data_fetchers.getFREDData import bond_rates_cache
+from services.simulation_registry import required_data
+from services.simulation_service import run_simulations
+from utils.shared_arrays import attach_array, publish_array, release_stale_arrays
+
+# Worker processes used for batches run with executor="process"
+BATCH_PROCESSES = int(os.getenv("BATCH_PROCESSES", str(os.cpu_count() or 1)))
+
+
+def _is_current(key, source):
+    """
+    Checks whether a published segment still belongs to the data held in the fetchers' caches.
+    """
+    kind, cache_key, _ = key.split(":", 2)
+    cache = stock_data_cache if kind == "stock" else bond_rates_cache
+    return cache.get(cache_key) is source
+
+
+def publish_scenario_data(scenarios):
+    """
+    Publishes the price and rate series a batch reads into shared memory, once per loaded series.
+
+    Only the data the selected simulations declare, and only the columns they read, is published: each
+    ticker's trading days and closes, and each rate series' dates and values over the requested range. Segments of series that were reloaded or evicted
+    from the caches since they were published are freed.
+
+    :param scenarios: List of scenario parameter dictionaries (their data must already be loaded).
+    :return: Picklable manifest of segment descriptors for install_shared_data.
+    """
+    import numpy as np
+
+    manifest = {"stocks": {}, "bonds": {}}
+    for params in scenarios:
+        try:
+            data = required_data(params)
+        except ValueError:
+            continue  # The scenario selects an unknown simulation and reports the error when it runs
+        for ticker in data["tickers"]:
+            cache_key = f"{ticker}_max"
+            records = stock_data_cache.get(cache_key)
+            if records is None or cache_key in manifest["stocks"]:
+                continue
+            price_index = get_price_index(ticker, period="max")
+            manifest["stocks"][cache_key] = {
+                "dates": publish_array(f"stock:{cache_key}:dates", price_index.dates, source=records),
+                "closes": publish_array(f"stock:{cache_key}:closes", price_index.closes, source=records),
+            }
+
+        for series_id in data["rate_series"]:
+            start_date, end_date = (datetime.strptime(day, "%Y-%m-%d").date() for day in data["date_range"])
+            cache_key = f"{series_id}_{start_date}_{end_date}"
+            rates = bond_rates_cache.get(cache_key)
+            if rates is None or cache_key in manifest["bonds"]:
+                continue
+            manifest["bonds"][cache_key] = {
+                "dates": publish_array(f"bond:{cache_key}:dates", np.array([rate["date"] for rate in rates], dtype=str), source=rates),
+                "rates": publish_array(f"bond:{cache_key}:rates", np.array([rate["rate"] for rate in rates], dtype=float), source=rates),
+            }
+
+    freed = release_stale_arrays(_is_current)
+    if freed:
+        logging.info(f"Freed {freed} shared memory segments of reloaded or evicted data.")
+    return manifest
+
+
+def install_shared_data(manifest):
+    """
+    Worker-process initializer: attaches to the published segments and installs them into the worker's
+    data caches, so simulations find their data without fetching or unpickling it.
+
+    Price indexes are built directly over the shared arrays; the Date/Close records the simulations
+    iterate are rebuilt once per worker.
+
+    :param manifest: Manifest returned by publish_scenario_data.
+    """
+    import numpy as np
+    from utils.price_index import PriceIndex
+
+    for cache_key, descriptors in manifest["stocks"].items():
+        dates = attach_array(descriptors["dates"])
+        closes = attach_array(descriptors["closes"])
+        records = [
+            {"Date": day, "Close": close}
+            for day, close in zip(np.datetime_as_string(dates, unit="D").tolist(), closes.tolist())
+        ]
+        stock_data_cache[cache_key] = records
+        price_index_cache[cache_key] = PriceIndex.from_arrays(dates, closes, source=records)
+
+    for cache_key, descriptors in manifest["bonds"].items():
+        dates = attach_array(descriptors["dates"]).tolist()
+        rates = attach_array(descriptors["rates"]).tolist()
+        bond_rates_cache[cache_key] = [{"date": day, "rate": rate} for day, rate in zip(dates, rates)]
+
+
+def pack_history(balance_history):
+    """
+    Packs a balance history (list of row dictionaries) into NumPy columns, which pickle as flat buffers.
+
+    :param balance_history: List of dictionaries sharing the same keys.
+    :return: Dictionary of column name to array (or list for mixed and non-numeric columns), or the original list
+             if the rows do not share the same keys.
+    """
+    import numpy as np
+
+    if not balance_history:
+        return balance_history
+    keys = list(balance_history[0])
+    if any(list(row) != keys for row in balance_history):
+        return balance_history
+
+    columns = {}
+    for key in keys:
+        values = [row[key] for row in balance_history]
+        # Only uniformly typed columns are packed, so ints and floats come back exactly as they were
+        if all(isinstance(value, int) and not isinstance(value, bool) and -2**63 <= value < 2**63 for value in values):
+            columns[key] = np.array(values, dtype=np.int64)
+        elif all(isinstance(value, float) for value in values):
+            columns[key] = np.array(values, dtype=float)
+        else:
+            columns[key] = values
+    return {"columns": columns}
+
+
+def unpack_history(packed):
+    """
+    Rebuilds a balance history packed by pack_history.
+    """
+    if not isinstance(packed, dict):
+        return packed
+    columns = {key: values.tolist() if hasattr(values, "tolist") else values for key, values in packed["columns"].items()}
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+def run_packed_simulations(params):
+    """
+    Worker-process task: runs the simulations and returns compact results instead of Account objects.
+
+    :param params: The simulation parameters.
+    :return: Dictionary of simulation name to a list of packed accounts or an error dictionary.
+    """
+    packed = {}
+    for simulation_name, accounts in run_simulations(params).items():
+        if not isinstance(accounts, list):
+            packed[simulation_name] = accounts
+            continue
+        packed[simulation_name] = [
+            {
+                "name": account.name,
+                "balance": account.balance,
+                "total_invested": account.total_invested,
+                "balance_history": pack_history(account.balance_history),
+                "metrics": getattr(account, "metrics", None),
+            }
+            for account in accounts
+        ]
+    return packed
+
+
+def unpack_results(packed):
+    """
+    Converts packed results into the same structure as serialize_results.
+    """
+    results = {}
+    for simulation_name, accounts in packed.items():
+        if not isinstance(accounts, list):
+            results[simulation_name] = accounts
+            continue
+        results[simulation_name] = [
+            {**account, "balance_history": unpack_history(account["balance_history"])}
+            for account in accounts
+        ]
+    return results
+
+
+def run_groups_in_processes(groups, progress, max_workers=None):
+    """
+    Runs groups of identical scenarios on a process pool that reads the shared price and rate arrays.
+
+    :param groups: List of (scenario ids, scenario parameters) tuples.
+    :param progress: ParallelProgress tracking one stage per group.
+    :param max_workers: Maximum number of worker processes (default: BATCH_PROCESSES).
+    :return: Generator of (scenario ids, serialized results) tuples in completion order.
+    """
+    manifest = publish_scenario_data([params for _, params in groups])
+    workers = max(1, min(max_workers or BATCH_PROCESSES, len(groups)))
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=install_shared_data, initargs=(manifest,))
+    try:
+        futures = {
+            executor.submit(run_packed_simulations, dict(params)): (index, scenario_ids)
+            for index, (scenario_ids, params) in enumerate(groups)
+        }
+        for future in as_completed(futures):
+            index, scenario_ids = futures[future]
+            try:
+                results = unpack_results(future.result())
+            except Exception as e:
+                logging.error(f"Error running batch scenarios {scenario_ids} in a worker process: {e}", exc_info=True)
+                results = {"error": str(e)}
+            progress.complete(index)
+            yield scenario_ids, results
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import os
+from datetime import datetime
+
+from data_fetchers.getYFinanceData import fetch_data, get_data_version, get_price_index
+from services.cache_service import cache_response, get_cached_response
+from services.simulation_registry import requested_tickers
+from utils.timing import span
+
+ROLLING_MAX_TICKERS = int(os.getenv("ROLLING_MAX_TICKERS", "50"))
+DEFAULT_HORIZON_YEARS = 10
+
+
+def _amount(params, key):
+    """
+    Reads a dollar amount parameter such as "10,000" or "$500" (0 when missing).
+    """
+    return int(str(params.get(key) or 0).replace("$", "").replace(",", ""))
+
+
+def parse_rolling_params(params):
+    """
+    Validates the rolling-window parameters.
+
+    :param params: Dictionary with:
+                   - tickers: Comma-separated tickers (or a list).
+                   - horizon_years: Optional window length in whole years (default: 10).
+                   - initial_investment: Amount invested at the start of each window.
+                   - monthly_investment: Amount invested every month.
+                   - start_date, end_date: Optional range the windows must fit in (default: all history).
+    :return: Dictionary of parsed values.
+    :raises ValueError: If a parameter is missing or invalid.
+    """
+    tickers = requested_tickers(params)
+    if not tickers:
+        raise ValueError("At least one ticker is required.")
+    if len(tickers) > ROLLING_MAX_TICKERS:
+        raise ValueError(f"At most {ROLLING_MAX_TICKERS} tickers are allowed.")
+
+    horizon_years = str(params.get("horizon_years") or DEFAULT_HORIZON_YEARS)
+    if not horizon_years.isdigit() or int(horizon_years) < 1:
+        raise ValueError("horizon_years must be a positive whole number of years.")
+
+    try:
+        initial_investment = _amount(params, "initial_investment")
+        monthly_investment = _amount(params, "monthly_investment")
+        start_date = datetime.strptime(params["start_date"], "%Y-%m-%d") if params.get("start_date") else None
+        end_date = datetime.strptime(params["end_date"], "%Y-%m-%d") if params.get("end_date") else None
+    except ValueError as e:
+        raise ValueError(f"Invalid parameter: {e}") from e
+    if initial_investment < 0 or monthly_investment < 0 or not (initial_investment or monthly_investment):
+        raise ValueError("initial_investment and monthly_investment must not be negative, and not both 0.")
+
+    return {
+        "tickers": tickers,
+        "horizon_months": int(horizon_years) * 12,
+        "initial_investment": initial_investment,
+        "monthly_investment": monthly_investment,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+
+
+def run_rolling_analysis(params):
+    """
+    Computes how a monthly DCA into each ticker would have done over every window of a fixed horizon,
+    starting on every month of the ticker's history, in one pass over an aligned monthly price matrix.
+
+    Shares are fractional (see rolling_dca_windows), so results can differ from /simulate's whole-share
+    DCA by the cash it leaves uninvested each month. Results are cached per parameters and data version.
+
+    :param params: The rolling-window parameters (see parse_rolling_params).
+    :return: Dictionary with the parameters, the window start months and per-ticker results: the
+             distribution of total returns (best, worst, mean, percentiles) and the per-window series.
+    :raises ValueError: If a parameter is invalid.
+    """
+    import numpy as np
+    from utils.rolling_windows import monthly_first_closes, rolling_dca_windows, window_distribution
+
+    parsed = parse_rolling_params(params)
+    tickers = parsed["tickers"]
+
+    fetch_data(tickers=tickers, period="max")  # Load every ticker in one pass
+    versions = [get_data_version(ticker, period="max") for ticker in tickers]
+    params_hash = hashlib.sha256(f"{parsed},{versions}".encode()).hexdigest()
+    cached = get_cached_response(f"rolling-{params_hash}")
+    if cached:
+        return cached
+
+    price_indexes = {ticker: get_price_index(ticker, period="max") for ticker in tickers}
+    missing = [ticker for ticker, price_index in price_indexes.items() if price_index is None or not len(price_index.valid_dates)]
+    if missing:
+        logging.error(f"No price data for tickers: {missing}")
+    columns = [ticker for ticker in tickers if ticker not in missing]
+
+    result = {
+        "horizon_months": parsed["horizon_months"],
+        "initial_investment": parsed["initial_investment"],
+        "monthly_investment": parsed["monthly_investment"],
+        "invested": parsed["initial_investment"] + parsed["monthly_investment"] * parsed["horizon_months"],
+        "start_months": [],
+        "results": {ticker: {"error": "No price data."} for ticker in tickers},
+    }
+    if not columns:
+        return result
+
+    # Month grid covering every ticker's history, clipped to the requested range
+    first_month = min(price_indexes[ticker].valid_dates[0] for ticker in columns).astype("datetime64[M]")
+    last_month = max(price_indexes[ticker].valid_dates[-1] for ticker in columns).astype("datetime64[M]")
+    if parsed["start_date"]:
+        # Windows start on the first 1st of the month on or after the start date
+        first_month = max(first_month, (np.datetime64(parsed["start_date"].date(), "D") - 1).astype("datetime64[M]") + 1)
+    if parsed["end_date"]:
+        last_month = min(last_month, np.datetime64(parsed["end_date"].date(), "M"))
+    months = np.arange(first_month, max(last_month + 1, first_month))
+
+    with span("rolling.prices"):
+        prices = np.column_stack([monthly_first_closes(price_indexes[ticker], months) for ticker in columns])
+    with span("rolling.windows"):
+        values, valid, invested = rolling_dca_windows(
+            prices, parsed["horizon_months"], parsed["initial_investment"], parsed["monthly_investment"]
+        )
+
+    start_months = np.datetime_as_string(months[:len(values)]).tolist()
+    result["start_months"] = start_months
+    for column, ticker in enumerate(columns):
+        positions = np.flatnonzero(valid[:, column])
+        ticker_values = values[positions, column]
+        distribution = window_distribution(ticker_values, invested)
+        for extreme in ("best", "worst"):
+            if distribution[extreme] is not None:
+                position = distribution[extreme]
+                distribution[extreme] = {
+                    "start_month": start_months[positions[position]],
+                    "final_value": round(float(ticker_values[position]), 2),
+                    "total_return": float(ticker_values[position] / invested - 1),
+                }
+        result["results"][ticker] = {
+            "distribution": distribution,
+            "series": {
+                "start_month": [start_months[position] for position in positions],
+                "final_value": np.round(ticker_values, 2).tolist(),
+                "total_return": (ticker_values / invested - 1).tolist() if invested else [],
+            },
+        }
+
+    try:
+        cache_response(f"rolling-{params_hash}", result)
+    except Exception as e:
+        logging.error(f"Failed to cache rolling-window analysis: {e}")
+    return result
@@ -0,0 +1,109 @@
+import importlib
+import logging
+import pkgutil
+
+import simulations
+
+# Keys every SIMULATION declaration must provide
+DECLARATION_KEYS = ("id", "name", "run", "steps", "parameters", "data", "columns", "cost")
+
+
+def discover_simulations(package=simulations):
+    """
+    Imports every module of the simulations package and collects the SIMULATION declaration each one
+    exports. A declaration is a dictionary with:
+      - id: Unique identifier, used in the "simulations" request parameter and as the results key.
+      - name: Display name.
+      - run: Function taking the parameters dictionary and returning a list of accounts.
+      - steps: Generator function taking the parameters dictionary (and keep_history, default True) and
+               yielding (account, record) tuples as the simulation advances; run consumes it.
+      - parameters: Names of the request parameters it reads.
+      - data: The data it reads: {"tickers": True if it reads the requested tickers' prices,
+              "rate_series": [FRED series ids read over the requested date range]}.
+      - columns: Columns of the balance history rows besides "date".
+      - cost: Cost hints: {"weight": run time relative to the bond simulation for one ticker,
+              "per_ticker": True if each ticker is simulated independently, so the run time grows with
+              the number of tickers}.
+
+    :param package: The package to scan.
+    :return: Dictionary of id to declaration, in module name order.
+    """
+    registry = {}
+    for module_info in sorted(pkgutil.iter_modules(package.__path__), key=lambda module_info: module_info.name):
+        module = importlib.import_module(f"{package.__name__}.{module_info.name}")
+        declaration = getattr(module, "SIMULATION", None)
+        if declaration is None:
+            continue
+        missing = [key for key in DECLARATION_KEYS if key not in declaration]
+        if missing or declaration["id"] in registry:
+            logging.error(f"Skipping simulation declared in {module.__name__}: missing {missing} or duplicate id.")
+            continue
+        registry[declaration["id"]] = declaration
+    return registry
+
+
+# Discovered once, when the app starts
+SIMULATIONS = discover_simulations()
+
+
+def select_simulations(params):
+    """
+    Returns the ids of the simulations a request selects: the "simulations" parameter (comma-separated
+    string or list), or every registered simulation when it is missing or empty.
+
+    :param params: The simulation parameters.
+    :return: List of simulation ids in registry order.
+    :raises ValueError: If an id is not registered.
+    """
+    selected = params.get("simulations") or []
+    if isinstance(selected, str):
+        selected = selected.split(",")
+    selected = {simulation_id.strip() for simulation_id in selected if simulation_id.strip()}
+    if not selected:
+        return list(SIMULATIONS)
+    unknown = sorted(selected - SIMULATIONS.keys())
+    if unknown:
+        raise ValueError(f"Unknown simulations: {', '.join(unknown)}")
+    return [simulation_id for simulation_id in SIMULATIONS if simulation_id in selected]
+
+
+def requested_tickers(params):
+    """
+    Returns the request's tickers, stripped and without duplicates.
+    """
+    tickers = params.get("tickers") or []
+    if isinstance(tickers, str):
+        tickers = tickers.split(",")
+    return list(dict.fromkeys(ticker.strip() for ticker in tickers if ticker.strip()))
+
+
+def required_data(params, simulation_ids=None):
+    """
+    Returns the data the selected simulations declare they read for a request.
+
+    :param params: The simulation parameters.
+    :param simulation_ids: Simulations to consider (default: the ones the request selects).
+    :return: Dictionary with "tickers" (tickers whose prices are read), "rate_series" (FRED series ids)
+             and "date_range" ((start_date, end_date) strings the series are read over, or None).
+    """
+    declarations = [SIMULATIONS[simulation_id] for simulation_id in (simulation_ids or select_simulations(params))]
+    needs_tickers = any(declaration["data"].get("tickers") for declaration in declarations)
+    rate_series = list(dict.fromkeys(
+        series_id for declaration in declarations for series_id in declaration["data"].get("rate_series", [])
+    ))
+    date_range = None
+    if rate_series and params.get("start_date") and params.get("end_date"):
+        date_range = (params["start_date"], params["end_date"])
+    return {
+        "tickers": requested_tickers(params) if needs_tickers else [],
+        "rate_series": rate_series if date_range else [],
+        "date_range": date_range,
+    }
+
+
+def estimate_cost(simulation_id, params):
+    """
+    Estimates a simulation's relative run time for a request from its cost hints.
+    """
+    cost = SIMULATIONS[simulation_id]["cost"]
+    return cost.get("weight", 1.0) * (max(len(requested_tickers(params)), 1) if cost.get("per_ticker") else 1)
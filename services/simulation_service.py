@@ -1,10 +1,13 @@
+import contextvars
+import hashlib
+import json
 import logging
 import os
-from simulations.dca_simulation import run_dca_simulation
-from simulations.bond_simulation import run_bond_simulation
-from simulations.savings_simulation import run_savings_simulation  # Import the savings simulation
-from simulations.hybrid_simulation import run_hybrid_simulation  # Import the hybrid simulation
-from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from services.simulation_registry import SIMULATIONS, estimate_cost, required_data, select_simulations
+from utils.timing import span
+from utils.progress import ParallelProgress, progress_span
 
 # Update logging configuration to include file and line number
 logging.basicConfig(
@@ -12,16 +15,20 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s [%(filename)s:%(lineno)d]"
 )
 
-SIMULATION_FUNCTIONS = {
-    "dca_simulation": run_dca_simulation,
-    "bond_simulation": run_bond_simulation,
-    "savings_simulation": run_savings_simulation,
-    "hybrid_simulation": run_hybrid_simulation  # Add hybrid simulation
-}
+# Registered simulations (see services/simulation_registry.py), keyed by id
+SIMULATION_FUNCTIONS = {simulation_id: declaration["run"] for simulation_id, declaration in SIMULATIONS.items()}
+
+# Bump when simulation output changes for the same inputs, so cached responses (ETags) are invalidated
+RESULTS_VERSION = "4"
+
+# Batch limits (overridable through the environment)
+BATCH_MAX_SCENARIOS = int(os.getenv("BATCH_MAX_SCENARIOS", "100"))
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", str(min(8, os.cpu_count() or 1))))
+BATCH_EXECUTOR = os.getenv("BATCH_EXECUTOR", "thread")  # "thread", or "process" to use every core
 
 def run_simulations(params):
     """
-    Runs all simulations for the given parameters, creating a separate account for each ticker.
+    Runs the selected simulations for the given parameters, creating a separate account for each ticker.
 
     :param params: A dictionary containing simulation parameters:
                    - start_date: The start date of the simulation (YYYY-MM-DD).
@@ -29,17 +36,263 @@ def run_simulations(params):
                    - initial_investment: The initial investment amount.
                    - monthly_investment: The monthly investment amount.
                    - tickers: A list of selected stock tickers.
+                   - simulations: Optional ids of the simulations to run (comma-separated or a list; default: all).
     :return: A dictionary where each key is a simulation name and the value is a list of accounts (one per simulation).
+    :raises ValueError: If an unknown simulation is selected.
     """
     results = {}
+    simulation_ids = select_simulations(params)
 
-    for simulation_name, simulation_function in SIMULATION_FUNCTIONS.items():
+    # Each simulation's share of the reported progress follows its cost hints
+    costs = [estimate_cost(simulation_id, params) for simulation_id in simulation_ids]
+    total_cost = sum(costs) or 1.0
+    progress_start = 0.0
+
+    for simulation_name, cost in zip(simulation_ids, costs):
+        progress_end = progress_start + cost / total_cost
         try:
             # Pass the parameters dictionary directly to the simulation function
-            simulation_results = simulation_function(params)
+            with span(f"simulation.{simulation_name}"), progress_span(progress_start, progress_end):
+                simulation_results = SIMULATION_FUNCTIONS[simulation_name](params)
             results[simulation_name] = simulation_results
         except Exception as e:
             logging.error(f"Error running simulation '{simulation_name}': {e}", exc_info=True)
             results[simulation_name] = {"error": str(e)}
+        progress_start = progress_end
+
+    try:
+        with span("metrics"):
+            attach_metrics(results)
+    except Exception as e:
+        logging.error(f"Error computing performance metrics: {e}", exc_info=True)
 
     return results  # Return results for all simulations
+
+
+def attach_metrics(results):
+    """
+    Computes the performance metrics of every account that doesn't have them yet, in one vectorized pass.
+
+    Metrics are stored on the accounts, so accounts served from the simulation caches keep theirs and
+    are not recomputed.
+
+    :param results: Dictionary of simulation name to a list of accounts or an error dictionary.
+    """
+    pending = [
+        account
+        for accounts in results.values() if isinstance(accounts, list)
+        for account in accounts if getattr(account, "metrics", None) is None
+    ]
+    if not pending:
+        return
+    from utils.performance_metrics import compute_metrics  # Imported lazily to keep NumPy out of app startup
+
+    for account, metrics in zip(pending, compute_metrics([account.balance_history for account in pending])):
+        account.metrics = metrics
+
+
+def simulation_fingerprint(params):
+    """
+    Builds a deterministic fingerprint of a simulation request without running it: a hash of the
+    canonical parameters, the selected simulations and the versions of the price and rate series
+    they declare they read. Identical requests over unchanged data get the same fingerprint.
+
+    :param params: The simulation parameters.
+    :return: Hex digest usable as an ETag.
+    """
+    from data_fetchers.getYFinanceData import get_data_version
+    from data_fetchers.getFREDData import get_bond_rates_version
+
+    simulation_ids = select_simulations(params)
+    data = required_data(params, simulation_ids)
+    data_versions = {ticker: get_data_version(ticker, period="max") for ticker in sorted(data["tickers"])}
+
+    if data["rate_series"]:
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path="./secrets.env")
+        start_date, end_date = data["date_range"]
+        for series_id in data["rate_series"]:
+            # Same date objects the simulations pass, so the same cached series is read
+            data_versions[series_id] = get_bond_rates_version(
+                os.getenv("FRED_API_KEY"),
+                start_date=datetime.strptime(start_date, "%Y-%m-%d").date(),
+                end_date=datetime.strptime(end_date, "%Y-%m-%d").date(),
+                series_id=series_id,
+            )
+
+    canonical = json.dumps({
+        "version": RESULTS_VERSION,
+        "simulations": simulation_ids,
+        "params": {key: value for key, value in params.items() if key != "simulations"},  # Selection is canonical above
+        "data": data_versions,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+def serialize_results(results):
+    """
+    Converts the output of run_simulations into JSON-serializable data.
+
+    :param results: Dictionary of simulation name to a list of accounts or an error dictionary.
+    :return: Dictionary of simulation name to a list of account dictionaries or the error dictionary.
+    """
+    serialized = {}
+    for simulation_name, accounts in results.items():
+        if not isinstance(accounts, list):
+            serialized[simulation_name] = accounts
+            continue
+        serialized[simulation_name] = [
+            {
+                "name": account.name,
+                "balance": account.balance,
+                "total_invested": account.total_invested,
+                "balance_history": account.balance_history,
+                "metrics": getattr(account, "metrics", None),
+            }
+            for account in accounts
+        ]
+    return serialized
+
+
+def preload_scenario_data(scenarios):
+    """
+    Loads the data shared by a batch of scenarios once, before they run concurrently.
+
+    Only the data the selected simulations declare is loaded: every distinct ticker is read into the stock
+    data cache in a single fetch_data call (and its price index built), and every distinct rate series
+    and date range is fetched once, so concurrent scenarios only hit the in-memory caches instead of
+    racing to load the same files or call the same APIs.
+
+    :param scenarios: List of scenario parameter dictionaries.
+    """
+    from data_fetchers.getYFinanceData import fetch_data, get_price_index
+    from data_fetchers.getFREDData import fetch_bond_rates
+
+    tickers, rate_ranges = [], []
+    for params in scenarios:
+        try:
+            data = required_data(params)
+        except ValueError:
+            continue  # The scenario selects an unknown simulation and reports the error when it runs
+        tickers.extend(data["tickers"])
+        rate_ranges.extend((series_id, *data["date_range"]) for series_id in data["rate_series"])
+    tickers = list(dict.fromkeys(tickers))
+    rate_ranges = list(dict.fromkeys(rate_ranges))
+
+    with span("batch.preload"):
+        if tickers:
+            try:
+                fetch_data(tickers=tickers, period="max")
+                for ticker in tickers:
+                    get_price_index(ticker, period="max")
+            except Exception as e:
+                logging.error(f"Error preloading stock data for batch: {e}")
+
+        if rate_ranges:
+            from dotenv import load_dotenv
+            load_dotenv(dotenv_path="./secrets.env")
+            fred_api_key = os.getenv("FRED_API_KEY")
+            for series_id, start_date, end_date in rate_ranges:
+                try:
+                    # Same date objects the simulations pass, so they hit the same cache keys
+                    fetch_bond_rates(
+                        fred_api_key,
+                        series_id=series_id,
+                        start_date=datetime.strptime(start_date, "%Y-%m-%d").date(),
+                        end_date=datetime.strptime(end_date, "%Y-%m-%d").date(),
+                    )
+                except Exception as e:
+                    logging.error(f"Error preloading {series_id} rates for {start_date} to {end_date}: {e}")
+
+
+def build_batch_scenarios(body):
+    """
+    Validates a batch request body and builds the parameters of every scenario.
+
+    :param body: Dictionary with a "scenarios" list and optional "defaults" merged into every scenario.
+                 Scenarios without an "id" are keyed by their position.
+    :return: Dictionary of scenario id to scenario parameters.
+    :raises ValueError: If the body is malformed or a scenario selects an unknown simulation.
+    """
+    if not isinstance(body, dict) or not isinstance(body.get("scenarios"), list) or not body["scenarios"]:
+        raise ValueError("A JSON body with a non-empty 'scenarios' list is required.")
+    if len(body["scenarios"]) > BATCH_MAX_SCENARIOS:
+        raise ValueError(f"At most {BATCH_MAX_SCENARIOS} scenarios are allowed per batch.")
+    defaults = body.get("defaults") or {}
+    if not isinstance(defaults, dict):
+        raise ValueError("'defaults' must be an object.")
+
+    scenarios = {}
+    for position, scenario in enumerate(body["scenarios"]):
+        if not isinstance(scenario, dict):
+            raise ValueError(f"Scenario {position} must be an object.")
+        params = {**defaults, **scenario}
+        scenario_id = str(params.pop("id", position))
+        if scenario_id in scenarios:
+            raise ValueError(f"Duplicate scenario id: {scenario_id}")
+        try:
+            select_simulations(params)
+        except ValueError as e:
+            raise ValueError(f"Scenario {scenario_id}: {e}")
+        scenarios[scenario_id] = params
+    return scenarios
+
+
+def _run_batch_group(progress, index, params):
+    """
+    Runs one group of identical batch scenarios as stage `index` of the batch's progress.
+    """
+    with progress.stage(index):
+        return run_simulations(params)
+
+
+def run_simulation_batch(scenarios, max_workers=None, executor=None):
+    """
+    Runs many scenarios concurrently, yielding each scenario's results as soon as it finishes.
+
+    Shared data is preloaded once, and scenarios with identical parameters are only simulated once.
+    Closing the generator early cancels the scenarios that have not started yet.
+
+    :param scenarios: Dictionary of scenario id to scenario parameters (same keys as run_simulations).
+    :param max_workers: Maximum number of scenarios run at once (default: BATCH_MAX_WORKERS threads or
+                        BATCH_PROCESSES processes).
+    :param executor: "thread" or "process" (default: BATCH_EXECUTOR). Worker processes read the price and
+                     rate series from shared memory instead of receiving pickled copies.
+    :return: Generator of (scenario_id, serialized results) tuples in completion order.
+    """
+    preload_scenario_data(list(scenarios.values()))
+
+    # Group scenario ids by identical parameters
+    groups = {}
+    for scenario_id, params in scenarios.items():
+        groups.setdefault(json.dumps(params, sort_keys=True, default=str), []).append(scenario_id)
+
+    progress = ParallelProgress(len(groups))
+    if (executor or BATCH_EXECUTOR) == "process":
+        from services.process_pool_service import run_groups_in_processes
+        process_groups = [(scenario_ids, scenarios[scenario_ids[0]]) for scenario_ids in groups.values()]
+        for scenario_ids, results in run_groups_in_processes(process_groups, progress, max_workers):
+            for scenario_id in scenario_ids:
+                yield scenario_id, results
+        return
+
+    workers = max(1, min(max_workers or BATCH_MAX_WORKERS, len(groups)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="simulate-batch")
+    try:
+        # Each task runs in a copy of the caller's context so its spans are attributed to the request
+        futures = {
+            executor.submit(
+                contextvars.copy_context().run, _run_batch_group, progress, index, dict(scenarios[scenario_ids[0]])
+            ): scenario_ids
+            for index, scenario_ids in enumerate(groups.values())
+        }
+        for future in as_completed(futures):
+            try:
+                results = serialize_results(future.result())
+            except Exception as e:
+                logging.error(f"Error running batch scenarios {futures[future]}: {e}", exc_info=True)
+                results = {"error": str(e)}
+            for scenario_id in futures[future]:
+                yield scenario_id, results
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
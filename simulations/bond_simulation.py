@@ -1,10 +1,13 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 import logging
-import math
 
 from models.account import Account
 from models.bond import Bond
-from data_fetchers.getFREDData import fetch_bond_rates
+from data_fetchers.getYieldCurveData import fetch_yield_curve, series_for_maturities
+from services.cache_service import make_checkpoint_key, get_checkpoint, save_checkpoint
+from utils.money import from_cents, from_cents_array, to_cents
+from utils.progress import report_progress
+from utils.stepping import collect_accounts, record_step
 from dateutil.relativedelta import relativedelta
 
 logging.basicConfig(
@@ -12,97 +15,239 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s [%(filename)s:%(lineno)d]"
 )
 
+BOND_TERM_MONTHS = 3  # Bonds mature this many months after purchase
+BOND_RATE_SERIES = series_for_maturities([BOND_TERM_MONTHS])  # Treasury series the bonds are priced from
+
 def run_bond_simulation(params):
     """
     Simulates investing in bonds with monthly investments and reinvestment upon maturity.
 
+    :param params: The simulation parameters (see iter_bond_simulation).
+    :return: A list containing a single Account object representing the bond simulation results.
+    """
+    return collect_accounts(iter_bond_simulation(params))
+
+
+def iter_bond_simulation(params, keep_history=True):
+    """
+    Steps through the bond simulation, yielding each monthly record as it is computed. Closing the
+    generator stops the simulation; it is checkpointed only when it runs to the end with its history kept.
+
     :param params: A dictionary containing simulation parameters:
                    - start_date: Start date of the simulation.
                    - end_date: End date of the simulation.
                    - initial_investment: Initial investment amount.
                    - monthly_investment: Monthly investment amount.
-    :return: A list containing a single Account object representing the bond simulation results.
+    :param keep_history: Whether the account keeps its full balance history (False leaves it empty).
+    :return: Generator of (account, record) tuples.
     """
     try:
         # Derive start_date and end_date as datetime objects
         start_date: datetime = datetime.strptime(params["start_date"], "%Y-%m-%d")
         end_date: datetime = datetime.strptime(params["end_date"], "%Y-%m-%d")
-        # Convert to date objects for fetch_bond_rates
+        # Convert to date objects for fetch_yield_curve
         start_date_for_fetch = start_date.date()
         end_date_for_fetch = end_date.date()
         initial_investment = int(params["initial_investment"].replace("$", "").replace(",", ""))
         monthly_investment = int(params["monthly_investment"].replace("$", "").replace(",", ""))
+        monthly_cents = to_cents(monthly_investment)
 
         # Initialize accounts and variables
         bond_account = Account(start_date,name="Bond Account")
-        current_date = start_date
-        pending_cash = initial_investment + monthly_investment  # Include initial investment in pending cash
-        bonds = []
-
-        # Fetch bond rates for the simulation period
+        bond_account.balance_history = []
+
+        # Resume from a checkpoint of the same scenario with an earlier end date, if there is one
+        checkpoint_key = make_checkpoint_key("bond_sim", start_date, initial_investment, monthly_investment)
+        checkpoint = get_checkpoint(checkpoint_key, end_date)
+
+        if checkpoint:
+            current_date = checkpoint["end_date"] + relativedelta(days=1)
+            pending_cash = checkpoint["state"]["pending_cash_cents"]
+            bonds = list(checkpoint["state"]["bonds"])
+            invested = checkpoint["state"]["invested"]
+            previous_records = checkpoint["balance_history"]
+            # Only the new tail needs bond rates; a week of overlap lets the forward fill cover holidays
+            start_date_for_fetch = (current_date - relativedelta(days=7)).date()
+            logging.info(f"Resuming bond simulation from checkpoint at {checkpoint['end_date']}.")
+        else:
+            current_date = start_date
+            pending_cash = to_cents(initial_investment + monthly_investment)  # Cents, including the initial investment
+            invested = initial_investment + monthly_investment
+            bonds = []
+
+            # Record initial balance
+            previous_records = [{
+                "date": current_date.strftime("%Y-%m-%d"),
+                "cash": from_cents(pending_cash),
+                "bonds": 0.0,
+                "account_balance": from_cents(pending_cash),  # Add total balance
+                "interest_rate": 0.0,  # Initial interest rate
+                "invested": invested,
+            }]
+
+        for record in previous_records:
+            yield record_step(bond_account, record, keep_history)
+
+        # Price every day's purchases at once from the yield curve, at the rate of the bonds' own term
         from dotenv import load_dotenv
         import os
         load_dotenv(dotenv_path="./secrets.env")
         fred_api_key = os.getenv("FRED_API_KEY")
-        bond_rates = fetch_bond_rates(fred_api_key, start_date=start_date_for_fetch, end_date=end_date_for_fetch)
-        bond_rate_dict = {rate["date"]: rate["rate"] for rate in bond_rates}
-
-        # Record initial balance
-        balance_history = [{
-            "date": current_date.strftime("%Y-%m-%d"),
-            "cash": pending_cash,
-            "bonds": 0.0,
-            "account_balance": pending_cash,  # Add total balance
-            "interest_rate": 0.0  # Initial interest rate
-        }]
+        first_date = current_date
+        days, yields = None, None
+        if current_date <= end_date:
+            curve = fetch_yield_curve(fred_api_key, series_ids=BOND_RATE_SERIES, start_date=start_date_for_fetch, end_date=end_date_for_fetch)
+            days, yields = daily_yields(curve, current_date, end_date, BOND_TERM_MONTHS)
+
+        # The daily loop below runs as a compiled kernel unless kernels are disabled
+        from utils import kernels
+        if kernels.SIMULATION_KERNELS and current_date <= end_date:
+            pending_cash, bonds, invested = yield from _run_bond_ladder_kernel(
+                bond_account, keep_history, days, yields, pending_cash, bonds, invested, monthly_investment
+            )
+            report_progress(1, 1)
+            current_date = end_date + relativedelta(days=1)
 
         while current_date <= end_date:
-            # Format the current date to match the bond rate data format
-            current_date_str = current_date.strftime("%Y-%m-%d 00:00:00")
-
             # Get the annual yield for the current date
-            annual_yield = bond_rate_dict.get(current_date_str, 0.0)
+            annual_yield = float(yields[(current_date - first_date).days])
 
             # Maturing bonds
             for bond in bonds[:]:
                 if bond.is_matured(current_date):
                     # Cash in the bond on its maturity date
-                    matured_value = bond.get_matured_value()
-                    pending_cash += matured_value
-                    pending_cash = math.floor(pending_cash * 100) / 100  # Floor to the nearest cent
+                    pending_cash += bond.get_matured_value_cents()
                     bonds.remove(bond)
 
-            # Purchase bonds in $100 increments
-            bond_purchase_amount = (pending_cash // 100) * 100
-            if bond_purchase_amount >= 100 and annual_yield > 0.0:  # Ensure valid rate and sufficient funds
-                maturity_date = current_date + relativedelta(months=3)  # Set maturity date 3 months from now
-                bond = Bond(investment=bond_purchase_amount, purchase_date=current_date, maturity_date=maturity_date, annual_yield=annual_yield)
+            # Purchase bonds in $100 (10,000 cent) increments
+            bond_purchase_cents = (pending_cash // 10000) * 10000
+            if bond_purchase_cents >= 10000 and annual_yield > 0.0:  # Ensure valid rate and sufficient funds
+                maturity_date = current_date + relativedelta(months=BOND_TERM_MONTHS)  # Set maturity date 3 months from now
+                bond = Bond(investment=from_cents(bond_purchase_cents), purchase_date=current_date, maturity_date=maturity_date, annual_yield=annual_yield)
                 bonds.append(bond)
-                pending_cash -= bond_purchase_amount
-                pending_cash = math.floor(pending_cash * 100) / 100  # Floor to the nearest cent
+                pending_cash -= bond_purchase_cents
 
             # Record balances only on the 1st of the month
             if current_date.day == 1:
-                total_bond_value = sum(bond.get_value() for bond in bonds)
-                balance_history.append({
+                report_progress((current_date - start_date).days, (end_date - start_date).days)
+                total_bond_cents = sum(bond.get_value_cents() for bond in bonds)
+                yield record_step(bond_account, {
                     "date": current_date.strftime("%Y-%m-%d"),
-                    "cash": pending_cash,
-                    "bonds": total_bond_value,
-                    "account_balance": pending_cash + total_bond_value,  # Add total balance
-                    "interest_rate": annual_yield  # Include interest rate
-                })
+                    "cash": from_cents(pending_cash),
+                    "bonds": from_cents(total_bond_cents),
+                    "account_balance": from_cents(pending_cash + total_bond_cents),  # Add total balance
+                    "interest_rate": annual_yield,  # Include interest rate
+                    "invested": invested,
+                }, keep_history)
 
                 # Add monthly investment only on the 1st of the month
-                pending_cash += monthly_investment
-                pending_cash = math.floor(pending_cash * 100) / 100  # Floor to the nearest cent
+                pending_cash += monthly_cents
+                invested += monthly_investment
 
             # Increment the date by one day
             current_date += relativedelta(days=1)
 
-        # Attach balance history to the bond account
-        bond_account.balance_history = balance_history
-
-        return [bond_account]
+        if keep_history:
+            save_checkpoint(checkpoint_key, end_date, {"pending_cash_cents": pending_cash, "bonds": bonds, "invested": invested}, bond_account.balance_history, sources=BOND_RATE_SERIES)
     except Exception as e:
-        logging.error(f"Error in run_bond_simulation: {e}", exc_info=True)
+        logging.error(f"Error in iter_bond_simulation: {e}", exc_info=True)
         raise
+
+
+def daily_yields(curve, first_date, last_date, term_months):
+    """
+    Looks up the yield of a bond term for every calendar day of a range in one vectorized call. Days the
+    curve has no observation for (weekends) get 0, so no bonds are bought on them.
+
+    :param curve: YieldCurve covering the range.
+    :param first_date: First day (datetime).
+    :param last_date: Last day (datetime).
+    :param term_months: Bond term in months.
+    :return: Tuple of (days as datetime64[D], annual yields in percent).
+    """
+    import numpy as np
+    from utils.kernels import day_range
+
+    days = day_range(first_date, last_date)
+    return days, np.nan_to_num(curve.rates_on(days, term_months, exact=True), nan=0.0)
+
+
+def _run_bond_ladder_kernel(account, keep_history, days, yields, pending_cash, bonds, invested, monthly_investment):
+    """
+    Runs the bond simulation's daily loop over the given days with bond_ladder_kernel, then yields the
+    monthly records. Use with `yield from` to get the final state.
+
+    :param account: The Account the records belong to.
+    :param keep_history: Whether the records are appended to the account's balance history.
+    :param days: Every calendar day to simulate (datetime64[D]).
+    :param yields: Annual yield in percent on each day (0 where no rate is published).
+    :param pending_cash: Cash not invested in bonds in cents.
+    :param bonds: Open Bond objects in purchase order.
+    :param invested: Total contributions so far.
+    :param monthly_investment: Amount added after each monthly record.
+    :return: Tuple of (pending_cash in cents, bonds, invested) after the last day.
+    """
+    import numpy as np
+    from utils.kernels import add_months, bond_ladder_kernel, first_of_month_mask
+
+    day_numbers = days.astype(np.int64)
+
+    # Open bonds in purchase order, with room for one purchase per day
+    capacity = len(bonds) + len(days)
+    book_investments = np.zeros(capacity, dtype=np.int64)
+    book_purchases = np.zeros(capacity, dtype=np.int64)
+    book_maturities = np.zeros(capacity, dtype=np.int64)
+    book_yields = np.zeros(capacity)
+    book_values = np.zeros(capacity, dtype=np.int64)
+    for index, bond in enumerate(bonds):
+        book_investments[index] = bond.get_value_cents()
+        book_purchases[index] = np.datetime64(bond.purchase_date.date(), "D").astype(np.int64)
+        book_maturities[index] = np.datetime64(bond.maturity_date.date(), "D").astype(np.int64)
+        book_yields[index] = bond.annual_yield
+        book_values[index] = bond.get_matured_value_cents()
+
+    record_positions, record_cash, record_bonds, record_yields, pending_cash, first, end = bond_ladder_kernel(
+        day_numbers, yields, first_of_month_mask(days), add_months(days, BOND_TERM_MONTHS).astype(np.int64),
+        BOND_TERM_MONTHS, int(pending_cash), to_cents(monthly_investment),
+        book_investments, book_purchases, book_maturities, book_yields, book_values, len(bonds),
+    )
+
+    dates = np.datetime_as_string(days[record_positions]).tolist()
+    record_balances = from_cents_array(record_cash + record_bonds).tolist()
+    for record_date, cash, total_bond_value, account_balance, annual_yield in zip(
+        dates, from_cents_array(record_cash).tolist(), from_cents_array(record_bonds).tolist(), record_balances, record_yields.tolist()
+    ):
+        yield record_step(account, {
+            "date": record_date,
+            "cash": cash,
+            "bonds": total_bond_value,
+            "account_balance": account_balance,
+            "interest_rate": annual_yield,
+            "invested": invested,
+        }, keep_history)
+        invested += monthly_investment
+
+    epoch = datetime(1970, 1, 1)
+    bonds = [
+        Bond(
+            investment=from_cents(int(book_investments[index])),
+            purchase_date=epoch + timedelta(days=int(book_purchases[index])),
+            maturity_date=epoch + timedelta(days=int(book_maturities[index])),
+            annual_yield=float(book_yields[index]),
+        )
+        for index in range(first, end)
+    ]
+    return int(pending_cash), bonds, invested
+
+
+# Registry declaration (discovered by services/simulation_registry.py)
+SIMULATION = {
+    "id": "bond_simulation",
+    "name": "Bond Simulation",
+    "run": run_bond_simulation,
+    "steps": iter_bond_simulation,
+    "parameters": ["start_date", "end_date", "initial_investment", "monthly_investment"],
+    "data": {"tickers": False, "rate_series": BOND_RATE_SERIES},
+    "columns": ["cash", "bonds", "account_balance", "interest_rate", "invested"],
+    "cost": {"weight": 1.0, "per_ticker": False},
+}
@@ -1,10 +1,13 @@
 import logging
 
-from matplotlib.dates import relativedelta  # Import logging for exception handling
+from dateutil.relativedelta import relativedelta
 from models.account import Account
-from data_fetchers.getYFinanceData import fetch_data
-from services.cache_service import cache_response, get_cached_response
+from data_fetchers.getYFinanceData import fetch_data, get_price_index
+from services.cache_service import cache_response, get_cached_response, make_checkpoint_key, get_checkpoint, save_checkpoint
 from utils.date_utils import pad_historical_prices
+from utils.money import from_cents, shares_affordable, to_cents
+from utils.progress import report_progress
+from utils.stepping import collect_accounts, record_step
 import hashlib
 from datetime import datetime, date # Import the datetime module
 from services.company_service import get_company_name  # Import a service to fetch company names
@@ -19,13 +22,27 @@ def run_dca_simulation(params):
     """
     Simulates Dollar-Cost Averaging (DCA) using historical stock data.
 
+    :param params: The simulation parameters (see iter_dca_simulation).
+    :return: A list of Account objects, one for each ticker.
+    """
+    return collect_accounts(iter_dca_simulation(params))
+
+
+def iter_dca_simulation(params, keep_history=True):
+    """
+    Steps through the DCA simulation one ticker after another, yielding each monthly record as it is
+    computed. Closing the generator stops the simulation.
+
+    Results are cached and checkpointed only when the histories are kept, since both need the full history.
+
     :param params: A dictionary containing simulation parameters:
                    - start_date: Start date of the simulation.
                    - end_date: End date of the simulation.
                    - initial_investment: Initial investment amount.
                    - monthly_investment: Monthly investment amount.
                    - tickers: List of stock tickers to simulate.
-    :return: A list of Account objects, one for each ticker.
+    :param keep_history: Whether the accounts keep their full balance histories (False leaves them empty).
+    :return: Generator of (account, record) tuples.
     """
     try:
         start_date: datetime = datetime.strptime(params["start_date"], "%Y-%m-%d")
@@ -34,9 +51,9 @@ def run_dca_simulation(params):
         monthly_investment = int(str(params["monthly_investment"].replace(",", "")))
         tickers: list[str] = params["tickers"].split(",") if isinstance(params["tickers"], str) else params["tickers"]
 
-        accounts = []  # List to store accounts for each ticker
+        total_days = max((end_date - start_date).days, 1)
 
-        for ticker in tickers:
+        for ticker_index, ticker in enumerate(tickers):
             # hash the ticker and the params to create a unique cache key
             ticker_hash = hashlib.sha256(f"{ticker},{start_date},{end_date},{initial_investment},{monthly_investment}".encode()).hexdigest()
 
@@ -44,7 +61,8 @@ def run_dca_simulation(params):
             ticker_cache = get_cached_response(f"dca_sim-{ticker_hash}")
             if ticker_cache:
                 logging.info(f"Returning cached response for {ticker}. (dca_sim-{ticker_hash})")
-                accounts.append(ticker_cache)
+                for record in ticker_cache.balance_history:
+                    yield ticker_cache, record
                 continue
 
             # Validate the response from fetch_data
@@ -57,84 +75,208 @@ def run_dca_simulation(params):
 
             # Preprocess historical data into a dictionary for fast lookups
             historical_data_dict = {data['Date']: data['Close'] for data in historical_data}
+            price_index = get_price_index(ticker, period="max")
 
-            # Validate the company name
-            company_name = historical_datas.get("company_name")
-            if not company_name:
-                try:
-                    company_name = get_company_name(ticker)
-                except Exception as e:
-                    logging.error(f"Failed to fetch company name for ticker {ticker}: {e}")
-                    company_name = "Unknown Company"
+            # Resume from a checkpoint of the same scenario with an earlier end date, if there is one
+            checkpoint_key = make_checkpoint_key("dca_sim", ticker, start_date, initial_investment, monthly_investment)
+            checkpoint = get_checkpoint(checkpoint_key, end_date)
 
-            # Initialize the account with the initial investment and name
-            account_name = f"(DCA) {ticker} - {company_name}"
-            account = Account(start_date, initial_balance=initial_investment, name=account_name)
+            if checkpoint:
+                state = checkpoint["state"]
+                account_name = state["account_name"]
+                cash_account = Account(start_date, initial_balance=0, name=f"Cash Account - {ticker}")
+                cash_account.balance_cents = state["cash_cents"]
+                investment_account = Account(start_date, initial_balance=0, name=f"Investment Account - {ticker}")
+                investment_account.balance_cents = state["investment_value_cents"]
+                current_date = checkpoint["end_date"] + relativedelta(days=1)
+                shares = state["shares"]
+                current_price = state["price"]
+                invested = state["invested"]
+                previous_records = checkpoint["balance_history"]
+                logging.info(f"Resuming DCA simulation for {ticker} from checkpoint at {checkpoint['end_date']}.")
+            else:
+                # Validate the company name
+                company_name = historical_datas.get("company_name")
+                if not company_name:
+                    try:
+                        company_name = get_company_name(ticker)
+                    except Exception as e:
+                        logging.error(f"Failed to fetch company name for ticker {ticker}: {e}")
+                        company_name = "Unknown Company"
+                account_name = f"(DCA) {ticker} - {company_name}"
 
-            cash_account = Account(start_date, initial_balance=initial_investment, name=f"Cash Account - {ticker}")
-            investment_account = Account(start_date, initial_balance=0, name=f"Investment Account - {ticker}")
+                cash_account = Account(start_date, initial_balance=initial_investment, name=f"Cash Account - {ticker}")
+                investment_account = Account(start_date, initial_balance=0, name=f"Investment Account - {ticker}")
 
-            current_date = start_date
-            shares = 0
+                current_date = start_date
+                shares = 0
+                current_price = None
+                invested = initial_investment
 
-            balance_histories = [{
-                "date": current_date.strftime("%Y-%m-%d"),
-                "account_balance": cash_account.balance,
-                "shares": shares,
-                "price": 0,
-                "cash": cash_account.balance,
-                "investment_value": investment_account.balance,
-            }]
+                previous_records = [{
+                    "date": current_date.strftime("%Y-%m-%d"),
+                    "account_balance": cash_account.balance,
+                    "shares": shares,
+                    "price": 0,
+                    "cash": cash_account.balance,
+                    "investment_value": investment_account.balance,
+                    "invested": invested,
+                }]
+
+            # Initialize the account with the initial investment and name
+            account = Account(start_date, initial_balance=initial_investment, name=account_name)
+            account.balance_history = []
+            for record in previous_records:
+                yield record_step(account, record, keep_history)
+
+            # The daily loop below runs as a compiled kernel unless kernels are disabled
+            from utils import kernels
+            if kernels.SIMULATION_KERNELS and current_date <= end_date:
+                cash, shares, investment_value, current_price, invested = yield from _run_dca_kernel(
+                    account, keep_history, price_index, current_date, start_date, end_date, cash_account.balance_cents,
+                    shares, investment_account.balance_cents, current_price, invested, monthly_investment,
+                )
+                cash_account.balance_cents = cash
+                investment_account.balance_cents = investment_value
+                report_progress(ticker_index + 1, len(tickers))
+                current_date = end_date + relativedelta(days=1)
 
             while current_date <= end_date:
 
                 if current_date.day == 1:
-                    cash_account.record_balance(current_date, cash_account.balance + monthly_investment)
+                    cash_account.record_balance_cents(current_date, cash_account.balance_cents + to_cents(monthly_investment))
+                    invested += monthly_investment
+                    report_progress(ticker_index + (current_date - start_date).days / total_days, len(tickers))
 
-                if cash_account.balance > 0:
+                if cash_account.balance_cents > 0:
                     # Find the close price for the current date in historical data dictionary
                     current_price = historical_data_dict.get(current_date.strftime("%Y-%m-%d"))
 
                     # If current price is valid, calculate shares to buy
-                    if current_price is not None and cash_account.balance // current_price > 0:
-                        shares_to_buy = cash_account.balance // current_price
+                    shares_to_buy = shares_affordable(cash_account.balance_cents, current_price) if current_price is not None else 0
+                    if shares_to_buy > 0:
                         shares += shares_to_buy
-                        cash_account.deduct_funds(current_date, shares_to_buy * current_price)
+                        cash_account.deduct_funds(current_date, shares_to_buy * current_price)  # Cost rounded to the cent
                         investment_account.record_balance(current_date, shares * current_price)
 
                 # Record the balance for the investment account
                 if current_date.day == 1:
-                    # If the current price is 0, find the last price that was not 0
+                    # If the current price is 0, find the last price since the start that was not 0
                     if current_price is None or current_price == 0:
-                        last_valid_price = None
-                        temp_date = current_date
-                        while last_valid_price is None and temp_date > start_date:
-                            temp_date -= relativedelta(days=1)
-                            last_valid_price = historical_data_dict.get(temp_date.strftime("%Y-%m-%d"))
-                            if last_valid_price == 0:
-                                last_valid_price = None
-                        current_price = last_valid_price if last_valid_price is not None else 0
-
-                    balance_histories.append({
+                        last_valid_price = price_index.last_valid_close(current_date - relativedelta(days=1), not_before=start_date)
+                        current_price = last_valid_price if last_valid_price is not None else 0.0
+
+                    yield record_step(account, {
                         "date": current_date.strftime("%Y-%m-%d"),
-                        "account_balance": investment_account.balance + cash_account.balance,
+                        "account_balance": from_cents(investment_account.balance_cents + cash_account.balance_cents),
                         "shares": shares,
                         "price": current_price,
                         "cash": cash_account.balance,
-                        "investment_value": investment_account.balance
-                    })
+                        "investment_value": investment_account.balance,
+                        "invested": invested,
+                    }, keep_history)
 
                 current_date += relativedelta(days=1)
-            account.balance_history = balance_histories
-            accounts.append(account)
+
+            if not keep_history:
+                continue
+
+            save_checkpoint(checkpoint_key, end_date, {
+                "account_name": account_name,
+                "cash_cents": cash_account.balance_cents,
+                "investment_value_cents": investment_account.balance_cents,
+                "shares": shares,
+                "price": current_price,
+                "invested": invested,
+            }, account.balance_history, sources=[ticker])
 
             # Cache the account for the specific ticker
             try:
                 cache_response(f"dca_sim-{ticker_hash}", account)
             except Exception as e:
                 logging.error(f"Failed to cache response for ticker {ticker}: {e}")
-
-        return accounts  # Return a list of accounts, one for each ticker
     except Exception as e:
-        logging.error(f"Error in run_dca_simulation: {e}", exc_info=True)  # Log the exception with stack trace
+        logging.error(f"Error in iter_dca_simulation: {e}", exc_info=True)  # Log the exception with stack trace
         raise
+
+
+def _run_dca_kernel(account, keep_history, price_index, current_date, start_date, end_date, cash, shares,
+                    investment_value, current_price, invested, monthly_investment):
+    """
+    Runs the DCA simulation's daily loop from current_date to end_date with dca_kernel, then yields the
+    monthly records. Use with `yield from` to get the final state.
+
+    :param account: The Account the records belong to.
+    :param keep_history: Whether the records are appended to the account's balance history.
+    :param price_index: The ticker's PriceIndex.
+    :param current_date: First day to simulate.
+    :param start_date: Start date of the simulation (fallback prices are not taken from before it).
+    :param end_date: Last day to simulate.
+    :param cash: Cash not invested yet in cents.
+    :param shares: Shares held.
+    :param investment_value: Value of the shares at the last purchase in cents.
+    :param current_price: Last price looked up, or None.
+    :param invested: Total contributions so far.
+    :param monthly_investment: Amount added on the 1st of each month.
+    :return: Tuple of (cash in cents, shares, investment_value in cents, current_price, invested) after end_date.
+    """
+    import numpy as np
+    from utils.money import from_cents_array
+    from utils.kernels import day_range, dca_kernel, first_of_month_mask
+
+    days = day_range(current_date, end_date)
+    first_of_month = first_of_month_mask(days)
+
+    # Close on each day (NaN when the market was closed)
+    positions = np.minimum(np.searchsorted(price_index.dates, days), max(len(price_index.dates) - 1, 0))
+    prices = np.full(len(days), np.nan)
+    if len(price_index.dates):
+        traded = price_index.dates[positions] == days
+        prices[traded] = price_index.closes[positions[traded]]
+
+    # Price recorded on a 1st without a current price: the last valid close before it since the start
+    fallback_prices = np.zeros(len(days))
+    month_starts = np.flatnonzero(first_of_month)
+    valid_positions = np.searchsorted(price_index.valid_dates, days[month_starts] - 1, side="right") - 1
+    found = valid_positions >= 0
+    found[found] = price_index.valid_dates[valid_positions[found]] >= np.datetime64(start_date.date(), "D")
+    fallback_prices[month_starts[found]] = price_index.valid_closes[valid_positions[found]]
+
+    (record_positions, record_cash, record_shares, record_prices, record_values,
+     cash, shares, investment_value, current_price) = dca_kernel(
+        prices, first_of_month, fallback_prices, int(cash), int(shares), int(investment_value),
+        np.nan if current_price is None else float(current_price), to_cents(monthly_investment),
+    )
+
+    dates = np.datetime_as_string(days[record_positions]).tolist()
+    record_balances = from_cents_array(record_values + record_cash).tolist()
+    for record_date, record_balance, record_cash_balance, record_share_count, record_price, record_value in zip(
+        dates, record_balances, from_cents_array(record_cash).tolist(), record_shares.tolist(), record_prices.tolist(),
+        from_cents_array(record_values).tolist(),
+    ):
+        invested += monthly_investment
+        yield record_step(account, {
+            "date": record_date,
+            "account_balance": record_balance,
+            "shares": record_share_count,
+            "price": record_price,
+            "cash": record_cash_balance,
+            "investment_value": record_value,
+            "invested": invested,
+        }, keep_history)
+
+    current_price = None if np.isnan(current_price) else float(current_price)
+    return int(cash), int(shares), int(investment_value), current_price, invested
+
+
+# Registry declaration (discovered by services/simulation_registry.py)
+SIMULATION = {
+    "id": "dca_simulation",
+    "name": "DCA Simulation",
+    "run": run_dca_simulation,
+    "steps": iter_dca_simulation,
+    "parameters": ["start_date", "end_date", "initial_investment", "monthly_investment", "tickers"],
+    "data": {"tickers": True, "rate_series": []},
+    "columns": ["account_balance", "shares", "price", "cash", "investment_value", "invested"],
+    "cost": {"weight": 4.0, "per_ticker": True},
+}
@@ -1,13 +1,15 @@
 from datetime import datetime
 import logging
-import math
-from random import uniform
 from models.account import Account
 from models.bond import Bond
-from data_fetchers.getFREDData import fetch_bond_rates
-from data_fetchers.getYFinanceData import fetch_data
+from data_fetchers.getYieldCurveData import fetch_yield_curve, series_for_maturities
+from data_fetchers.getYFinanceData import fetch_data, get_price_index
 from services.company_service import get_company_name
-from utils.date_utils import pad_historical_prices
+from services.cache_service import make_checkpoint_key, get_checkpoint, save_checkpoint
+from utils.date_utils import month_schedule
+from utils.money import from_cents, to_cents
+from utils.progress import report_progress
+from utils.stepping import collect_accounts, record_step
 from dateutil.relativedelta import relativedelta
 
 logging.basicConfig(
@@ -15,75 +17,196 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s [%(filename)s:%(lineno)d]"
 )
 
+BOND_TERM_MONTHS = 3  # Bonds mature this many months after purchase
+BOND_RATE_SERIES = series_for_maturities([BOND_TERM_MONTHS])  # Treasury series the bonds are priced from
+OPTION_TERM_MONTHS = 3  # Calls are bought with three months to expiry, matching the bond term
+
+def load_bond_rate_dict(fred_api_key, start_date, end_date):
+    """
+    Looks up the bond term's yield for every calendar day of a date range from the yield curve, carrying
+    the last published rate over weekends and holidays.
+
+    :param fred_api_key: FRED API key.
+    :param start_date: First date of the range (datetime).
+    :param end_date: Last date of the range (datetime).
+    :return: Dictionary mapping YYYY-MM-DD strings to annual yields (0 before the first published rate).
+    """
+    import numpy as np
+    from utils.kernels import day_range
+
+    curve = fetch_yield_curve(fred_api_key, series_ids=BOND_RATE_SERIES, start_date=start_date.date(), end_date=end_date.date())
+    days = day_range(start_date, end_date)
+    rates = np.nan_to_num(curve.rates_on(days, BOND_TERM_MONTHS), nan=0.0)
+    return dict(zip(np.datetime_as_string(days, unit="D").tolist(), rates.tolist()))
+
+def trade_options(book, current_date, stock_price, annual_yield, volatility, budget, strike_pct):
+    """
+    Settles, prices and buys the whole options book for one month in a single vectorized step.
+
+    :param book: Structured array with OPTION_DTYPE holding the open contracts.
+    :param current_date: The current date.
+    :param stock_price: The underlying price on the current date.
+    :param annual_yield: The current bond yield in percent (used as the risk-free rate).
+    :param volatility: The annualized volatility estimate (NaN if unavailable).
+    :param budget: Cash available for new premiums.
+    :param strike_pct: How far above the current price new strikes are set, in percent.
+    :return: Tuple of (open book, settlement payoff, premium spent, mark-to-market value of the open book).
+    """
+    import numpy as np
+    from models.option import OPTION_DTYPE, settle_expired
+    from utils.option_pricing import black_scholes_call
+
+    today = np.datetime64(current_date.date(), "D")
+    rate = (annual_yield or 0.0) / 100
+
+    # Settle everything expiring today or earlier, then keep only the open contracts
+    payoff = settle_expired(book, today, stock_price)
+    book = book[~book["executed"]]
+
+    # Buy new calls with the budget
+    spent = 0.0
+    if budget > 0 and np.isfinite(volatility) and volatility > 0:
+        expiry = np.datetime64((current_date + relativedelta(months=OPTION_TERM_MONTHS)).date(), "D")
+        strike = stock_price * (1 + strike_pct / 100)
+        years = (expiry - today).astype(int) / 365
+        premium = float(black_scholes_call(stock_price, strike, years, rate, volatility)[0])
+        if premium > 0:
+            contract = np.array([(strike, today, expiry, budget / premium, budget, False)], dtype=OPTION_DTYPE)
+            book = np.concatenate([book, contract])
+            spent = budget
+
+    # Mark the open book to market
+    value = 0.0
+    if len(book):
+        years = (book["execution_date"] - today).astype(int) / 365
+        volatility = volatility if np.isfinite(volatility) else 0.0
+        value = float((black_scholes_call(stock_price, book["strike_price"], years, rate, volatility) * book["quantity"]).sum())
+
+    return book, payoff, spent, value
+
 def run_hybrid_simulation(params):
     """
     Simulates a hybrid strategy combining bonds and options based on real stock and bond data.
 
+    :param params: The simulation parameters (see iter_hybrid_simulation).
+    :return: A list of Account objects, one for each ticker, representing the hybrid simulation results.
+    """
+    return collect_accounts(iter_hybrid_simulation(params))
+
+
+def iter_hybrid_simulation(params, keep_history=True):
+    """
+    Steps through the hybrid simulation one ticker after another, yielding each monthly record as it is
+    computed. Closing the generator stops the simulation; a ticker is checkpointed only when it runs to
+    the end with its history kept.
+
+    Cash is kept in 3-month bonds; the interest they pay is spent on the 1st of each month on out-of-the-money
+    calls priced with Black-Scholes (volatility from the ticker's recent closes, rate from the bond yield).
+
     :param params: A dictionary containing simulation parameters:
                    - start_date: Start date of the simulation.
                    - end_date: End date of the simulation.
                    - initial_investment: Initial investment amount.
                    - tickers: List of stock tickers for options.
-    :return: A list of Account objects, one for each ticker, representing the hybrid simulation results.
+                   - option_strike_pct: Optional percentage above the current price for new strikes (default: 10).
+    :param keep_history: Whether the accounts keep their full balance histories (False leaves them empty).
+    :return: Generator of (account, record) tuples.
     """
     try:
+        import numpy as np
+        from models.option import OPTION_DTYPE
+        from utils.option_pricing import rolling_volatility
+
         start_date = datetime.strptime(params["start_date"], "%Y-%m-%d")
         end_date = datetime.strptime(params["end_date"], "%Y-%m-%d")
         initial_investment = int(params["initial_investment"].replace(",", ""))
         tickers = params["tickers"].split(",") if isinstance(params["tickers"], str) else params["tickers"]
+        strike_pct = float(params.get("option_strike_pct") or 10)
 
         # Fetch bond rates for the simulation period
         from dotenv import load_dotenv
         import os
         load_dotenv(dotenv_path="./secrets.env")
         fred_api_key = os.getenv("FRED_API_KEY")
-        bond_rates = fetch_bond_rates(fred_api_key, start_date=start_date.date(), end_date=end_date.date())
-        bond_rate_dict = {rate["date"]: rate["rate"] for rate in bond_rates}
+        bond_rate_dicts = {}  # Padded bond rates keyed by the first date they cover
 
-        # Pad bond rates to ensure no missing dates
-        padded_bond_rates = pad_historical_prices(
-            [{"Date": date, "Close": rate} for date, rate in bond_rate_dict.items()],
-            start_date.strftime("%Y-%m-%d"),
-            end_date.strftime("%Y-%m-%d")
-        )
-        bond_rate_dict = {entry["Date"]: entry["Close"] for entry in padded_bond_rates}
+        def get_bond_rate_dict(from_date):
+            if from_date not in bond_rate_dicts:
+                bond_rate_dicts[from_date] = load_bond_rate_dict(fred_api_key, from_date, end_date)
+            return bond_rate_dicts[from_date]
 
         # Fetch historical stock data for all tickers
         historical_datas = fetch_data(tickers=tickers, period="max")
         if not historical_datas:
             raise ValueError("Failed to fetch historical data for the provided tickers.")
 
-        accounts = []  # List to store accounts for each ticker
+        total_days = max((end_date - start_date).days, 1)
 
-        for ticker in tickers:
-            historical_data = historical_datas.get(ticker)
-            historical_data_dict = {data['Date']: data['Close'] for data in historical_data}
-            company_name = historical_datas.get("company_name")
-            if not company_name:
-                try:
-                    company_name = get_company_name(ticker)
-                except Exception as e:
-                    logging.error(f"Failed to fetch company name for ticker {ticker}: {e}")
-                    company_name = "Unknown Company"
+        for ticker_index, ticker in enumerate(tickers):
+            price_index = get_price_index(ticker, period="max")
 
+            # Resume from a checkpoint of the same scenario with an earlier end date, if there is one
+            checkpoint_key = make_checkpoint_key("hybrid_sim", ticker, start_date, initial_investment, strike_pct)
+            checkpoint = get_checkpoint(checkpoint_key, end_date)
 
-            # Initialize accounts for the current ticker
-            cash_account = Account(start_date, initial_balance=initial_investment, name=f"Cash Account - {ticker}")
-            bond_account = Account(start_date, initial_balance=0, name=f"Bond Account - {ticker}")
-            option_account = Account(start_date, initial_balance=0, name=f"Option Account - {ticker}")
-            hybrid_account = Account(start_date, initial_balance=initial_investment, name=f"(Hybrid) {ticker} - {company_name}")
+            if checkpoint:
+                state = checkpoint["state"]
+                account_name = state["account_name"]
+                cash_account = Account(start_date, initial_balance=0, name=f"Cash Account - {ticker}")
+                cash_account.balance_cents = state["cash_cents"]
+                option_account = Account(start_date, initial_balance=0, name=f"Option Account - {ticker}")
+                option_account.balance_cents = state["options_cents"]
+                current_date = checkpoint["end_date"] + relativedelta(days=1)
+                bonds = list(state["bonds"])
+                option_book = state["option_book"].copy()
+                option_budget = state["option_budget_cents"]
+                previous_records = checkpoint["balance_history"]
+                # Only the new tail needs bond rates; a week of overlap lets the padding carry rates over holidays
+                bond_rate_dict = get_bond_rate_dict(current_date - relativedelta(days=7)) if current_date <= end_date else {}
+                logging.info(f"Resuming hybrid simulation for {ticker} from checkpoint at {checkpoint['end_date']}.")
+            else:
+                company_name = historical_datas.get("company_name")
+                if not company_name:
+                    try:
+                        company_name = get_company_name(ticker)
+                    except Exception as e:
+                        logging.error(f"Failed to fetch company name for ticker {ticker}: {e}")
+                        company_name = "Unknown Company"
+                account_name = f"(Hybrid) {ticker} - {company_name}"
+
+                # Initialize accounts for the current ticker
+                cash_account = Account(start_date, initial_balance=initial_investment, name=f"Cash Account - {ticker}")
+                option_account = Account(start_date, initial_balance=0, name=f"Option Account - {ticker}")
 
-            current_date = start_date
-            bonds = []
+                current_date = start_date
+                bonds = []
+                option_book = np.zeros(0, dtype=OPTION_DTYPE)
+                option_budget = 0  # Cents of bond interest not yet spent on options
+                bond_rate_dict = get_bond_rate_dict(start_date)
 
-            balance_history = [{
-                "date": current_date.strftime("%Y-%m-%d"),
-                "cash": cash_account.balance,
-                "bonds": 0.0,
-                "options": 0.0,
-                "account_balance": cash_account.balance,  # Add total balance
-                "bond_count": len(bonds)
-            }]
+                previous_records = [{
+                    "date": current_date.strftime("%Y-%m-%d"),
+                    "cash": cash_account.balance,
+                    "bonds": 0.0,
+                    "options": 0.0,
+                    "account_balance": cash_account.balance,  # Add total balance
+                    "bond_count": len(bonds),
+                    "invested": initial_investment,  # Only the initial investment is contributed
+                }]
+
+            bond_account = Account(start_date, initial_balance=0, name=f"Bond Account - {ticker}")
+            hybrid_account = Account(start_date, initial_balance=initial_investment, name=account_name)
+            hybrid_account.balance_history = []
+            for record in previous_records:
+                yield record_step(hybrid_account, record, keep_history)
+
+            # Volatility on every 1st of the month to simulate, estimated in one vectorized call
+            month_dates = month_schedule(current_date, end_date) if price_index else []
+            monthly_volatility = dict(zip(
+                (month_date.date() for month_date in month_dates),
+                rolling_volatility(price_index, np.array([month_date.date() for month_date in month_dates], dtype="datetime64[D]")).tolist(),
+            )) if month_dates else {}
+            option_value = 0  # Mark-to-market value of the open options book in cents
 
             while current_date <= end_date:
                 # Format the current date to match the bond rate data format
@@ -93,59 +216,79 @@ def run_hybrid_simulation(params):
                 annual_yield = bond_rate_dict.get(current_date_str, 0.0)
 
                 # Maturing bonds
-                interest_accrued = 0.0
                 for bond in bonds[:]:
                     if bond.is_matured(current_date):
-                        # Cash in the bond on its maturity date
-                        interest_accrued += bond.get_value() - bond.get_matured_value()
-                        cash_account.record_balance(current_date, cash_account.balance + bond.get_value())
+                        # Cash in the principal on its maturity date; the interest funds the options
+                        option_budget += bond.get_matured_value_cents() - bond.get_value_cents()
+                        cash_account.record_balance_cents(current_date, cash_account.balance_cents + bond.get_value_cents())
                         bonds.remove(bond)
 
-                # Purchase bonds in $100 increments
-                bond_purchase_amount = (cash_account.balance // 100) * 100
-                if bond_purchase_amount >= 100 and annual_yield > 0.0:  # Ensure valid rate and sufficient funds
-                    maturity_date = current_date + relativedelta(months=3)  # Set maturity date 3 months from now
-                    bond = Bond(investment=bond_purchase_amount, purchase_date=current_date, maturity_date=maturity_date, annual_yield=annual_yield)
+                # Purchase bonds in $100 (10,000 cent) increments
+                bond_purchase_cents = (cash_account.balance_cents // 10000) * 10000
+                if bond_purchase_cents >= 10000 and annual_yield > 0.0:  # Ensure valid rate and sufficient funds
+                    maturity_date = current_date + relativedelta(months=BOND_TERM_MONTHS)  # Set maturity date 3 months from now
+                    bond = Bond(investment=from_cents(bond_purchase_cents), purchase_date=current_date, maturity_date=maturity_date, annual_yield=annual_yield)
                     bonds.append(bond)
-                    cash_account.record_balance(current_date, cash_account.balance - bond_purchase_amount)
-
-                # Purchase options on the first day of each month
-                if current_date.day == 1 and cash_account.balance > 0:
-                    option_budget = interest_accrued
+                    cash_account.record_balance_cents(current_date, cash_account.balance_cents - bond_purchase_cents)
 
-                    # Get the stock price for the current date
-                    ticker_data = historical_data_dict.get(ticker, {})
-                    current_price = ticker_data.get(current_date.strftime("%Y-%m-%d"))
+                # Settle, price and buy options on the first day of each month
+                if current_date.day == 1:
+                    report_progress(ticker_index + (current_date - start_date).days / total_days, len(tickers))
+                    # Get the last stock price on or before the current date
+                    current_price = price_index.last_valid_close(current_date) if price_index else None
 
                     if current_price is not None:
-                        # Determine strike price and cost of options
-                        strike_price = current_price * uniform(1.05, 1.15)  # 5-15% above current price
-                        option_cost = option_budget
-
-                        # Simulate option outcome (e.g., profit or loss)
-                        option_profit = max(0, (current_price - strike_price) * (option_cost / current_price))
-                        option_account.record_balance(current_date, option_account.balance + option_profit)
+                        volatility = monthly_volatility[current_date.date()]
+                        option_book, payoff, spent, option_value = trade_options(
+                            option_book, current_date, current_price, annual_yield, volatility, from_cents(option_budget), strike_pct
+                        )
+                        # Option payoffs, premiums and values are floats; each enters the ledger rounded to the cent
+                        option_budget -= to_cents(spent)
+                        option_value = to_cents(option_value)
+                        option_account.record_balance_cents(current_date, option_account.balance_cents + to_cents(payoff))
 
                 # Record balances only on the 1st of the month
                 if current_date.day == 1:
-                    total_bond_value = sum(bond.get_value() for bond in bonds)
-                    total_balance = cash_account.balance + total_bond_value + option_account.balance
-                    balance_history.append({
+                    total_bond_cents = sum(bond.get_value_cents() for bond in bonds)
+                    total_option_cents = option_account.balance_cents + option_value
+                    total_cents = cash_account.balance_cents + total_bond_cents + total_option_cents + option_budget
+                    yield record_step(hybrid_account, {
                         "date": current_date.strftime("%Y-%m-%d"),
                         "cash": cash_account.balance,
-                        "bonds": total_bond_value,
-                        "options": option_account.balance,
-                        "account_balance": total_balance,
-                        "bond_count": len(bonds)
-                    })
+                        "bonds": from_cents(total_bond_cents),
+                        "options": from_cents(total_option_cents),
+                        "account_balance": from_cents(total_cents),
+                        "bond_count": len(bonds),
+                        "invested": initial_investment,
+                    }, keep_history)
 
                 current_date += relativedelta(days=1)
 
-            hybrid_account.balance_history = balance_history
-            accounts.append(hybrid_account)
+            if not keep_history:
+                continue
 
-        return accounts
+            save_checkpoint(checkpoint_key, end_date, {
+                "account_name": account_name,
+                "cash_cents": cash_account.balance_cents,
+                "options_cents": option_account.balance_cents,
+                "bonds": bonds,
+                "option_book": option_book.copy(),
+                "option_budget_cents": option_budget,
+            }, hybrid_account.balance_history, sources=[ticker, *BOND_RATE_SERIES])
 
     except Exception as e:
-        logging.error(f"Error in run_hybrid_simulation: {e}", exc_info=True)
-        raise
\ No newline at end of file
+        logging.error(f"Error in iter_hybrid_simulation: {e}", exc_info=True)
+        raise
+
+
+# Registry declaration (discovered by services/simulation_registry.py)
+SIMULATION = {
+    "id": "hybrid_simulation",
+    "name": "Hybrid Simulation",
+    "run": run_hybrid_simulation,
+    "steps": iter_hybrid_simulation,
+    "parameters": ["start_date", "end_date", "initial_investment", "tickers", "option_strike_pct"],
+    "data": {"tickers": True, "rate_series": BOND_RATE_SERIES},
+    "columns": ["cash", "bonds", "options", "account_balance", "bond_count", "invested"],
+    "cost": {"weight": 15.0, "per_ticker": True},
+}
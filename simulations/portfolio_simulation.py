@@ -0,0 +1,306 @@
+import hashlib
+import logging
+from datetime import datetime
+
+from models.account import Account
+from data_fetchers.getFREDData import fetch_bond_rates
+from data_fetchers.getYFinanceData import fetch_data, get_price_index
+from services.cache_service import cache_response, get_cached_response
+from utils.date_utils import month_schedule
+from utils.money import from_cents_array, to_cents_array
+from utils.stepping import collect_accounts, record_step
+
+logging.basicConfig(
+    level=logging.ERROR,
+    format="%(asctime)s - %(levelname)s - %(message)s [%(filename)s:%(lineno)d]"
+)
+
+# Months (1-12) on which each rebalance frequency rebalances
+REBALANCE_MONTHS = {
+    "monthly": set(range(1, 13)),
+    "quarterly": {1, 4, 7, 10},
+    "annually": {1},
+    "never": set(),
+}
+
+
+def _parse_list(value):
+    """
+    Splits a comma-separated parameter into a list of stripped strings.
+    """
+    if isinstance(value, str):
+        value = value.split(",")
+    return [item.strip() for item in value or [] if str(item).strip()]
+
+
+def _float_param(params, key, default):
+    """
+    Reads an optional numeric parameter, using the default when it is missing or blank.
+    """
+    value = params.get(key)
+    return float(default if value is None or str(value).strip() == "" else value)
+
+
+def _bond_sleeve_prices(month_dates, start_date, end_date):
+    """
+    Builds the price path of the bond sleeve: 1.0 on the first month, then growing each month by the
+    DGS10 yield in effect at the start of the previous month.
+
+    :return: Float array with one price per month date.
+    """
+    import numpy as np
+    from dotenv import load_dotenv
+    import os
+
+    load_dotenv(dotenv_path="./secrets.env")
+    bond_rates = fetch_bond_rates(os.getenv("FRED_API_KEY"), start_date=start_date.date(), end_date=end_date.date())
+
+    rate_dates = np.array([rate["date"][:10] for rate in bond_rates], dtype="datetime64[D]")
+    rate_values = np.array([rate["rate"] for rate in bond_rates], dtype=float)
+    valid = np.isfinite(rate_values)
+    rate_dates, rate_values = rate_dates[valid], rate_values[valid]
+    if len(rate_values) == 0:
+        raise ValueError("No bond rates available for the simulation period.")
+
+    # Yield on or before each month date (the first available yield before the series starts)
+    days = np.array([month_date.date() for month_date in month_dates], dtype="datetime64[D]")
+    positions = np.clip(np.searchsorted(rate_dates, days, side="right") - 1, 0, None)
+    monthly_yields = rate_values[positions] / 100 / 12
+
+    growth = np.concatenate(([1.0], 1 + monthly_yields[:-1]))
+    return np.cumprod(growth)
+
+
+def _simulate_portfolio(prices, targets, contributions, rebalance_flags, drift_threshold):
+    """
+    Runs the vectorized portfolio engine over an aligned (months x assets) price matrix.
+
+    Contributions buy every available asset at its target weight. Between rebalances, holdings are the
+    cumulative sum of those purchases, so each segment is a single cumsum over the matrix; a segment ends
+    on the first month that is a scheduled rebalance or whose weights drift past the threshold.
+
+    :param prices: Float array (months x assets), NaN where an asset has no price yet.
+    :param targets: Target weights per asset (summing to 1).
+    :param contributions: Amount contributed on each month.
+    :param rebalance_flags: Boolean array marking scheduled rebalance months.
+    :param drift_threshold: Maximum absolute weight drift before rebalancing (0 disables).
+    :return: Tuple of (holdings matrix, uninvested cash per month, rebalance count per month).
+    """
+    import numpy as np
+
+    months, assets = prices.shape
+    available = np.isfinite(prices)
+    safe_prices = np.where(available, prices, 1.0)
+    valuation_prices = np.where(available, prices, 0.0)
+
+    # Target weights renormalized over the assets that have a price each month
+    weights = targets * available
+    weight_sums = weights.sum(axis=1, keepdims=True)
+    investable = weight_sums[:, 0] > 0
+    weights = np.divide(weights, weight_sums, out=np.zeros_like(weights), where=weight_sums > 0)
+
+    # Contributions made while nothing is investable wait in cash until the next investable month
+    cumulative = np.cumsum(contributions)
+    invested_through = np.maximum.accumulate(np.where(investable, cumulative, 0.0))
+    invested_now = np.diff(np.concatenate(([0.0], invested_through)))
+    cash = cumulative - invested_through
+
+    purchases = invested_now[:, None] * weights / safe_prices
+    holdings = np.zeros_like(prices)
+    rebalance_counts = np.zeros(months, dtype=int)
+
+    # A segment can never extend past the next scheduled rebalance, so only that window is computed
+    scheduled = np.flatnonzero(rebalance_flags & investable)
+
+    base = np.zeros(assets)
+    segment_start = 0
+    rebalances = 0
+    while segment_start < months:
+        next_scheduled = scheduled[np.searchsorted(scheduled, segment_start)] if scheduled.size and scheduled[-1] >= segment_start else months - 1
+        window = slice(segment_start, next_scheduled + 1)
+        segment = base + np.cumsum(purchases[window], axis=0)
+        values = segment * valuation_prices[window]
+        totals = values.sum(axis=1)
+
+        # Months in this segment that trigger a rebalance
+        triggers = rebalance_flags[window].copy()
+        if drift_threshold > 0:
+            actual = np.divide(values, totals[:, None], out=np.zeros_like(values), where=totals[:, None] > 0)
+            drift = np.abs(actual - weights[window]).max(axis=1)
+            triggers |= drift > drift_threshold
+        triggers &= investable[window] & (totals > 0)
+
+        hits = np.flatnonzero(triggers)
+        end = segment_start + (hits[0] + 1 if len(hits) else len(segment))
+        holdings[segment_start:end] = segment[:end - segment_start]
+        rebalance_counts[segment_start:end] = rebalances
+
+        if not len(hits):
+            # No rebalance up to the next scheduled month (e.g. nothing invested yet): carry on after it
+            base = segment[-1]
+            segment_start = end
+            continue
+
+        # Rebalance at the trigger month and start a new segment after it
+        rebalance_month = end - 1
+        total_value = totals[rebalance_month - segment_start]
+        holdings[rebalance_month] = total_value * weights[rebalance_month] / safe_prices[rebalance_month]
+        rebalances += 1
+        rebalance_counts[rebalance_month] = rebalances
+        base = holdings[rebalance_month]
+        segment_start = end
+
+    return holdings, cash, rebalance_counts
+
+
+def run_portfolio_simulation(params):
+    """
+    Simulates a multi-asset portfolio with monthly contributions and periodic rebalancing.
+
+    :param params: The simulation parameters (see iter_portfolio_simulation).
+    :return: A list containing a single Account object representing the portfolio.
+    """
+    return collect_accounts(iter_portfolio_simulation(params))
+
+
+def iter_portfolio_simulation(params, keep_history=True):
+    """
+    Runs the portfolio simulation and yields its monthly records. The engine computes every month at
+    once, so only the records are produced lazily; the result is cached only when the history is kept.
+
+    Holdings are fractional and computed with NumPy over an aligned (months x assets) price matrix, so
+    the cost grows with the number of months times the number of tickers rather than calendar days.
+
+    :param params: A dictionary containing simulation parameters:
+                   - start_date: Start date of the simulation.
+                   - end_date: End date of the simulation.
+                   - initial_investment: Initial investment amount.
+                   - monthly_investment: Monthly investment amount.
+                   - tickers: List of stock tickers to hold.
+                   - weights: Optional comma-separated weights per ticker (default: equal weights).
+                   - bond_allocation: Optional percentage held in the DGS10 bond sleeve (default: 20).
+                   - rebalance_frequency: Optional "monthly", "quarterly", "annually" or "never" (default: quarterly).
+                   - rebalance_threshold: Optional drift in percentage points that triggers a rebalance (default: 5, 0 disables).
+    :param keep_history: Whether the account keeps its full balance history (False leaves it empty).
+    :return: Generator of (account, record) tuples.
+    """
+    try:
+        import numpy as np
+
+        start_date: datetime = datetime.strptime(params["start_date"], "%Y-%m-%d")
+        end_date: datetime = datetime.strptime(params["end_date"], "%Y-%m-%d")
+        initial_investment = int(str(params["initial_investment"]).replace("$", "").replace(",", ""))
+        monthly_investment = int(str(params["monthly_investment"]).replace("$", "").replace(",", ""))
+        tickers = _parse_list(params.get("tickers"))
+        weights = [float(weight) for weight in _parse_list(params.get("weights"))] or [1.0] * len(tickers)
+        bond_allocation = _float_param(params, "bond_allocation", 20) / 100
+        rebalance_frequency = (params.get("rebalance_frequency") or "quarterly").lower()
+        drift_threshold = _float_param(params, "rebalance_threshold", 5) / 100
+
+        if len(weights) != len(tickers):
+            raise ValueError("The number of weights must match the number of tickers.")
+        if rebalance_frequency not in REBALANCE_MONTHS:
+            raise ValueError(f"Invalid rebalance_frequency: {rebalance_frequency}")
+        if not tickers:
+            bond_allocation = 1.0 if bond_allocation > 0 else 0.0
+        if not tickers and not bond_allocation:
+            return
+
+        # hash the params to create a unique cache key
+        params_hash = hashlib.sha256(
+            f"{tickers},{weights},{bond_allocation},{rebalance_frequency},{drift_threshold},"
+            f"{start_date},{end_date},{initial_investment},{monthly_investment}".encode()
+        ).hexdigest()
+        cached_account = get_cached_response(f"portfolio_sim-{params_hash}")
+        if cached_account:
+            for record in cached_account.balance_history:
+                yield cached_account, record
+            return
+
+        month_dates = month_schedule(start_date, end_date)
+        account_name = f"(Portfolio) {', '.join(tickers[:3])}{f' +{len(tickers) - 3} more' if len(tickers) > 3 else ''}"
+        if bond_allocation:
+            account_name += f" / {bond_allocation:.0%} Bonds"
+        account = Account(start_date, initial_balance=initial_investment, name=account_name)
+        initial_record = {**account.balance_history[0], "invested": initial_investment, "cash": initial_investment, "stocks": 0.0, "bonds": 0.0, "rebalances": 0}
+        account.balance_history = []
+        if not month_dates:
+            yield record_step(account, initial_record, keep_history)
+            return
+
+        # Aligned (months x assets) price matrix: one column per ticker plus the bond sleeve
+        fetch_data(tickers=tickers, period="max")  # Load every ticker in one pass
+        price_indexes = [get_price_index(ticker, period="max") for ticker in tickers]
+        missing = [ticker for ticker, price_index in zip(tickers, price_indexes) if price_index is None]
+        if missing:
+            logging.error(f"No price data for tickers: {missing}")
+            if len(missing) == len(tickers) and not bond_allocation:
+                raise ValueError("Failed to fetch historical data for the provided tickers.")
+        columns = [price_index for price_index in price_indexes if price_index is not None]
+        stock_weights = np.array([weight for weight, price_index in zip(weights, price_indexes) if price_index is not None])
+
+        from utils.price_index import aligned_closes
+        prices = aligned_closes(columns, month_dates)
+        targets = stock_weights / stock_weights.sum() * (1 - bond_allocation) if len(columns) else np.zeros(0)
+        if bond_allocation:
+            prices = np.column_stack([prices, _bond_sleeve_prices(month_dates, start_date, end_date)])
+            targets = np.append(targets, bond_allocation)
+        targets = targets / targets.sum()
+
+        contributions = np.full(len(month_dates), float(monthly_investment))
+        contributions[0] += initial_investment
+        rebalance_flags = np.array([month_date.month in REBALANCE_MONTHS[rebalance_frequency] for month_date in month_dates])
+
+        holdings, cash, rebalance_counts = _simulate_portfolio(prices, targets, contributions, rebalance_flags, drift_threshold)
+
+        # Holdings are fractional, so each sleeve's value is rounded to the cent once, here; the balance is
+        # the exact sum of the rounded sleeves
+        values = holdings * np.where(np.isfinite(prices), prices, 0.0)
+        bond_cents = to_cents_array(values[:, -1] if bond_allocation else np.zeros(len(month_dates)))
+        stock_cents = to_cents_array(values[:, :len(columns)].sum(axis=1))
+        cash_cents = to_cents_array(cash)
+        balance_cents = stock_cents + bond_cents + cash_cents
+        invested_cents = np.cumsum(to_cents_array(contributions))
+        account.balance_cents = int(balance_cents[-1])
+        account.total_invested_cents = int(invested_cents[-1])
+
+        rows = zip(
+            from_cents_array(balance_cents).tolist(), from_cents_array(invested_cents).tolist(), from_cents_array(cash_cents).tolist(),
+            from_cents_array(stock_cents).tolist(), from_cents_array(bond_cents).tolist(), rebalance_counts.tolist(),
+        )
+        yield record_step(account, initial_record, keep_history)
+        for month_date, (balance, invested, cash_value, stock_value, bond_value, rebalances) in zip(month_dates, rows):
+            yield record_step(account, {
+                "date": month_date.strftime("%Y-%m-%d"),
+                "account_balance": balance,
+                "invested": invested,
+                "cash": cash_value,
+                "stocks": stock_value,
+                "bonds": bond_value,
+                "rebalances": rebalances,
+            }, keep_history)
+
+        if keep_history:
+            try:
+                cache_response(f"portfolio_sim-{params_hash}", account)
+            except Exception as e:
+                logging.error(f"Failed to cache portfolio simulation: {e}")
+    except Exception as e:
+        logging.error(f"Error in iter_portfolio_simulation: {e}", exc_info=True)
+        raise
+
+
+# Registry declaration (discovered by services/simulation_registry.py)
+SIMULATION = {
+    "id": "portfolio_simulation",
+    "name": "Portfolio Simulation",
+    "run": run_portfolio_simulation,
+    "steps": iter_portfolio_simulation,
+    "parameters": [
+        "start_date", "end_date", "initial_investment", "monthly_investment", "tickers", "weights",
+        "bond_allocation", "rebalance_frequency", "rebalance_threshold",
+    ],
+    "data": {"tickers": True, "rate_series": ["DGS10"]},
+    "columns": ["account_balance", "invested", "cash", "stocks", "bonds", "rebalances"],
+    "cost": {"weight": 1.0, "per_ticker": False},
+}
@@ -1,6 +1,8 @@
 import logging
 from models.account import Account
-from dateutil.relativedelta import relativedelta
+from utils.date_utils import month_schedule
+from utils.money import from_cents, to_cents
+from utils.stepping import collect_accounts, record_step
 from datetime import date, datetime
 
 
@@ -8,31 +10,68 @@ def run_savings_simulation(params):
     """
     Simulates a savings account where money is periodically added.
 
+    :param params: The simulation parameters (see iter_savings_simulation).
+    :return: A list containing a single Account object representing the savings simulation results.
+    """
+    return collect_accounts(iter_savings_simulation(params))
+
+
+def iter_savings_simulation(params, keep_history=True):
+    """
+    Steps through the savings simulation, yielding each monthly record as it is computed.
+
+    The balance only changes on the 1st of each month, so the month schedule is generated directly and
+    each balance is computed in closed form rather than stepping through every calendar day.
+
     :param params: A dictionary containing simulation parameters:
                    - start_date: Start date of the simulation.
                    - end_date: End date of the simulation.
                    - initial_investment: Initial investment amount.
                    - monthly_investment: Monthly investment amount.
-    :return: A list containing a single Account object representing the savings simulation results.
+                   - savings_interest_rate: Optional annual interest rate in percent, compounded monthly (default: 0).
+    :param keep_history: Whether the account keeps its full balance history (False leaves it empty).
+    :return: Generator of (account, record) tuples, starting with the initial record.
     """
     # Derive start_date and end_date as datetime objects
     start_date: datetime = datetime.strptime(params["start_date"], "%Y-%m-%d")
     end_date: datetime = datetime.strptime(params["end_date"], "%Y-%m-%d")
     initial_investment = int(str(params["initial_investment"].replace(",", "")))
     monthly_investment = int(str(params["monthly_investment"].replace(",", "")))
+    monthly_rate = float(params.get("savings_interest_rate") or 0) / 100 / 12
 
     # Create the account with the name "Saving"
     account = Account(start_date,initial_balance=initial_investment, name="Saving")
-    current_date: datetime = start_date
-
-    while current_date <= end_date:
-        if current_date.day == 1:
-            account.record_balance(current_date, account.balance + monthly_investment)
-            account.balance_history[-1].update({
-                "date": current_date.strftime("%Y-%m-%d"),
-                "account_balance": account.balance,
-                "monthly_investment": monthly_investment
-            })
-        current_date += relativedelta(days=1)
-
-    return [account]
+    initial_record = {**account.balance_history[0], "invested": initial_investment}
+    account.balance_history = []
+    yield record_step(account, initial_record, keep_history)
+
+    # Interest is credited on every 1st of the month after the start date, before that month's deposit, so on
+    # the k-th deposit the balance is initial * g^p + monthly * (g^k - 1) / (g - 1), with g = 1 + monthly_rate
+    # and p the number of interest credits so far. Compounded balances are rounded to the cent once, here.
+    for months, deposit_date in enumerate(month_schedule(start_date, end_date), start=1):
+        if monthly_rate:
+            periods = months - 1 if start_date.day == 1 else months
+            growth = (1 + monthly_rate) ** months
+            balance_cents = to_cents(initial_investment * (1 + monthly_rate) ** periods + monthly_investment * (growth - 1) / monthly_rate)
+        else:
+            balance_cents = to_cents(initial_investment) + to_cents(monthly_investment) * months
+        account.balance_cents = balance_cents
+        yield record_step(account, {
+            "date": deposit_date.strftime("%Y-%m-%d"),
+            "account_balance": from_cents(balance_cents),
+            "monthly_investment": monthly_investment,
+            "invested": initial_investment + monthly_investment * months,
+        }, keep_history)
+
+
+# Registry declaration (discovered by services/simulation_registry.py)
+SIMULATION = {
+    "id": "savings_simulation",
+    "name": "Savings Simulation",
+    "run": run_savings_simulation,
+    "steps": iter_savings_simulation,
+    "parameters": ["start_date", "end_date", "initial_investment", "monthly_investment", "savings_interest_rate"],
+    "data": {"tickers": False, "rate_series": []},
+    "columns": ["account_balance", "monthly_investment", "invested"],
+    "cost": {"weight": 0.1, "per_ticker": False},
+}
@@ -33,6 +33,152 @@ async function handleRequest(url, method = "GET", data = null) {
     }
 }
 
+// In-browser cache of GET responses: an LRU kept in memory and persisted in IndexedDB across reloads
+const CLIENT_CACHE_DB = "simulation-dashboard-cache";
+const CLIENT_CACHE_DB_VERSION = 1;
+const CLIENT_CACHE_STORES = ["search", "simulations"];
+
+let cacheDatabase = null;
+
+// Wraps an IndexedDB request in a promise
+function requestToPromise(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// Opens the cache database once; resolves to null if IndexedDB is unavailable (e.g., private browsing)
+function openCacheDatabase() {
+    if (!cacheDatabase) {
+        cacheDatabase = new Promise((resolve) => {
+            if (!window.indexedDB) {
+                resolve(null);
+                return;
+            }
+            const request = indexedDB.open(CLIENT_CACHE_DB, CLIENT_CACHE_DB_VERSION);
+            request.onupgradeneeded = () => {
+                CLIENT_CACHE_STORES.forEach((storeName) => {
+                    if (!request.result.objectStoreNames.contains(storeName)) {
+                        const store = request.result.createObjectStore(storeName, { keyPath: "key" });
+                        store.createIndex("usedAt", "usedAt");
+                    }
+                });
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => {
+                console.warn("Response cache unavailable:", request.error);
+                resolve(null);
+            };
+        });
+    }
+    return cacheDatabase;
+}
+
+class ResponseCache {
+    constructor(storeName, maxEntries) {
+        this.storeName = storeName;
+        this.maxEntries = maxEntries;
+        this.memory = new Map(); // Insertion order is recency order
+    }
+
+    // Returns the entry ({ key, etag, data, expiresAt, usedAt }) for a key, or null
+    async get(key) {
+        let entry = this.memory.get(key);
+        if (!entry) {
+            const db = await openCacheDatabase();
+            if (db) {
+                try {
+                    entry = await requestToPromise(db.transaction(this.storeName).objectStore(this.storeName).get(key));
+                } catch (error) {
+                    console.warn("Failed to read the response cache:", error);
+                }
+            }
+        }
+        if (!entry) return null;
+        await this.put(entry);
+        return entry;
+    }
+
+    // Stores an entry as the most recently used one, evicting the least recently used beyond maxEntries
+    async put(entry) {
+        entry.usedAt = Date.now();
+        this.memory.delete(entry.key);
+        this.memory.set(entry.key, entry);
+        while (this.memory.size > this.maxEntries) {
+            this.memory.delete(this.memory.keys().next().value);
+        }
+
+        const db = await openCacheDatabase();
+        if (!db) return;
+        try {
+            const store = db.transaction(this.storeName, "readwrite").objectStore(this.storeName);
+            await requestToPromise(store.put(entry));
+            let excess = (await requestToPromise(store.count())) - this.maxEntries;
+            if (excess <= 0) return;
+            const cursorRequest = store.index("usedAt").openCursor();
+            cursorRequest.onsuccess = () => {
+                const cursor = cursorRequest.result;
+                if (cursor && excess-- > 0) {
+                    cursor.delete();
+                    cursor.continue();
+                }
+            };
+        } catch (error) {
+            console.warn("Failed to write the response cache:", error);
+        }
+    }
+
+    async clear() {
+        this.memory.clear();
+        const db = await openCacheDatabase();
+        if (db) {
+            await requestToPromise(db.transaction(this.storeName, "readwrite").objectStore(this.storeName).clear());
+        }
+    }
+}
+
+const searchCache = new ResponseCache("search", 200);
+const simulationCache = new ResponseCache("simulations", 20);
+
+// Milliseconds a response may be reused without asking the server, from its Cache-Control header
+function freshnessLifetime(headers) {
+    const match = /max-age=(\d+)/.exec(headers["cache-control"] || "");
+    return match ? parseInt(match[1], 10) * 1000 : 0;
+}
+
+// GET with stale-while-revalidate: a cached response is rendered at once, then revalidated with its ETag
+// once it is no longer fresh (a 304 keeps it, a 200 replaces it and is rendered again)
+async function cachedGet(cache, url, { signal, onData, onMiss } = {}) {
+    const entry = await cache.get(url);
+    if (signal?.aborted) return;
+
+    if (entry) {
+        onData(entry.data, true);
+        if (Date.now() < entry.expiresAt) return;
+    } else if (onMiss) {
+        onMiss();
+    }
+
+    const response = await axios.get(url, {
+        signal,
+        headers: entry?.etag ? { "If-None-Match": entry.etag } : {},
+        validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+    });
+    const expiresAt = Date.now() + freshnessLifetime(response.headers);
+
+    if (response.status === 304) {
+        await cache.put({ ...entry, expiresAt });
+        return;
+    }
+
+    onData(response.data, false);
+    const cacheable = response.headers.etag && !/no-store/.test(response.headers["cache-control"] || "");
+    if (cacheable) {
+        await cache.put({ key: url, etag: response.headers.etag, data: response.data, expiresAt });
+    }
+}
+
 // Function to fetch and populate available simulations
 async function fetchSimulations() {
     try {
@@ -69,6 +215,8 @@ async function fetchSimulations() {
 // Fetch simulations on page load
 document.addEventListener("DOMContentLoaded", fetchSimulations);
 
+let simulateController = null; // Aborts a simulation request superseded by a newer one
+
 document.getElementById("simulate-btn").addEventListener("click", async () => {
     const form = document.getElementById("simulation-form");
     const formData = new FormData(form);
@@ -81,7 +229,7 @@ document.getElementById("simulate-btn").addEventListener("click", async () => {
         alert("Please select at least one simulation to run.");
         return;
     }
-    formData.append("simulations", selectedSimulations.join(","));
+    formData.set("simulations", selectedSimulations.join(",")); // Replaces the per-checkbox entries
 
     // Collect selected tickers (optional)
     const selectedTickers = Array.from(selectedTickersContainer.children).map((bubble) => bubble.textContent.trim());
@@ -90,6 +238,7 @@ document.getElementById("simulate-btn").addEventListener("click", async () => {
     }
 
     const params = new URLSearchParams(formData);
+    params.sort(); // Canonical order, so identical scenarios share a cache entry
 
     // Validate required fields
     const requiredFields = ["start_date", "end_date", "initial_investment", "monthly_investment"];
@@ -103,31 +252,49 @@ document.getElementById("simulate-btn").addEventListener("click", async () => {
     const graphDiv = document.getElementById("simulation-graph");
     const loadingIndicator = document.getElementById("loading-indicator");
 
-    // Show loading indicator and clear the graph
-    graphDiv.innerHTML = ""; // Clear any existing content
-    loadingIndicator.style.display = "block";
+    if (simulateController) simulateController.abort();
+    const controller = new AbortController();
+    simulateController = controller;
+    let rendered = false;
 
     try {
-        const response = await handleRequest(`/simulate?${params.toString()}`);
-        const { data, layout } = response.data;
-
-        if (!data || !layout) {
-            throw new Error("Invalid response from the server.");
-        }
-
-        // Render the graph using Plotly's API
-        Plotly.newPlot(graphDiv, data, layout);
+        await cachedGet(simulationCache, `/simulate?${params.toString()}`, {
+            signal: controller.signal,
+            onMiss: () => {
+                // Show loading indicator and clear the graph
+                graphDiv.innerHTML = ""; // Clear any existing content
+                loadingIndicator.style.display = "block";
+            },
+            onData: ({ data, layout }) => {
+                if (!data || !layout) {
+                    throw new Error("Invalid response from the server.");
+                }
+
+                // Render the graph using Plotly's API
+                Plotly.newPlot(graphDiv, data, layout);
+                rendered = true;
+            },
+        });
     } catch (error) {
-        alert("Error running simulation: " + (error.response?.data?.error || error.message));
+        if (axios.isCancel(error)) return;
+        if (rendered) {
+            console.warn("Failed to revalidate the cached simulation:", error);
+        } else {
+            alert("Error running simulation: " + (error.response?.data?.error || error.message));
+        }
     } finally {
-        // Hide loading indicator
-        loadingIndicator.style.display = "none";
+        // Hide loading indicator unless a newer request took over
+        if (simulateController === controller) {
+            loadingIndicator.style.display = "none";
+            simulateController = null;
+        }
     }
 });
 
 document.getElementById("clear-cache-btn").addEventListener("click", async () => {
     try {
         await handleRequest("/clear_cache", "POST");
+        await Promise.all([searchCache.clear(), simulationCache.clear()]);
         alert("Cache cleared successfully.");
     } catch (error) {
         alert("Error clearing cache: " + error.response.data.error);
@@ -137,6 +304,7 @@ document.getElementById("clear-cache-btn").addEventListener("click", async () =>
 document.getElementById("delete-data-cache-btn").addEventListener("click", async () => {
     try {
         await handleRequest("/delete_data_cache", "POST");
+        await simulationCache.clear();
         alert("Data cache deleted successfully.");
     } catch (error) {
         alert("Error deleting data cache: " + error.response.data.error);
@@ -150,34 +318,55 @@ const selectedTickers = new Set();
 
 let activeDropdownIndex = -1;
 
-// Function to fetch and display ticker search results
-tickerSearchInput.addEventListener("input", async () => {
-    const query = tickerSearchInput.value.trim();
-    if (!query) {
-        tickerDropdown.style.display = "none";
-        return;
-    }
+const SEARCH_DEBOUNCE_MS = 250; // Wait for a pause in typing before searching
+let searchTimer = null;
+let searchController = null; // Aborts the search for text that has since changed
+
+// Function to display ticker search results
+function renderTickerResults(results) {
+    // Populate the dropdown with results
+    tickerDropdown.innerHTML = "";
+    results.forEach(({ symbol, name }, index) => {
+        const listItem = document.createElement("li");
+        listItem.className = "dropdown-item";
+        listItem.innerHTML = `<strong>${symbol}</strong> - ${name}`;
+        listItem.addEventListener("click", () => addTicker(symbol));
+        listItem.setAttribute("data-index", index);
+        tickerDropdown.appendChild(listItem);
+    });
+
+    activeDropdownIndex = -1; // Reset active index
+    tickerDropdown.style.display = "block";
+}
 
+// Function to fetch ticker search results, from the response cache when possible
+async function searchTickers(query) {
+    const controller = new AbortController();
+    searchController = controller;
     try {
-        const response = await axios.get(`/search_tickers?query=${query}`);
-        const results = response.data.results;
-
-        // Populate the dropdown with results
-        tickerDropdown.innerHTML = "";
-        results.forEach(({ symbol, name }, index) => {
-            const listItem = document.createElement("li");
-            listItem.className = "dropdown-item";
-            listItem.innerHTML = `<strong>${symbol}</strong> - ${name}`;
-            listItem.addEventListener("click", () => addTicker(symbol));
-            listItem.setAttribute("data-index", index);
-            tickerDropdown.appendChild(listItem);
+        await cachedGet(searchCache, `/search_tickers?query=${encodeURIComponent(query)}`, {
+            signal: controller.signal,
+            onData: ({ results }) => renderTickerResults(results),
         });
-
-        activeDropdownIndex = -1; // Reset active index
-        tickerDropdown.style.display = "block";
     } catch (error) {
-        console.error("Error fetching tickers:", error);
+        if (!axios.isCancel(error)) {
+            console.error("Error fetching tickers:", error);
+        }
+    } finally {
+        if (searchController === controller) searchController = null;
+    }
+}
+
+tickerSearchInput.addEventListener("input", () => {
+    clearTimeout(searchTimer);
+    if (searchController) searchController.abort();
+
+    const query = tickerSearchInput.value.trim();
+    if (!query) {
+        tickerDropdown.style.display = "none";
+        return;
     }
+    searchTimer = setTimeout(() => searchTickers(query), SEARCH_DEBOUNCE_MS);
 });
 
 // Handle keyboard navigation for the dropdown
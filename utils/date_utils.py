@@ -25,3 +25,21 @@ def pad_historical_prices(historical_prices, start_date, end_date):
         current_date += timedelta(days=1)
 
     return padded_prices
+
+def month_schedule(start_date, end_date):
+    """
+    Lists the first day of every month that falls within the given range.
+
+    :param start_date: Start date of the range (inclusive).
+    :param end_date: End date of the range (inclusive).
+    :return: List of dates (same type as start_date) for each 1st of the month in the range.
+    """
+    # Months are counted from year 0 so stepping is plain integer arithmetic
+    month_index = start_date.year * 12 + start_date.month - 1 + (1 if start_date.day > 1 else 0)
+    last_index = end_date.year * 12 + end_date.month - 1
+
+    schedule = []
+    while month_index <= last_index:
+        schedule.append(start_date.replace(year=month_index // 12, month=month_index % 12 + 1, day=1))
+        month_index += 1
+    return schedule
@@ -0,0 +1,284 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+import zlib
+from array import array
+from datetime import datetime
+
+# File layout: MAGIC, one line of JSON header, then the zlib-compressed columnar payload
+MAGIC = b"DCACHE\n"
+SCHEMA_VERSION = 1
+CACHE_EXTENSION = ".dcache"
+COMPRESSION_LEVEL = 6
+DATA_CACHE_ROOT = "data_cache"
+DATA_CACHE_MAX_BYTES = int(os.getenv("DATA_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # Eviction starts above this
+
+
+class CacheCorruptError(ValueError):
+    """
+    Raised when a cache file is truncated, fails its checksum or has an unknown format.
+    """
+
+
+def _column_type(values):
+    """
+    Picks the storage type for a column: "i8" (integers), "f8" (numbers and None) or "json".
+    """
+    def is_number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    if all(isinstance(value, int) and not isinstance(value, bool) and -2**63 <= value < 2**63 for value in values):
+        return "i8"
+    if all(value is None or is_number(value) for value in values):
+        return "f8"
+    return "json"
+
+
+def _encode_column(values):
+    """
+    Encodes a column into bytes plus its header entry.
+    """
+    column_type = _column_type(values)
+    nulls = []
+    if column_type == "i8":
+        data = array("q", values).tobytes()
+    elif column_type == "f8":
+        nulls = [position for position, value in enumerate(values) if value is None]
+        data = array("d", (math.nan if value is None else value for value in values)).tobytes()
+    else:
+        data = json.dumps(values, separators=(",", ":")).encode()
+    return data, {"type": column_type, "size": len(data), "nulls": nulls}
+
+
+def _decode_column(data, column):
+    """
+    Decodes a column's bytes back into a list of values.
+    """
+    if column["type"] == "i8":
+        return array("q", data).tolist()
+    if column["type"] == "f8":
+        values = array("d", data).tolist()
+        for position in column["nulls"]:
+            values[position] = None
+        return values
+    if column["type"] == "json":
+        return json.loads(data)
+    raise CacheCorruptError(f"Unknown column type: {column['type']}")
+
+
+def write_cache_file(file_path, records, source):
+    """
+    Writes records (a list of dictionaries with the same keys) to a compressed, checksummed cache file.
+
+    The write goes to a unique temporary file that replaces the target, so readers never see a partial file.
+
+    :param file_path: The cache file path.
+    :param records: List of row dictionaries.
+    :param source: Where the data came from (e.g., "yfinance", "fred").
+    """
+    names = list(records[0]) if records else []
+    blobs, columns = [], []
+    for name in names:
+        data, column = _encode_column([record.get(name) for record in records])
+        blobs.append(data)
+        columns.append({"name": name, **column})
+
+    payload = zlib.compress(b"".join(blobs), COMPRESSION_LEVEL)
+    header = {
+        "schema_version": SCHEMA_VERSION,
+        "source": source,
+        "fetched_at": datetime.now().isoformat(timespec="seconds"),
+        "rows": len(records),
+        "columns": columns,
+        "compression": "zlib",
+        "payload_size": len(payload),
+        "checksum": hashlib.sha256(payload).hexdigest(),
+    }
+
+    # Each writer gets its own temporary file, so concurrent writes of the same file don't interleave
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(MAGIC)
+            f.write(json.dumps(header, separators=(",", ":")).encode())
+            f.write(b"\n")
+            f.write(payload)
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+def read_cache_header(file_path):
+    """
+    Reads only the header of a cache file.
+
+    :param file_path: The cache file path.
+    :return: The header dictionary.
+    :raises CacheCorruptError: If the file does not start with a valid header.
+    """
+    with open(file_path, "rb") as f:
+        return _read_header(f)
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise CacheCorruptError("Missing cache file signature.")
+    try:
+        header = json.loads(f.readline())
+    except ValueError as e:
+        raise CacheCorruptError(f"Unreadable cache header: {e}")
+    if header.get("schema_version") != SCHEMA_VERSION:
+        raise CacheCorruptError(f"Unsupported cache schema version: {header.get('schema_version')}")
+    return header
+
+
+def read_cache_file(file_path):
+    """
+    Reads a cache file written by write_cache_file, verifying its checksum.
+
+    :param file_path: The cache file path.
+    :return: List of row dictionaries.
+    :raises CacheCorruptError: If the file is truncated, corrupted or in an unknown format.
+    """
+    with open(file_path, "rb") as f:
+        header = _read_header(f)
+        payload = f.read()
+
+    if len(payload) != header["payload_size"] or hashlib.sha256(payload).hexdigest() != header["checksum"]:
+        raise CacheCorruptError("Cache payload does not match its checksum.")
+    try:
+        data = zlib.decompress(payload)
+    except zlib.error as e:
+        raise CacheCorruptError(f"Cache payload could not be decompressed: {e}")
+
+    columns, offset = {}, 0
+    for column in header["columns"]:
+        columns[column["name"]] = _decode_column(data[offset:offset + column["size"]], column)
+        offset += column["size"]
+    if offset != len(data) or any(len(values) != header["rows"] for values in columns.values()):
+        raise CacheCorruptError("Cache payload does not match its header.")
+
+    # Reads count as uses for the least-recently-used eviction. Only the access time is set (explicitly, so
+    # noatime mounts don't matter): the modification time stays the time the content was written, which
+    # fetch_yield_curve compares to tell whether a curve is older than its series.
+    try:
+        os.utime(file_path, (time.time(), os.stat(file_path).st_mtime))
+    except OSError:
+        pass
+
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def load_cached_records(file_path, source):
+    """
+    Loads records from a cache file, migrating a legacy JSON file with the same name if needed.
+
+    :param file_path: The cache file path (with CACHE_EXTENSION).
+    :param source: Source recorded when a legacy file is migrated.
+    :return: List of row dictionaries, or None if there is no usable cache. A corrupt file is left in
+             place for the caller's refetch to replace atomically.
+    """
+    if os.path.exists(file_path):
+        try:
+            return read_cache_file(file_path)
+        except (CacheCorruptError, KeyError, OSError) as e:
+            logging.warning(f"Corrupt cache file {file_path} ({e}). Refetching the data.")
+            return None
+
+    legacy_path = f"{os.path.splitext(file_path)[0]}.json"
+    if os.path.exists(legacy_path):
+        try:
+            with open(legacy_path, "r") as f:
+                records = json.load(f)
+        except (ValueError, OSError) as e:
+            logging.warning(f"Unreadable legacy cache file {legacy_path} ({e}). Refetching the data.")
+            _remove(legacy_path)
+            return None
+        try:
+            write_cache_file(file_path, records, source)
+            _remove(legacy_path)
+        except Exception as e:
+            logging.error(f"Failed to migrate legacy cache file {legacy_path}: {e}")
+        return records
+
+    return None
+
+
+def save_cached_records(file_path, records, source):
+    """
+    Writes records to a cache file, then evicts old cache files if the directory grew past its limit.
+
+    :param file_path: The cache file path (with CACHE_EXTENSION).
+    :param records: List of row dictionaries.
+    :param source: Where the data came from (e.g., "yfinance", "fred").
+    """
+    write_cache_file(file_path, records, source)
+    try:
+        enforce_cache_size(keep=file_path)
+    except Exception as e:
+        logging.error(f"Failed to enforce the data cache size limit: {e}")
+
+
+def records_digest(records, *keys):
+    """
+    Hashes the given columns of a list of records, so any changed value (not just new rows) changes it.
+
+    :param records: List of row dictionaries.
+    :param keys: The columns to hash (e.g., "Date", "Close").
+    :return: A 16-character hex digest.
+    """
+    rows = [[record.get(key) for key in keys] for record in records]
+    return hashlib.sha256(json.dumps(rows, default=str).encode()).hexdigest()[:16]
+
+
+def _remove(file_path):
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+
+def enforce_cache_size(root=DATA_CACHE_ROOT, max_bytes=None, keep=None):
+    """
+    Evicts the least recently used cache files (by the later of their last read and last write) until the
+    directory fits within the size limit.
+
+    :param root: The cache directory.
+    :param max_bytes: The size limit in bytes (default: DATA_CACHE_MAX_BYTES).
+    :param keep: Optional file path that is never evicted (e.g., the file just written).
+    :return: List of evicted file paths.
+    """
+    max_bytes = DATA_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    kept_path = os.path.abspath(keep) if keep else None
+    entries, total = [], 0
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            if filename.endswith(CACHE_EXTENSION):
+                file_path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                total += stat.st_size
+                if os.path.abspath(file_path) != kept_path:
+                    entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, file_path))
+
+    evicted = []
+    for _, size, file_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        _remove(file_path)
+        total -= size
+        evicted.append(file_path)
+    if evicted:
+        logging.info(f"Evicted {len(evicted)} cache files to keep {root} under {max_bytes} bytes.")
+    return evicted
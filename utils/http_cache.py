@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import os
+
+from flask import Response, request
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # Bytes; smaller bodies are sent as-is
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/x-ndjson", "text/html", "text/plain", "text/css", "application/javascript")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_brotli = None
+
+
+def _get_brotli():
+    """
+    Returns the brotli module if it is installed (optional dependency), otherwise False.
+    """
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = False
+    return _brotli
+
+
+def body_etag(body):
+    """
+    Builds an ETag from a response body.
+
+    :param body: The response body as bytes.
+    :return: Hex digest usable as an ETag.
+    """
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def is_not_modified(etag):
+    """
+    Checks whether the request's If-None-Match header already names the given ETag.
+
+    ETags are weak because the same representation may be sent with different content encodings.
+    """
+    return etag is not None and request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag, max_age):
+    """
+    Builds an empty 304 response carrying the caching headers.
+
+    :param etag: The current ETag.
+    :param max_age: Seconds clients and proxies may reuse the response without revalidating.
+    """
+    return add_cache_headers(Response(status=304), etag, max_age)
+
+
+def add_cache_headers(response, etag, max_age):
+    """
+    Sets the ETag and Cache-Control headers on a response.
+
+    :param response: The Flask response.
+    :param etag: The ETag (None to skip it).
+    :param max_age: Seconds clients and proxies may reuse the response without revalidating.
+    :return: The response.
+    """
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = f"public, max-age={max_age}"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def compress_response(response):
+    """
+    Compresses a large text or JSON response with brotli (if installed) or gzip, based on the request's
+    Accept-Encoding. Streamed, already encoded and small responses are left untouched.
+
+    :param response: The Flask response.
+    :return: The response.
+    """
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+
+    accepted = request.accept_encodings
+    brotli = _get_brotli()
+    if brotli and accepted["br"]:
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+        response.headers["Content-Encoding"] = "br"
+    elif accepted["gzip"]:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0))
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,243 @@
+import logging
+import math
+import os
+
+import numpy as np
+
+from utils import money
+
+# Kernel configuration (overridable through the environment)
+SIMULATION_KERNELS = os.getenv("SIMULATION_KERNELS", "1") == "1"  # "0" runs the original per-day Python loops
+USE_NUMBA = os.getenv("USE_NUMBA", "1") == "1"  # Compile the kernels with Numba when it is installed
+
+_numba = None
+
+
+def _get_numba():
+    """
+    Returns the numba module if it is installed (optional dependency) and enabled, otherwise False.
+    """
+    global _numba
+    if _numba is None:
+        _numba = False
+        if USE_NUMBA:
+            try:
+                import numba
+                _numba = numba
+            except ImportError:
+                pass
+    return _numba
+
+
+def kernel_backend():
+    """
+    Returns the backend the kernels run on: "numba" or "python".
+    """
+    return "numba" if _get_numba() else "python"
+
+
+def kernel(function):
+    """
+    Compiles a kernel with Numba in nopython mode (machine code cached on disk, GIL released) when Numba
+    is installed. Otherwise, or if compilation fails, the plain Python function runs instead; it computes
+    the same results, only slower.
+
+    Kernels must only use scalars, NumPy arrays and the math module so both backends can run them.
+
+    :param function: The kernel function.
+    :return: Callable running the kernel; the Python implementation stays available as .py_func.
+    """
+    numba = _get_numba()
+    if not numba:
+        function.py_func = function
+        return function
+
+    compiled = [numba.njit(cache=True, nogil=True)(function)]
+
+    def run(*args):
+        if compiled[0] is not None:
+            try:
+                return compiled[0](*args)
+            except numba.core.errors.NumbaError as e:
+                logging.error(f"Failed to compile kernel {function.__name__}, using the Python implementation: {e}")
+                compiled[0] = None
+        return function(*args)
+
+    run.__name__ = function.__name__
+    run.__doc__ = function.__doc__
+    run.py_func = function
+    return run
+
+
+def kernel_helper(function):
+    """
+    Compiles a scalar helper that kernels call (e.g., the cents arithmetic of utils/money.py) with Numba
+    when it is installed, so compiled kernels can call it; otherwise returns the function unchanged.
+    """
+    numba = _get_numba()
+    return numba.njit(cache=True, nogil=True)(function) if numba else function
+
+
+# Cents arithmetic shared with Account, Bond and the per-day loops
+to_cents = kernel_helper(money.to_cents)
+interest_cents = kernel_helper(money.interest_cents)
+percent_to_basis_points = kernel_helper(money.percent_to_basis_points)
+shares_affordable = kernel_helper(money.shares_affordable)
+
+
+def day_range(start_date, end_date):
+    """
+    Returns every calendar day from start_date to end_date (inclusive) as datetime64[D].
+    """
+    return np.arange(np.datetime64(start_date.date(), "D"), np.datetime64(end_date.date(), "D") + 1)
+
+
+def first_of_month_mask(days):
+    """
+    Flags the days that are the 1st of their month.
+    """
+    return days == days.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def add_months(days, months):
+    """
+    Vectorized relativedelta(months=...): moves each day forward by whole months, clipping to the end of
+    shorter months (e.g., Nov 30 + 3 months is Feb 28 or 29).
+    """
+    month_starts = days.astype("datetime64[M]")
+    day_of_month = (days - month_starts.astype("datetime64[D]")).astype(np.int64)
+    target_months = month_starts + months
+    target_lengths = ((target_months + 1).astype("datetime64[D]") - target_months.astype("datetime64[D]")).astype(np.int64)
+    return target_months.astype("datetime64[D]") + np.minimum(day_of_month, target_lengths - 1)
+
+
+@kernel
+def bond_ladder_kernel(days, yields, first_of_month, maturities, term_months, cash, monthly_investment,
+                       book_investments, book_purchases, book_maturities, book_yields, book_values, book_count):
+    """
+    Daily state machine of a bond ladder: bonds maturing on a day are cashed in (in purchase order), the
+    cash is reinvested in $100 increments at the day's yield, and on the 1st of each month the balances
+    are recorded before the monthly investment is added. All money is in integer cents.
+
+    All bonds have the same term, so they mature in purchase order and the open bonds are a queue.
+
+    :param days: Day numbers (days since 1970-01-01) of the simulated days.
+    :param yields: Annual yield in percent on each day (0 where no rate is published).
+    :param first_of_month: Boolean flags for the days that are the 1st of their month.
+    :param maturities: Day number a bond bought on each day matures.
+    :param term_months: Term of newly bought bonds in months.
+    :param cash: Cash at the start in cents.
+    :param monthly_investment: Cents added after each monthly record.
+    :param book_*: Arrays holding the open bonds in purchase order (investment in cents, purchase day,
+                   maturity day, yield, value at maturity in cents), with room for one more bond per simulated day.
+    :param book_count: Number of open bonds at the start.
+    :return: Tuple of (record day positions, record cash, record bond values, record yields, cash, first, end),
+             money in cents: the bonds still open are book_*[first:end].
+    """
+    record_count = 0
+    for position in range(len(days)):
+        if first_of_month[position]:
+            record_count += 1
+    record_positions = np.empty(record_count, dtype=np.int64)
+    record_cash = np.empty(record_count, dtype=np.int64)
+    record_bonds = np.empty(record_count, dtype=np.int64)
+    record_yields = np.empty(record_count)
+
+    first, end = 0, book_count
+    open_total = 0
+    for index in range(book_count):
+        open_total += book_investments[index]
+
+    record = 0
+    for position in range(len(days)):
+        day = days[position]
+        annual_yield = yields[position]
+
+        # Maturing bonds are cashed in with their interest
+        while first < end and day >= book_maturities[first]:
+            cash += book_values[first]
+            open_total -= book_investments[first]
+            first += 1
+
+        # Purchase bonds in $100 increments
+        amount = (cash // 10000) * 10000
+        if amount >= 10000 and annual_yield > 0.0:
+            book_investments[end] = amount
+            book_purchases[end] = day
+            book_maturities[end] = maturities[position]
+            book_yields[end] = annual_yield
+            book_values[end] = amount + interest_cents(amount, percent_to_basis_points(annual_yield), term_months)
+            end += 1
+            open_total += amount
+            cash -= amount
+
+        if first_of_month[position]:
+            record_positions[record] = position
+            record_cash[record] = cash
+            record_bonds[record] = open_total
+            record_yields[record] = annual_yield
+            record += 1
+
+            cash += monthly_investment
+
+    return record_positions, record_cash, record_bonds, record_yields, cash, first, end
+
+
+@kernel
+def dca_kernel(prices, first_of_month, fallback_prices, cash, shares, investment_value, current_price, monthly_investment):
+    """
+    Daily state machine of dollar-cost averaging: the monthly investment arrives on the 1st, and whenever
+    the cash covers at least one share on a trading day, as many whole shares as possible are bought.
+    Balances are recorded on the 1st of each month. Money is in integer cents; a purchase's cost and the
+    shares' value are rounded to the cent when they are computed.
+
+    :param prices: Close on each simulated day (NaN on days without a close).
+    :param first_of_month: Boolean flags for the days that are the 1st of their month.
+    :param fallback_prices: Price recorded on a 1st without a usable current price (last valid close before
+                            that day, or 0).
+    :param cash: Cash at the start in cents.
+    :param shares: Shares held at the start.
+    :param investment_value: Value of the shares at the last purchase in cents.
+    :param current_price: Last price looked up (NaN if none).
+    :param monthly_investment: Cents added on the 1st of each month.
+    :return: Tuple of (record day positions, record cash, record shares, record prices, record investment values,
+             cash, shares, investment_value, current_price), money in cents.
+    """
+    record_count = 0
+    for position in range(len(prices)):
+        if first_of_month[position]:
+            record_count += 1
+    record_positions = np.empty(record_count, dtype=np.int64)
+    record_cash = np.empty(record_count, dtype=np.int64)
+    record_shares = np.empty(record_count, dtype=np.int64)
+    record_prices = np.empty(record_count)
+    record_values = np.empty(record_count, dtype=np.int64)
+
+    record = 0
+    for position in range(len(prices)):
+        if first_of_month[position]:
+            cash = cash + monthly_investment
+
+        if cash > 0:
+            current_price = prices[position]
+            if not math.isnan(current_price):
+                shares_to_buy = shares_affordable(cash, current_price)
+                if shares_to_buy > 0:
+                    shares += shares_to_buy
+                    cost = to_cents(shares_to_buy * current_price)
+                    if cash >= cost:
+                        cash -= cost
+                    investment_value = to_cents(shares * current_price)
+
+        if first_of_month[position]:
+            if math.isnan(current_price) or current_price == 0:
+                current_price = fallback_prices[position]
+            record_positions[record] = position
+            record_cash[record] = cash
+            record_shares[record] = shares
+            record_prices[record] = current_price
+            record_values[record] = investment_value
+            record += 1
+
+    return (record_positions, record_cash, record_shares, record_prices, record_values,
+            cash, shares, investment_value, current_price)
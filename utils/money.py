@@ -0,0 +1,95 @@
+import hashlib
+import json
+import math
+
+# Money is held as integer cents; dollars only appear at the edges (parameters in, recorded rows out).
+# Rounding to the cent happens only where a float enters the ledger (a market value, an option payoff,
+# compounded interest), always with to_cents, so loops and kernels produce identical cents.
+CENTS_PER_DOLLAR = 100
+BASIS_POINTS_PER_UNIT = 10000  # 1 basis point is 0.01%
+MONTHS_PER_YEAR = 12
+
+
+def to_cents(amount):
+    """
+    Converts a dollar amount to integer cents, rounding half away from zero.
+
+    Written with math.floor only, so the compiled kernels round exactly like the Python code.
+
+    :param amount: Dollar amount (int or float).
+    :return: Integer cents.
+    """
+    if amount < 0:
+        return -int(math.floor(-amount * CENTS_PER_DOLLAR + 0.5))
+    return int(math.floor(amount * CENTS_PER_DOLLAR + 0.5))
+
+
+def from_cents(cents):
+    """
+    Converts integer cents back to a dollar float (the nearest float to the exact decimal amount).
+    """
+    return cents / CENTS_PER_DOLLAR
+
+
+def percent_to_basis_points(rate):
+    """
+    Converts an annual rate in percent (e.g., 4.25) to integer basis points (425).
+    """
+    return int(math.floor(rate * 100 + 0.5))
+
+
+def interest_cents(principal_cents, basis_points, months):
+    """
+    Simple interest on a principal for a number of months, computed in integers and rounded half up to
+    the cent once.
+
+    :param principal_cents: Principal in cents (non-negative).
+    :param basis_points: Annual rate in basis points (non-negative).
+    :param months: Term in months.
+    :return: Interest in cents.
+    """
+    denominator = BASIS_POINTS_PER_UNIT * MONTHS_PER_YEAR
+    return (principal_cents * basis_points * months + denominator // 2) // denominator
+
+
+def shares_affordable(cash_cents, price):
+    """
+    Returns the number of whole shares the cash buys at a price (0 if the price is not positive).
+
+    :param cash_cents: Cash in cents.
+    :param price: Price of one share in dollars.
+    """
+    if not price > 0:
+        return 0
+    return int(math.floor(cash_cents / (price * CENTS_PER_DOLLAR)))
+
+
+def to_cents_array(amounts):
+    """
+    Array form of to_cents: converts dollar amounts to an int64 array of cents with the same rounding.
+    """
+    import numpy as np
+
+    scaled = np.asarray(amounts, dtype=float) * CENTS_PER_DOLLAR
+    return (np.sign(scaled) * np.floor(np.abs(scaled) + 0.5)).astype(np.int64)
+
+
+def from_cents_array(cents):
+    """
+    Array form of from_cents: converts an int64 array of cents to dollar floats.
+    """
+    import numpy as np
+
+    return np.asarray(cents, dtype=np.int64) / CENTS_PER_DOLLAR
+
+
+def ledger_digest(balance_history):
+    """
+    Returns a SHA-256 digest of a balance history. Every money column is derived from integer cents, so
+    two engines that agree on the ledger produce the same digest, which can be cached and compared.
+
+    :param balance_history: List of dictionaries (one per recorded date).
+    :return: Hex digest.
+    """
+    encoded = json.dumps(balance_history, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
@@ -0,0 +1,84 @@
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+DEFAULT_VOLATILITY_WINDOW = 63  # Trading days (about three months)
+MIN_VOLATILITY_RETURNS = 20  # Fewer returns than this give no estimate
+
+
+def norm_cdf(x):
+    """
+    Standard normal cumulative distribution function for NumPy arrays.
+
+    Uses the Abramowitz-Stegun 7.1.26 approximation of erf (absolute error below 1.5e-7), which avoids
+    a SciPy dependency.
+
+    :param x: Array of values.
+    :return: Array of probabilities.
+    """
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def black_scholes_call(spot, strike, time_to_expiry, rate, volatility):
+    """
+    Prices European calls with Black-Scholes over arrays of contracts.
+
+    Contracts at or past expiry (or with no volatility) are worth their (discounted) intrinsic value.
+
+    :param spot: Underlying prices.
+    :param strike: Strike prices.
+    :param time_to_expiry: Years until expiry.
+    :param rate: Continuously compounded risk-free rates (as decimals, e.g., 0.04).
+    :param volatility: Annualized volatilities (as decimals, e.g., 0.25).
+    :return: Array of call prices per share.
+    """
+    spot, strike, time_to_expiry, rate, volatility = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (spot, strike, time_to_expiry, rate, volatility))
+    )
+    time_to_expiry = np.maximum(time_to_expiry, 0.0)
+    discount = np.exp(-rate * time_to_expiry)
+    intrinsic = np.maximum(spot - strike * discount, 0.0)
+
+    priced = (time_to_expiry > 0) & (volatility > 0) & (spot > 0) & (strike > 0)
+    prices = intrinsic.copy()
+    if priced.any():
+        s, k, t, r, v = (value[priced] for value in (spot, strike, time_to_expiry, rate, volatility))
+        sqrt_t = np.sqrt(t)
+        d1 = (np.log(s / k) + (r + 0.5 * v * v) * t) / (v * sqrt_t)
+        d2 = d1 - v * sqrt_t
+        prices[priced] = s * norm_cdf(d1) - k * np.exp(-r * t) * norm_cdf(d2)
+    return prices
+
+
+def rolling_volatility(price_index, dates, window=DEFAULT_VOLATILITY_WINDOW):
+    """
+    Estimates annualized volatility from the log returns of the closes in the trailing window ending on
+    or before each date.
+
+    :param price_index: The ticker's PriceIndex (cached closes).
+    :param dates: Array of numpy datetime64[D] values.
+    :param window: Number of daily returns in the window.
+    :return: Array of volatilities (NaN where fewer than MIN_VOLATILITY_RETURNS returns are available).
+    """
+    closes = price_index.valid_closes
+    returns = np.diff(np.log(closes)) if len(closes) > 1 else np.zeros(0)
+
+    # Prefix sums make every window's mean and variance O(1)
+    sums = np.concatenate(([0.0], np.cumsum(returns)))
+    squares = np.concatenate(([0.0], np.cumsum(returns * returns)))
+
+    # Return i ends at close i + 1, so the returns available on a date are those before its close position
+    ends = np.searchsorted(price_index.valid_dates, dates, side="right") - 1
+    ends = np.clip(ends, 0, None)
+    starts = np.clip(ends - window, 0, None)
+    counts = ends - starts
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (sums[ends] - sums[starts]) / counts
+        variances = (squares[ends] - squares[starts] - counts * means * means) / (counts - 1)
+    volatility = np.sqrt(np.maximum(variances, 0.0) * TRADING_DAYS_PER_YEAR)
+    return np.where(counts >= max(MIN_VOLATILITY_RETURNS, 2), volatility, np.nan)
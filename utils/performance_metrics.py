@@ -0,0 +1,156 @@
+import os
+
+import numpy as np
+
+DAYS_PER_YEAR = 365.25
+RISK_FREE_RATE = float(os.getenv("METRICS_RISK_FREE_RATE", "0"))  # Annual rate (decimal) used by the Sharpe ratio
+IRR_GUESS = 0.05
+IRR_MAX_ITERATIONS = 50
+IRR_TOLERANCE = 1e-9
+METRIC_NAMES = ("cagr", "max_drawdown", "volatility", "sharpe", "irr")
+
+
+def _to_matrix(balance_histories):
+    """
+    Pads balance histories of different lengths into (accounts x rows) arrays.
+
+    Rows without an "invested" column are treated as having no contributions after the first row.
+
+    :return: Tuple of (balances, invested, days, lengths); padding is NaN.
+    """
+    count = len(balance_histories)
+    width = max((len(history) for history in balance_histories), default=0)
+    balances = np.full((count, width), np.nan)
+    invested = np.full((count, width), np.nan)
+    days = np.full((count, width), np.nan)
+    lengths = np.zeros(count, dtype=np.int64)
+    parsed_dates = {}  # Accounts of one request usually share their dates, which are parsed once
+
+    for row, history in enumerate(balance_histories):
+        size = len(history)
+        if not size:
+            continue
+        balances[row, :size] = [entry["account_balance"] for entry in history]
+        if all("invested" in entry for entry in (history[0], history[-1])):
+            invested[row, :size] = [entry["invested"] for entry in history]
+        else:
+            invested[row, :size] = [entry.get("invested", history[0]["account_balance"]) for entry in history]
+
+        dates = [entry["date"] for entry in history]
+        known = parsed_dates.get((dates[0], dates[-1], size))
+        if known is None or known[0] != dates:
+            known = (dates, np.array(dates, dtype="datetime64[D]").astype(np.int64))
+            parsed_dates[(dates[0], dates[-1], size)] = known
+        days[row, :size] = known[1]
+        lengths[row] = size
+    return balances, invested, days, lengths
+
+
+def _irr(cash_flows, years, active):
+    """
+    Solves every account's money-weighted return at once with Newton's method on the NPV of its cash flows.
+
+    :param cash_flows: (accounts x rows) flows, negative for contributions and positive for the final value.
+    :param years: (accounts x rows) years since each account's first row.
+    :param active: Accounts to solve (others, and accounts that don't converge, get NaN).
+    :return: Array of annual rates.
+    """
+    rate = np.full(len(cash_flows), IRR_GUESS)
+    converged = np.zeros(len(cash_flows), dtype=bool)
+    solving = active.copy()
+    for _ in range(IRR_MAX_ITERATIONS):
+        if not solving.any():
+            break
+        flows, times = cash_flows[solving], years[solving]
+        with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+            discounted = flows * np.exp(-times * np.log1p(rate[solving, None]))
+            npv = discounted.sum(axis=1)
+            slope = -(times * discounted).sum(axis=1) / (1.0 + rate[solving])
+            step = np.where(slope != 0, npv / slope, np.nan)
+        updated = np.maximum(rate[solving] - step, -0.9999)  # Stay above -100% so the discount base stays positive
+
+        indexes = np.flatnonzero(solving)
+        rate[indexes] = updated
+        done = np.abs(step) < IRR_TOLERANCE
+        converged[indexes[done]] = True
+        solving[indexes[done | ~np.isfinite(updated)]] = False
+
+    rate[~converged] = np.nan
+    return rate
+
+
+def compute_metrics(balance_histories, risk_free_rate=None):
+    """
+    Computes performance metrics for many accounts at once.
+
+    Returns are time-weighted: each period's return excludes the contributions made in it (the increase of
+    the "invested" column), so CAGR, drawdown, volatility and Sharpe measure the investment rather than
+    the deposits. The money-weighted return (IRR) treats the contributions as negative cash flows and the
+    final balance as a positive one.
+
+    :param balance_histories: List of balance histories (lists of dictionaries with "date" and
+                              "account_balance", and optionally the cumulative "invested").
+    :param risk_free_rate: Annual risk-free rate for the Sharpe ratio (default: RISK_FREE_RATE).
+    :return: List of dictionaries with cagr, max_drawdown, volatility, sharpe and irr (decimals, None when
+             undefined), plus total_invested, final_balance and profit.
+    """
+    risk_free_rate = RISK_FREE_RATE if risk_free_rate is None else risk_free_rate
+    if not balance_histories:
+        return []
+
+    balances, invested, days, lengths = _to_matrix(balance_histories)
+    count = len(balance_histories)
+    rows = np.arange(count)
+    has_rows = lengths > 0
+    last = np.maximum(lengths - 1, 0)
+    with np.errstate(invalid="ignore"):
+        final_balance = np.where(has_rows, balances[rows, last], np.nan)
+        total_invested = np.where(has_rows, invested[rows, last], np.nan)
+    years = (days - days[:, :1]) / DAYS_PER_YEAR
+    span_years = np.where(has_rows, years[rows, last], 0.0)
+
+    # Time-weighted period returns; periods of zero length or starting from an empty account are skipped
+    previous = balances[:, :-1]
+    flows = np.diff(invested, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        usable = (np.diff(days, axis=1) > 0) & (previous > 0) & np.isfinite(balances[:, 1:])
+        returns = np.where(usable, (balances[:, 1:] - flows) / np.where(usable, previous, 1.0) - 1.0, 0.0)
+    periods = usable.sum(axis=1)
+
+    growth = np.cumprod(1.0 + returns, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        total_growth = growth[:, -1] if growth.shape[1] else np.ones(count)
+        cagr = np.where((span_years > 0) & (total_growth > 0), total_growth ** (1.0 / np.where(span_years > 0, span_years, 1.0)) - 1.0, np.nan)
+
+        peaks = np.maximum.accumulate(np.concatenate([np.ones((count, 1)), growth], axis=1), axis=1)
+        max_drawdown = np.where(periods > 0, (1.0 - np.concatenate([np.ones((count, 1)), growth], axis=1) / peaks).max(axis=1), np.nan)
+
+        periods_per_year = np.where(span_years > 0, periods / span_years, np.nan)
+        mean = returns.sum(axis=1) / periods
+        variance = (((returns - mean[:, None]) ** 2) * usable).sum(axis=1) / (periods - 1)
+        deviation = np.sqrt(variance)
+        volatility = np.where(periods > 1, deviation * np.sqrt(periods_per_year), np.nan)
+        sharpe = np.where(
+            (periods > 1) & (deviation > 0),
+            (mean - risk_free_rate / periods_per_year) / deviation * np.sqrt(periods_per_year),
+            np.nan,
+        )
+
+    # Cash flows for the money-weighted return: contributions out, final balance back in
+    cash_flows = -np.nan_to_num(np.concatenate([invested[:, :1], flows], axis=1))
+    cash_flows[rows[has_rows], last[has_rows]] += final_balance[has_rows]
+    active = has_rows & (span_years > 0) & (cash_flows < 0).any(axis=1) & (cash_flows > 0).any(axis=1)
+    irr = _irr(cash_flows, np.nan_to_num(years), active)
+
+    values = np.column_stack([cagr, max_drawdown, volatility, sharpe, irr])
+    metrics = []
+    for index in range(count):
+        entry = {
+            name: (round(float(value), 6) + 0.0 if np.isfinite(value) else None)  # + 0.0 turns -0.0 into 0.0
+            for name, value in zip(METRIC_NAMES, values[index])
+        }
+        entry["total_invested"] = float(total_invested[index]) if has_rows[index] else None
+        entry["final_balance"] = float(final_balance[index]) if has_rows[index] else None
+        entry["profit"] = entry["final_balance"] - entry["total_invested"] if has_rows[index] else None
+        metrics.append(entry)
+    return metrics
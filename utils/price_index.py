@@ -0,0 +1,135 @@
+from datetime import datetime
+
+import numpy as np
+
+
+def aligned_closes(price_indexes, dates):
+    """
+    Builds an aligned (dates x tickers) matrix of last valid closes on or before each date.
+
+    :param price_indexes: List of PriceIndex objects, one per column.
+    :param dates: Sequence of dates (date, datetime or YYYY-MM-DD) for the rows.
+    :return: Float array of shape (len(dates), len(price_indexes)), NaN before a ticker's first close.
+    """
+    days = np.array([_to_day(value) for value in dates], dtype="datetime64[D]")
+    matrix = np.full((len(days), len(price_indexes)), np.nan)
+    for column, price_index in enumerate(price_indexes):
+        matrix[:, column] = price_index.closes_on_or_before(days)
+    return matrix
+
+
+def _to_day(value):
+    """
+    Converts a date, datetime or YYYY-MM-DD string to numpy's day precision.
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, "D")
+
+
+class PriceIndex:
+    """
+    Derived index over a ticker's daily closes, built once per load of its price data.
+
+    Maps each calendar month to its first and last trading day and answers "last valid close on or
+    before a date" with a binary search instead of scanning backwards day by day.
+
+    :param records: Price records as returned by fetch_data (dictionaries with "Date" and "Close").
+    """
+    def __init__(self, records):
+        self._build(
+            records,
+            np.array([record["Date"] for record in records], dtype="datetime64[D]"),
+            np.array([np.nan if record.get("Close") is None else record["Close"] for record in records], dtype=float),
+        )
+
+    @classmethod
+    def from_arrays(cls, dates, closes, source=None):
+        """
+        Builds an index directly over existing arrays (e.g., views of shared memory) without copying them.
+
+        :param dates: Array of numpy datetime64[D] trading days.
+        :param closes: Float array of closes (NaN where missing).
+        :param source: The records the arrays belong to, if any (used to detect reloads).
+        """
+        price_index = cls.__new__(cls)
+        price_index._build(source, dates, closes)
+        return price_index
+
+    def _build(self, source, dates, closes):
+        self.source = source  # The records this index was built from (used to detect reloads)
+        self.dates = dates
+        self.closes = closes
+
+        # Closes usable as prices (not missing and not zero)
+        valid = np.isfinite(self.closes) & (self.closes != 0)
+        self.valid_dates = self.dates[valid]
+        self.valid_closes = self.closes[valid]
+
+        # First and last trading-day positions for every month that has data
+        months = self.dates.astype("datetime64[M]")
+        unique_months, first_positions = np.unique(months, return_index=True)
+        last_positions = np.append(first_positions[1:] - 1, len(self.dates) - 1)
+        self.months = {
+            str(month): (int(first), int(last))
+            for month, first, last in zip(unique_months, first_positions, last_positions)
+        }
+
+    @staticmethod
+    def month_key(value):
+        """
+        Returns the YYYY-MM key used for a date.
+        """
+        return f"{value.year:04d}-{value.month:02d}"
+
+    def first_trading_day(self, value):
+        """
+        Returns the first trading day of the month containing the given date.
+
+        :param value: Any date within the month.
+        :return: Tuple of (YYYY-MM-DD, close), or None if the month has no data.
+        """
+        positions = self.months.get(self.month_key(value))
+        if positions is None:
+            return None
+        return str(self.dates[positions[0]]), float(self.closes[positions[0]])
+
+    def last_trading_day(self, value):
+        """
+        Returns the last trading day of the month containing the given date.
+
+        :param value: Any date within the month.
+        :return: Tuple of (YYYY-MM-DD, close), or None if the month has no data.
+        """
+        positions = self.months.get(self.month_key(value))
+        if positions is None:
+            return None
+        return str(self.dates[positions[1]]), float(self.closes[positions[1]])
+
+    def closes_on_or_before(self, dates):
+        """
+        Vectorized last_valid_close for many dates at once.
+
+        :param dates: Array of numpy datetime64[D] values.
+        :return: Float array of closes, NaN where no valid close exists yet.
+        """
+        positions = np.searchsorted(self.valid_dates, dates, side="right") - 1
+        closes = np.full(len(dates), np.nan)
+        found = positions >= 0
+        closes[found] = self.valid_closes[positions[found]]
+        return closes
+
+    def last_valid_close(self, value, not_before=None):
+        """
+        Returns the last non-zero close on or before the given date.
+
+        :param value: The date to look up (date, datetime or YYYY-MM-DD).
+        :param not_before: Optional earliest date the close may come from.
+        :return: The close price, or None if there is none in range.
+        """
+        position = int(np.searchsorted(self.valid_dates, _to_day(value), side="right")) - 1
+        if position < 0:
+            return None
+        if not_before is not None and self.valid_dates[position] < _to_day(not_before):
+            return None
+        return float(self.valid_closes[position])
@@ -0,0 +1,109 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Callback receiving the overall completion fraction (None when nobody is listening)
+_progress_callback = ContextVar("progress_callback", default=None)
+
+
+class JobCancelled(BaseException):
+    """
+    Raised from a progress report when the job running the simulation has been cancelled.
+
+    Derives from BaseException so the simulations' `except Exception` handlers let it through unlogged.
+    """
+
+
+def report_progress(done, total):
+    """
+    Reports how far the current unit of work has progressed. Does nothing outside a progress_reporter.
+
+    Simulation loops call this periodically; the job runner uses it to publish progress and to stop
+    cancelled jobs (the callback raises JobCancelled).
+
+    :param done: Units of work completed.
+    :param total: Total units of work.
+    """
+    callback = _progress_callback.get()
+    if callback is not None and total:
+        callback(min(max(done / total, 0.0), 1.0))
+
+
+@contextmanager
+def progress_reporter(callback):
+    """
+    Sends every report_progress call made inside the block to the given callback.
+
+    :param callback: Function taking the completion fraction (0.0 to 1.0).
+    """
+    token = _progress_callback.set(callback)
+    try:
+        yield
+    finally:
+        _progress_callback.reset(token)
+
+
+@contextmanager
+def progress_span(start, end):
+    """
+    Maps the progress reported inside the block onto the [start, end] part of the enclosing progress.
+
+    :param start: Enclosing completion fraction when the block starts.
+    :param end: Enclosing completion fraction when the block finishes.
+    """
+    parent = _progress_callback.get()
+    if parent is None:
+        yield
+        return
+
+    token = _progress_callback.set(lambda fraction: parent(start + fraction * (end - start)))
+    try:
+        parent(start)
+        yield
+    finally:
+        _progress_callback.reset(token)
+    parent(end)
+
+
+class ParallelProgress:
+    """
+    Combines the progress of stages that run concurrently (e.g., batch scenarios on a thread pool) into
+    their average, reported to the callback active when the tracker was created.
+
+    :param count: Number of stages.
+    """
+    def __init__(self, count):
+        self.parent = _progress_callback.get()
+        self.fractions = [0.0] * count
+        self.lock = threading.Lock()
+
+    def _update(self, index, fraction):
+        with self.lock:
+            self.fractions[index] = fraction
+            overall = sum(self.fractions) / len(self.fractions)
+        self.parent(overall)
+
+    def complete(self, index):
+        """
+        Marks stage `index` as finished (for stages whose progress is not reported while they run).
+        """
+        if self.parent is not None:
+            self._update(index, 1.0)
+
+    @contextmanager
+    def stage(self, index):
+        """
+        Reports the progress made inside the block as stage `index` (safe to use from worker threads).
+
+        :param index: Zero-based stage number.
+        """
+        if self.parent is None:
+            yield
+            return
+
+        token = _progress_callback.set(lambda fraction: self._update(index, fraction))
+        try:
+            yield
+        finally:
+            _progress_callback.reset(token)
+        self._update(index, 1.0)
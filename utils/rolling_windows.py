@@ -0,0 +1,83 @@
+import numpy as np
+
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+def monthly_first_closes(price_index, months):
+    """
+    Looks up the first valid close of each month, the price a monthly DCA purchase on the 1st gets
+    (the 1st itself, or the next trading day when the market is closed).
+
+    :param price_index: The ticker's PriceIndex.
+    :param months: Array of numpy datetime64[M] months.
+    :return: Float array with one close per month, NaN for months without a valid close.
+    """
+    month_starts = months.astype("datetime64[D]")
+    next_month_starts = (months + 1).astype("datetime64[D]")
+    positions = np.searchsorted(price_index.valid_dates, month_starts, side="left")
+    closes = np.full(len(months), np.nan)
+    found = positions < len(price_index.valid_dates)
+    found[found] = price_index.valid_dates[positions[found]] < next_month_starts[found]
+    closes[found] = price_index.valid_closes[positions[found]]
+    return closes
+
+
+def rolling_dca_windows(prices, horizon, initial_investment, monthly_investment):
+    """
+    Computes the outcome of a monthly DCA over every window of `horizon` months, for every ticker at once.
+
+    A window starting on month s invests the initial investment plus the monthly investment on month s,
+    the monthly investment on each of the next horizon - 1 months, and is valued at month s + horizon's
+    price. Buying fractional shares, its share count is
+        initial / p[s] + monthly * (S[s + horizon] - S[s]),  with S the prefix sum of 1 / p,
+    so every window costs O(1) after one cumulative sum over the price matrix. Windows with a missing
+    price are marked invalid.
+
+    :param prices: Float array (months x tickers) of monthly purchase prices, NaN where missing.
+    :param horizon: Window length in months.
+    :param initial_investment: Amount invested at the start of each window.
+    :param monthly_investment: Amount invested every month of each window.
+    :return: Tuple of (final values, valid mask), each of shape (windows x tickers), and the amount
+             invested per window.
+    """
+    months, tickers = prices.shape
+    windows = max(months - horizon, 0)
+    invested = initial_investment + monthly_investment * horizon
+    if not windows:
+        return np.zeros((0, tickers)), np.zeros((0, tickers), dtype=bool), invested
+
+    available = np.isfinite(prices) & (prices > 0)
+    shares_per_dollar = np.divide(1.0, prices, out=np.zeros_like(prices), where=available)
+
+    # Prefix sums over months, with a leading zero row so window sums are differences
+    shares_prefix = np.vstack([np.zeros((1, tickers)), np.cumsum(shares_per_dollar, axis=0)])
+    available_prefix = np.vstack([np.zeros((1, tickers), dtype=np.int64), np.cumsum(available, axis=0)])
+
+    starts = np.arange(windows)
+    ends = starts + horizon
+    shares = initial_investment * shares_per_dollar[starts] + monthly_investment * (shares_prefix[ends] - shares_prefix[starts])
+    values = shares * np.where(available[ends], prices[ends], 0.0)
+    valid = (available_prefix[ends] - available_prefix[starts] == horizon) & available[ends]
+    return values, valid, invested
+
+
+def window_distribution(values, invested):
+    """
+    Summarizes the total returns of a ticker's valid windows.
+
+    :param values: Float array of final values, one per valid window.
+    :param invested: Amount invested per window.
+    :return: Dictionary with the window count, the positions of the best and worst windows, the mean
+             and the PERCENTILES of the total return (None values when there are no windows).
+    """
+    if not len(values) or not invested:
+        return {"windows": int(len(values)), "best": None, "worst": None, "mean": None, "percentiles": None}
+    returns = values / invested - 1
+    percentiles = np.percentile(returns, PERCENTILES)
+    return {
+        "windows": int(len(values)),
+        "best": int(np.argmax(returns)),
+        "worst": int(np.argmin(returns)),
+        "mean": float(returns.mean()),
+        "percentiles": {f"p{percentile}": float(value) for percentile, value in zip(PERCENTILES, percentiles)},
+    }
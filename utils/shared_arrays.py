@@ -0,0 +1,132 @@
+import atexit
+import logging
+import os
+import threading
+import uuid
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Segments published by this process: key -> {"segment", "descriptor", "source"}
+_published = {}
+_published_lock = threading.Lock()
+_owner_pid = os.getpid()  # Forked children inherit _published but must never free the parent's segments
+
+# Segments attached by this process (worker side), kept open while their arrays are in use
+_attached = {}
+
+
+def publish_array(key, array, source=None):
+    """
+    Copies an array into a new shared memory segment once, so other processes can attach to it by name.
+
+    Publishing the same key again with the same source returns the existing segment; a different source
+    (e.g., reloaded data) replaces it and frees the old segment.
+
+    :param key: Unique key for the array (e.g., "stock:AAPL_max:closes").
+    :param array: NumPy array with a fixed-size dtype.
+    :param source: The object the array was derived from (identity is used to detect stale segments).
+    :return: Picklable descriptor (segment name, shape and dtype) for attach_array.
+    """
+    array = np.ascontiguousarray(array)
+    with _published_lock:
+        entry = _published.get(key)
+        if entry is not None and entry["source"] is source:
+            return entry["descriptor"]
+        if entry is not None:
+            _unlink(_published.pop(key))
+
+        segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1), name=f"sim_{uuid.uuid4().hex[:20]}")
+        np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+        descriptor = {"name": segment.name, "shape": array.shape, "dtype": array.dtype.str}
+        _published[key] = {"segment": segment, "descriptor": descriptor, "source": source}
+        return descriptor
+
+
+def attach_array(descriptor):
+    """
+    Returns a read-only NumPy view over a published segment without copying it.
+
+    :param descriptor: Descriptor returned by publish_array.
+    :return: NumPy array backed by the shared memory segment.
+    """
+    segment = _attached.get(descriptor["name"])
+    if segment is None:
+        try:
+            # The publisher owns the segment; don't let this process's resource tracker unlink it
+            segment = shared_memory.SharedMemory(name=descriptor["name"], track=False)
+        except TypeError:  # Python < 3.13 has no track argument
+            segment = shared_memory.SharedMemory(name=descriptor["name"])
+        _attached[descriptor["name"]] = segment
+
+    array = np.ndarray(tuple(descriptor["shape"]), dtype=np.dtype(descriptor["dtype"]), buffer=segment.buf)
+    array.flags.writeable = False
+    return array
+
+
+def release_array(key):
+    """
+    Frees a published segment. Processes still attached keep their mapping until they detach.
+    """
+    with _published_lock:
+        entry = _published.pop(key, None)
+    if entry is not None:
+        _unlink(entry)
+
+
+def release_stale_arrays(is_current):
+    """
+    Frees every published segment whose source is no longer current (e.g., evicted or reloaded data).
+
+    :param is_current: Function taking (key, source) and returning True if the segment is still needed.
+    :return: Number of segments freed.
+    """
+    with _published_lock:
+        stale = [key for key, entry in _published.items() if not is_current(key, entry["source"])]
+        entries = [_published.pop(key) for key in stale]
+    for entry in entries:
+        _unlink(entry)
+    return len(entries)
+
+
+def release_all_arrays():
+    """
+    Frees every segment published by this process.
+    """
+    if os.getpid() != _owner_pid:
+        return
+    with _published_lock:
+        entries = list(_published.values())
+        _published.clear()
+    for entry in entries:
+        _unlink(entry)
+
+
+def get_published_arrays():
+    """
+    Returns the number of published segments and their total size in bytes.
+    """
+    with _published_lock:
+        return {
+            "segments": len(_published),
+            "bytes": sum(entry["segment"].size for entry in _published.values()),
+        }
+
+
+def _unlink(entry):
+    """
+    Removes a segment's name (so it is freed once every process detaches) and closes this process's mapping.
+    """
+    try:
+        entry["segment"].unlink()
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.error(f"Failed to free shared memory segment {entry['descriptor']['name']}: {e}")
+    try:
+        entry["segment"].close()
+    except BufferError:
+        pass  # Still viewed by an array in this process; the mapping goes away with it
+
+
+atexit.register(release_all_arrays)
@@ -0,0 +1,67 @@
+from itertools import islice
+
+
+def record_step(account, record, keep_history):
+    """
+    Builds the step a simulation iterator yields for a monthly record, appending the record to the
+    account's balance history first when the history is kept.
+
+    :param account: The Account the record belongs to.
+    :param record: The monthly snapshot dictionary.
+    :param keep_history: Whether the account keeps its full balance history.
+    :return: Tuple of (account, record).
+    """
+    if keep_history:
+        account.balance_history.append(record)
+    return account, record
+
+
+def collect_accounts(steps):
+    """
+    Consumes a simulation iterator and returns its accounts in the order they first appear. The iterator
+    must keep the accounts' histories (keep_history=True) for them to be complete.
+
+    :param steps: Iterable of (account, record) tuples.
+    :return: List of Account objects.
+    """
+    accounts = {}
+    for account, _ in steps:
+        accounts.setdefault(id(account), account)
+    return list(accounts.values())
+
+
+def downsample_steps(steps, every):
+    """
+    Passes on every `every`-th record of each account, plus each account's last record.
+
+    :param steps: Iterable of (account, record) tuples.
+    :param every: Keep one record in this many (1 keeps them all).
+    :return: Generator of (account, record) tuples.
+    """
+    previous = None
+    position = 0
+    for step in steps:
+        if previous is not None and step[0] is not previous[0]:
+            if (position - 1) % every:
+                yield previous  # The last record of the previous account
+            position = 0
+        if position % every == 0:
+            yield step
+        previous = step
+        position += 1
+    if previous is not None and (position - 1) % every:
+        yield previous
+
+
+def batched_steps(steps, size):
+    """
+    Groups a simulation iterator's steps into lists of at most `size`, so consumers can write them out in
+    chunks while holding only one chunk at a time.
+
+    :param steps: Iterable of steps.
+    :param size: Maximum steps per chunk.
+    :return: Generator of lists of steps.
+    """
+    steps = iter(steps)
+    while chunk := list(islice(steps, size)):
+        yield chunk
@@ -0,0 +1,145 @@
+import io
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Spans recorded during the current request (None outside of a request)
+_request_spans = ContextVar("request_spans", default=None)
+
+# Aggregated histograms: span name -> {"buckets": [...], "count": int, "sum": float}
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def _observe(name, duration):
+    """
+    Adds a duration (in seconds) to the aggregated histogram for a span name.
+    """
+    with _histograms_lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = {"buckets": [0] * len(HISTOGRAM_BUCKETS), "count": 0, "sum": 0.0}
+        for index, bound in enumerate(HISTOGRAM_BUCKETS):
+            if duration <= bound:
+                histogram["buckets"][index] += 1
+        histogram["count"] += 1
+        histogram["sum"] += duration
+
+
+def record_span(name, duration):
+    """
+    Records a completed span in the current request (if any) and in the aggregated histograms.
+
+    :param name: The span name (e.g., "fetch_data", "simulation.dca_simulation").
+    :param duration: The span duration in seconds.
+    """
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, duration))
+    _observe(name, duration)
+
+
+@contextmanager
+def span(name):
+    """
+    Times the enclosed block and records it under the given span name.
+
+    :param name: The span name.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+def timed(name):
+    """
+    Decorator that records every call of the wrapped function as a span.
+
+    :param name: The span name.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_request_timing():
+    """
+    Starts collecting spans for the current request.
+    """
+    _request_spans.set([])
+
+
+def get_request_spans():
+    """
+    Returns the spans recorded for the current request, aggregated by name.
+
+    :return: A list of (name, total_duration_seconds, count) tuples in first-seen order.
+    """
+    totals = {}
+    for name, duration in _request_spans.get() or []:
+        total, count = totals.get(name, (0.0, 0))
+        totals[name] = (total + duration, count + 1)
+    return [(name, total, count) for name, (total, count) in totals.items()]
+
+
+def format_server_timing(spans):
+    """
+    Formats aggregated spans as a Server-Timing header value.
+
+    :param spans: A list of (name, total_duration_seconds, count) tuples.
+    :return: The header value (e.g., 'fetch_data;dur=12.3;desc="x2"').
+    """
+    entries = []
+    for name, total, count in spans:
+        token = re.sub(r"[^A-Za-z0-9_\-.!#$%&'*+^`|~]", "_", name)
+        entry = f"{token};dur={total * 1000:.1f}"
+        if count > 1:
+            entry += f';desc="x{count}"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+
+def render_prometheus_metrics():
+    """
+    Renders the aggregated span histograms in the Prometheus text exposition format.
+    """
+    lines = [
+        "# HELP span_duration_seconds Duration of instrumented code spans.",
+        "# TYPE span_duration_seconds histogram",
+    ]
+    with _histograms_lock:
+        for name in sorted(_histograms):
+            histogram = _histograms[name]
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            for bound, bucket_count in zip(HISTOGRAM_BUCKETS, histogram["buckets"]):
+                lines.append(f'span_duration_seconds_bucket{{span="{label}",le="{bound}"}} {bucket_count}')
+            lines.append(f'span_duration_seconds_bucket{{span="{label}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'span_duration_seconds_sum{{span="{label}"}} {histogram["sum"]:.6f}')
+            lines.append(f'span_duration_seconds_count{{span="{label}"}} {histogram["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def format_profile(profiler, limit=50):
+    """
+    Formats a cProfile.Profile as a text report sorted by cumulative time.
+
+    :param profiler: A disabled cProfile.Profile instance.
+    :param limit: Maximum number of functions to include.
+    :return: The report as a string.
+    """
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,143 @@
+import numpy as np
+
+
+class YieldCurve:
+    """
+    Aligned (dates x tenors) matrix of Treasury yields, built once per load of its series.
+
+    Rows are the union of the series' observation dates, columns the series sorted by tenor, and every
+    column is forward-filled, so a row holds the curve in effect on that date. Rates for any dates and
+    maturities are looked up in one vectorized call, interpolating linearly between tenors.
+
+    :param dates: Array of numpy datetime64[D] observation dates (sorted, unique).
+    :param tenors: Tenor of each column in months (sorted ascending).
+    :param rates: Float array of shape (len(dates), len(tenors)) in percent, NaN where a series has no rate yet.
+    :param series_ids: FRED series ID of each column.
+    :param sources: The rate records the curve was built from, one list per column (used to detect reloads).
+    """
+    def __init__(self, dates, tenors, rates, series_ids, sources=None):
+        self.dates = dates
+        self.tenors = np.asarray(tenors, dtype=float)
+        self.rates = rates
+        self.series_ids = list(series_ids)
+        self.sources = sources
+
+        # For every row and column, the nearest column with a rate at or below (-1 if none) and at or
+        # above (len(tenors) if none), so interpolation skips series that have no rate on a date
+        columns = np.arange(len(self.tenors))
+        valid = np.isfinite(rates)
+        self._lower = np.maximum.accumulate(np.where(valid, columns, -1), axis=1)
+        self._upper = np.minimum.accumulate(np.where(valid, columns, len(columns))[:, ::-1], axis=1)[:, ::-1]
+
+    @classmethod
+    def from_series(cls, series_records, tenors):
+        """
+        Aligns per-series rate records (as returned by fetch_bond_rates) into a curve.
+
+        :param series_records: Dictionary of series ID to list of {"date", "rate"} dictionaries.
+        :param tenors: Dictionary of series ID to tenor in months.
+        :return: The YieldCurve.
+        """
+        series_ids = sorted(series_records, key=lambda series_id: tenors[series_id])
+        columns = [
+            (
+                np.array([rate["date"][:10] for rate in series_records[series_id]], dtype="datetime64[D]"),
+                np.array([np.nan if rate["rate"] is None else rate["rate"] for rate in series_records[series_id]], dtype=float),
+            )
+            for series_id in series_ids
+        ]
+        dates = np.unique(np.concatenate([column_dates for column_dates, _ in columns])) if columns else np.array([], dtype="datetime64[D]")
+
+        rates = np.full((len(dates), len(series_ids)), np.nan)
+        for position, (column_dates, column_rates) in enumerate(columns):
+            rates[np.searchsorted(dates, column_dates), position] = column_rates
+
+        return cls(
+            dates, [tenors[series_id] for series_id in series_ids], _forward_fill(rates), series_ids,
+            sources=tuple(series_records[series_id] for series_id in series_ids),
+        )
+
+    @classmethod
+    def from_records(cls, records, tenors):
+        """
+        Rebuilds a curve from the rows written by to_records.
+
+        :param records: List of dictionaries with "date" and one key per series ID.
+        :param tenors: Dictionary of series ID to tenor in months.
+        """
+        series_ids = sorted((key for key in (records[0] if records else {}) if key != "date"), key=lambda series_id: tenors[series_id])
+        dates = np.array([record["date"] for record in records], dtype="datetime64[D]")
+        rates = np.array(
+            [[np.nan if record[series_id] is None else record[series_id] for series_id in series_ids] for record in records],
+            dtype=float,
+        ).reshape(len(records), len(series_ids))
+        return cls(dates, [tenors[series_id] for series_id in series_ids], rates, series_ids)
+
+    def to_records(self):
+        """
+        Returns the matrix as row dictionaries ("date" plus one key per series ID, None where there is no
+        rate), the layout the disk cache stores column by column.
+        """
+        dates = np.datetime_as_string(self.dates, unit="D").tolist()
+        columns = [
+            [None if np.isnan(rate) else rate for rate in self.rates[:, position].tolist()]
+            for position in range(len(self.series_ids))
+        ]
+        return [
+            {"date": day, **{series_id: column[row] for series_id, column in zip(self.series_ids, columns)}}
+            for row, day in enumerate(dates)
+        ]
+
+    def rates_on(self, days, maturity_months, exact=False):
+        """
+        Looks up the annual yield for many (date, maturity) pairs at once.
+
+        Each date uses the curve of the last observation on or before it. Maturities between two tenors
+        are interpolated linearly; maturities outside the curve take the nearest tenor's rate.
+
+        :param days: Array of numpy datetime64[D] values (or anything np.asarray converts to it).
+        :param maturity_months: Maturity in months, a scalar or an array broadcastable to days.
+        :param exact: If True, dates that are not observation dates of the curve get NaN.
+        :return: Float array of yields in percent, NaN where the curve has no rate.
+        """
+        days = np.asarray(days, dtype="datetime64[D]")
+        maturities = np.broadcast_to(np.asarray(maturity_months, dtype=float), days.shape)
+        result = np.full(days.shape, np.nan)
+        if not len(self.dates) or not len(self.tenors):
+            return result
+
+        rows = np.searchsorted(self.dates, days, side="right") - 1
+        found = rows >= 0
+        if exact:
+            found &= self.dates[np.maximum(rows, 0)] == days
+        rows, maturities = rows[found], maturities[found]
+
+        # Nearest columns with a rate at or below and at or above each maturity
+        count = len(self.tenors)
+        below = np.searchsorted(self.tenors, maturities, side="right") - 1
+        above = np.searchsorted(self.tenors, maturities, side="left")
+        lower = np.where(below >= 0, self._lower[rows, np.maximum(below, 0)], -1)
+        upper = np.where(above < count, self._upper[rows, np.minimum(above, count - 1)], count)
+        has_lower, has_upper = lower >= 0, upper < count
+
+        lower_rates = self.rates[rows, np.clip(lower, 0, count - 1)]
+        upper_rates = self.rates[rows, np.clip(upper, 0, count - 1)]
+        lower_tenors = self.tenors[np.clip(lower, 0, count - 1)]
+        upper_tenors = self.tenors[np.clip(upper, 0, count - 1)]
+        span = upper_tenors - lower_tenors
+        weights = np.divide(maturities - lower_tenors, span, out=np.zeros_like(span), where=span > 0)
+
+        rates = np.where(has_lower & has_upper, lower_rates + weights * (upper_rates - lower_rates), np.nan)
+        rates = np.where(has_lower & ~has_upper, lower_rates, rates)
+        rates = np.where(~has_lower & has_upper, upper_rates, rates)
+        result[found] = rates
+        return result
+
+
+def _forward_fill(rates):
+    """
+    Carries each column's last rate down over the rows where it has none (leading gaps stay NaN).
+    """
+    rows = np.arange(len(rates))[:, None]
+    last_valid = np.maximum.accumulate(np.where(np.isfinite(rates), rows, 0), axis=0)
+    return rates[last_valid, np.arange(rates.shape[1])]